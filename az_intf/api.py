@@ -1,12 +1,13 @@
 from .api_utils.Container import Container
 from .api_utils import Auth
 from storage_webapp import logger, severity
+from main import metrics
 
 # Dictionary to store container instances per user for sticky sessions
 CONTAINER_INSTANCES = {}
 
 def init_container(user_obj, username:str, container_name:str, email_id):
-    logger.log(severity['DEBUG'], "INIT CONTAINER : {}".format(username))
+    logger.log(severity['DEBUG'], "INIT CONTAINER : %s", username)
     try:
         ret = Container.container_create(user_obj,
                         username=username,
@@ -18,26 +19,41 @@ def init_container(user_obj, username:str, container_name:str, email_id):
     return ret
 
 def get_container_instance(username:str):
-    logger.log(severity['DEBUG'], "GET CONTAINER INSTANCE : {}".format(username))
+    logger.log(severity['DEBUG'], "GET CONTAINER INSTANCE : %s", username)
     global CONTAINER_INSTANCES
     
     # Check if we already have a container instance for this user
     if username not in CONTAINER_INSTANCES or CONTAINER_INSTANCES[username] is None:
-        logger.log(severity['DEBUG'], "CREATING NEW CONTAINER INSTANCE FOR USER : {}".format(username))
+        logger.log(severity['DEBUG'], "CREATING NEW CONTAINER INSTANCE FOR USER : %s", username)
+        metrics.CONTAINER_CACHE.inc(result='miss')
         CONTAINER_INSTANCES[username] = Container(username)
     else:
-        logger.log(severity['DEBUG'], "REUSING EXISTING CONTAINER INSTANCE FOR USER : {}".format(username))
+        logger.log(severity['DEBUG'], "REUSING EXISTING CONTAINER INSTANCE FOR USER : %s", username)
+        metrics.CONTAINER_CACHE.inc(result='hit')
     
     return CONTAINER_INSTANCES[username]
 
 def del_container_instance(username:str):
-    logger.log(severity['DEBUG'], "DEL CONTAINER INSTANCE : {}".format(username))
+    logger.log(severity['DEBUG'], "DEL CONTAINER INSTANCE : %s", username)
     global CONTAINER_INSTANCES
     if username in CONTAINER_INSTANCES and CONTAINER_INSTANCES[username]:
-        logger.log(severity['DEBUG'], "DELETING CONTAINER INSTANCE FOR USER : {}".format(username))
+        logger.log(severity['DEBUG'], "DELETING CONTAINER INSTANCE FOR USER : %s", username)
         CONTAINER_INSTANCES[username] = None
     return True
 
+def container_cache_stats():
+    """Size of this worker's container cache: entries, live instances and cached blobs per user"""
+    blobs_per_user = {
+        username: instance.cached_blob_count()
+        for username, instance in list(CONTAINER_INSTANCES.items()) if instance is not None
+    }
+    return {
+        'entries': len(CONTAINER_INSTANCES),
+        'live_instances': len(blobs_per_user),
+        'cached_blobs': sum(blobs_per_user.values()),
+        'blobs_per_user': blobs_per_user,
+    }
+
 def user_exists(username:str):
-    logger.log(severity['DEBUG'], "USER EXISTS CHECK : {}".format(username))
+    logger.log(severity['DEBUG'], "USER EXISTS CHECK : %s", username)
     return Auth.Auth.user_exists(username) or Container.user_exists(username)
\ No newline at end of file
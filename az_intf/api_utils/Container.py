@@ -5,7 +5,9 @@ import json
 
 # from django.contrib.auth.models import User
 from azure.storage.blob import ContainerClient, BlobServiceClient
-from main.models import UserInfo, Blob, UploadSession
+from django.db import transaction
+from main.models import UserInfo, Blob, UploadSession, UPLOAD_SESSION_TTL
+from main import storage_usage, storage_summary, metrics
 from az_intf.api_utils import utils as app_utils
 from main.subscription_config import SUBSCRIPTION_CHOICES, SUBSCRIPTION_VALUES
 from storage_webapp import logger, severity
@@ -19,9 +21,8 @@ class Container:
     def __init__(self, username:str):
         self.__user_name = username
         self.__user_obj = UserInfo.objects.get(user_name=username)
-        self.__service_client = BlobServiceClient(
-                                    account_url=f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net",
-                                    credential=AZURE_STORAGE_ACCOUNT_KEY
+        self.__service_client = app_utils.get_blob_service_client(
+                                    f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.core.windows.net"
                                 )
         self.__container_client = None
         if self.__user_obj.container_name is None or self.__user_obj.container_name=="":
@@ -40,18 +41,18 @@ class Container:
         self._cleanup_expired_sessions()
         
         # add debug log 
-        logger.log(severity['DEBUG'], "CONTAINER INIT : User Name : {}, Container Name : {}, Blob Count : {}".format(username, self.__user_obj.container_name, len(self.__blob_obj_dict)))
+        logger.log(severity['DEBUG'], "CONTAINER INIT : User Name : %s, Container Name : %s, Blob Count : %s", username, self.__user_obj.container_name, len(self.__blob_obj_dict))
     
     def _cleanup_expired_sessions(self):
         """Clean up expired upload sessions from database"""
         try:
             from django.utils import timezone
-            expired_sessions = UploadSession.objects.filter(
-                last_activity__lt=timezone.now() - timezone.timedelta(hours=1)
-            )
-            count = expired_sessions.count()
+            expired_ids = list(UploadSession.objects.filter(
+                last_activity__lt=timezone.now() - UPLOAD_SESSION_TTL
+            ).values_list('upload_id', flat=True))
+            # Discard one by one so each expired session releases its quota reservation exactly once
+            count = sum(1 for upload_id in expired_ids if storage_usage.discard_upload_session(upload_id))
             if count > 0:
-                expired_sessions.delete()
                 logger.log(severity['INFO'], f"Cleaned up {count} expired upload sessions")
         except Exception as e:
             logger.log(severity['WARNING'], f"Failed to cleanup expired sessions: {str(e)}")
@@ -75,9 +76,10 @@ class Container:
         account_url = f"https://{AZURE_STORAGE_ACCOUNT_NAME}.blob.{AZURE_STORAGE_ENDPOINT_SUFFIX}"
         try:
             logger.log(severity['INFO'], f"Calling API to create Container '{container_name}'")
-            service_client = BlobServiceClient(account_url=account_url, credential=AZURE_STORAGE_ACCOUNT_KEY)
+            service_client = app_utils.get_blob_service_client(account_url)
             container_client = service_client.get_container_client(container_name)
-            container_client.create_container()
+            with metrics.storage_call('create_container'):
+                container_client.create_container()
             logger.log(severity['INFO'], f"Container '{container_name}' created.")
         #---------------------------------------------------------------------------
         except Exception as error:
@@ -113,6 +115,7 @@ class Container:
                 logger.log(severity['INFO'], "USER INFO ALREADY EXISTS")
                 return True
             user_info.save()
+            storage_summary.record_user_added(user_info.subscription_type)
             logger.log(severity['DEBUG'], "CONTAINER CREATE : User Name : {}, Container Name : {}, Email ID : {}".format(username, container_name, email_id))
             
             create_success = True
@@ -121,15 +124,15 @@ class Container:
         return create_success
     
     def __blob_id_exists(self, blob_id:str):
-        logger.log(severity['DEBUG'], "BLOB ID EXISTS CHECK : Blob ID : {}".format(blob_id))
+        logger.log(severity['DEBUG'], "BLOB ID EXISTS CHECK : Blob ID : %s", blob_id)
         return blob_id in self.__blob_obj_dict.keys()
 
     def __blob_name_exists(self, blob_name:str):
-        logger.log(severity['DEBUG'], "BLOB NAME EXISTS CHECK : Blob Name : {}".format(blob_name))
+        logger.log(severity['DEBUG'], "BLOB NAME EXISTS CHECK : Blob Name : %s", blob_name)
         return blob_name in Blob.objects.filter(user_id=self.__user_obj.user).values_list('blob_name', flat=True)
 
-    def __add_blob_to_db(self, blob_name:str, blob_size:int, blob_type:str="file"):
-        logger.log(severity['DEBUG'], "BLOB CREATE : Blob Name : {}, Blob Size Bytes : {}, Blob Type : {}".format(blob_name, blob_size, blob_type))
+    def __add_blob_to_db(self, blob_name:str, blob_size:int, blob_type:str="file", reserved_bytes:int=0):
+        logger.log(severity['DEBUG'], "BLOB CREATE : Blob Name : %s, Blob Size Bytes : %s, Blob Type : %s", blob_name, blob_size, blob_type)
         add_success = False
         assigned_blob_id = None
         try:
@@ -147,7 +150,14 @@ class Container:
                     is_in_directory=False,
                     directory_id=None
                 )
-                blob_obj.save()
+                # Blob row and usage increment commit (or roll back) together
+                with transaction.atomic():
+                    blob_obj.save()
+                    if reserved_bytes:
+                        storage_usage.commit_quota(self.__user_obj.user_id, reserved_bytes, blob_size)
+                    else:
+                        storage_usage.add_usage(self.__user_obj.user_id, blob_size)
+                    storage_summary.record_blob_added(self.__user_obj.subscription_type, blob_type, blob_size)
                 assigned_blob_id = blob_obj.blob_id
                 self.__blob_obj_dict[assigned_blob_id] = blob_obj
                 add_success = True
@@ -162,7 +172,15 @@ class Container:
             if not self.__blob_id_exists(blob_id):
                 logger.log(severity['INFO'], "BLOB DOES NOT EXIST")
             else:
-                Blob.objects.filter(blob_id=blob_id, user_id=self.__user_obj.user).delete()
+                blob_size = self.__blob_obj_dict[blob_id].blob_size
+                blob_type = self.__blob_obj_dict[blob_id].blob_type
+                with transaction.atomic():
+                    deleted, _ = Blob.objects.filter(blob_id=blob_id, user_id=self.__user_obj.user).delete()
+                    # Only account for rows this call actually deleted (another worker may have won)
+                    if deleted:
+                        # Also for empty blobs: it bumps data_version, which keys the home cache and ETags
+                        storage_usage.remove_usage(self.__user_obj.user_id, blob_size)
+                        storage_summary.record_blob_removed(self.__user_obj.subscription_type, blob_type, blob_size)
                 del self.__blob_obj_dict[blob_id]
                 delete_success = True
         except Exception as error:
@@ -173,9 +191,11 @@ class Container:
     def __delete_container_from_db(self):
         delete_success = False
         try:
-            Blob.objects.filter(user_id=self.__user_obj.user).delete()
+            with transaction.atomic():
+                storage_summary.record_user_removed(self.__user_obj.user_id)
+                Blob.objects.filter(user_id=self.__user_obj.user).delete()
+                UserInfo.objects.filter(user_name=self.__user_name).delete()
             self.__blob_obj_dict.clear()
-            UserInfo.objects.filter(user_name=self.__user_name).delete()
             delete_success = True
         except Exception as error:
             logger.log(severity['ERROR'], "BLOB DELETE ALL EXCEPTION : {}".format(error))
@@ -219,11 +239,13 @@ class Container:
         # Use sanitized name for further checks
         sanitized_name = name_validation['sanitized_name']
         
-        # validate against user's quota
-        if self.__user_obj.storage_used_bytes + new_blob_size > self.__user_obj.storage_quota_bytes:
+        # validate against user's quota (read fresh; the cached user object may be stale).
+        # Includes bytes reserved by in-flight uploads; initialize_streaming_upload re-checks atomically.
+        used_bytes, quota_bytes = storage_usage.get_usage(self.__user_obj.user_id)
+        if used_bytes + new_blob_size > quota_bytes:
             logger.log(severity['DEBUG'], "BLOB VALIDATION FAILED : User Name : {}, Used : {}, Quota : {}, New Blob Size : {}".format(self.__user_name,
-                    self.__user_obj.storage_used_bytes,
-                    self.__user_obj.storage_quota_bytes,
+                    used_bytes,
+                    quota_bytes,
                     new_blob_size))
             return (False, "Storage quota exceeded. Please delete some files before uploading new ones or Upgrade your Subscription")
         
@@ -235,19 +257,14 @@ class Container:
         return (True, "Success") 
 
     def recalculate_storage_usage(self):
-        """Recalculate and update storage usage based on actual blob sizes in database"""
+        """Recalculate and update storage usage based on actual blob sizes in database
+
+        Not used on request paths; usage is maintained incrementally. Kept for repair
+        of a single user (see the reconcile_storage_usage command for all users).
+        """
         try:
-            from main.models import Blob
-            from django.db.models import Sum
-            # Calculate total size of all blobs for this user
-            total_size = Blob.objects.filter(user_id=self.__user_obj.user).aggregate(
-                total=Sum('blob_size')
-            )['total'] or 0
-            
-            # Update the user's storage usage
-            old_usage = self.__user_obj.storage_used_bytes
+            old_usage, total_size = storage_usage.recalculate_user_usage(self.__user_obj.user_id)
             self.__user_obj.storage_used_bytes = total_size
-            self.__user_obj.save()
             
             logger.log(severity['INFO'], "STORAGE RECALCULATED : User : {}, Old : {}, New : {}".format(
                 self.__user_name, old_usage, total_size))
@@ -257,6 +274,10 @@ class Container:
             logger.log(severity['ERROR'], "STORAGE RECALCULATION FAILED : {}".format(error))
             return False
 
+    def cached_blob_count(self):
+        """Number of Blob rows held in this instance's in-memory dict (memory diagnostics)"""
+        return len(self.__blob_obj_dict)
+
     def get_blob_info(self, blob_id=None):
         try:
             if blob_id:
@@ -302,7 +323,7 @@ class Container:
             # Sort by index
             chunks.sort(key=lambda x: x['index'])
             
-            logger.log(severity['DEBUG'], "UPLOAD STATUS : Upload ID : {}, Chunks : {}".format(upload_id, len(chunks)))
+            logger.log(severity['DEBUG'], "UPLOAD STATUS : Upload ID : %s, Chunks : %s", upload_id, len(chunks))
             return {
                 'upload_id': upload_id,
                 'chunks_uploaded': len(chunks),
@@ -402,7 +423,8 @@ class Container:
             #debug log
             logger.log(severity['DEBUG'], "BLOB DELETE : Deleting blob ID : {}, Blob Name : {}".format(blob_id, blob_name))
             blob_client = self.__container_client.get_blob_client(blob_name)
-            delete_resp = blob_client.delete_blob()
+            with metrics.storage_call('delete_blob'):
+                delete_resp = blob_client.delete_blob()
             
             if delete_resp is None:
                 if blob_client.exists():
@@ -415,15 +437,7 @@ class Container:
             logger.log(severity['INFO'], "BLOB DELETE : Blob ID : {}".format(blob_id))
             #---------------------------------------------------------------------------
 
-            blob_info = self.get_blob_info(blob_id)
-            if not blob_info:
-                logger.log(severity['ERROR'], "BLOB INFO RETRIEVAL FAILED DURING DELETE")
-                return False
-            blob_info = blob_info[0]  # get the first item from the list
-            # update and save this user's storage usage
-            self.__user_obj.storage_used_bytes = max(0, self.__user_obj.storage_used_bytes - blob_info['blob_size'])
-            self.__user_obj.save()
-
+            # storage usage is decremented in the same transaction as the row delete
             if not self.__delete_blob_from_db(blob_id):
                 logger.log(severity['ERROR'], "BLOB DELETE EXCEPTION")
                 return False
@@ -443,7 +457,8 @@ class Container:
             AZURE API call to delete a container for a user
             '''
             #---------------------------------------------------------------------------
-            self.__service_client.delete_container(container_name)
+            with metrics.storage_call('delete_container'):
+                self.__service_client.delete_container(container_name)
             logger.log(severity['INFO'], f"Container '{container_name}' deleted.")
             #---------------------------------------------------------------------------
             if not self.__delete_container_from_db():
@@ -461,7 +476,7 @@ class Container:
     def initialize_streaming_upload(self, file_name, upload_id, total_size):
         """Initialize a streaming upload session for direct-to-Azure chunk uploading with persistent storage"""
         try:
-            logger.log(severity['DEBUG'], f"STREAMING UPLOAD INIT: file_name={file_name}, upload_id={upload_id}, total_size={total_size}")
+            logger.log(severity['DEBUG'], "STREAMING UPLOAD INIT: file_name=%s, upload_id=%s, total_size=%s", file_name, upload_id, total_size)
             
             # Check for existing session in database
             if UploadSession.objects.filter(upload_id=upload_id).exists():
@@ -484,17 +499,23 @@ class Container:
                 logger.log(severity['INFO'], f"File name sanitized: '{file_name}' -> '{blob_name}'")
                 file_name=blob_name
             else:
-                logger.log(severity['DEBUG'], f"Using blob name: {blob_name}")
-            
-
-            # Create persistent upload session in database
-            upload_session = UploadSession.objects.create(
-                upload_id=upload_id,
-                user=self.__user_obj.user,
-                blob_name=blob_name,
-                total_size=total_size,
-                container_name=self.__user_obj.container_name
-            )
+                logger.log(severity['DEBUG'], "Using blob name: %s", blob_name)
+            
+
+            # Reserve quota and create the persistent upload session together
+            with transaction.atomic():
+                if not storage_usage.reserve_quota(self.__user_obj.user_id, total_size):
+                    logger.log(severity['WARNING'], f"STREAMING UPLOAD: Quota reservation of {total_size} bytes refused for {self.__user_name}")
+                    return {'success': False, 'quota_exceeded': True,
+                            'error': 'Storage quota exceeded. Please delete some files before uploading new ones or Upgrade your Subscription'}
+                upload_session = UploadSession.objects.create(
+                    upload_id=upload_id,
+                    user=self.__user_obj.user,
+                    blob_name=blob_name,
+                    total_size=total_size,
+                    reserved_bytes=total_size,
+                    container_name=self.__user_obj.container_name
+                )
             
             logger.log(severity['INFO'], f"STREAMING UPLOAD: Initialized persistent session Upload ID:{upload_id} for BlobName:{blob_name}")
 
@@ -530,19 +551,26 @@ class Container:
             # Read chunk data
             chunk_bytes = chunk_data.read()
             chunk_size = len(chunk_bytes)
+
+            # The reservation was sized from the declared total_size; refuse to stage past it
+            if upload_session.uploaded_size + chunk_size > upload_session.reserved_bytes:
+                logger.log(severity['WARNING'], f"STREAMING UPLOAD: Chunk {chunk_index} for {upload_id} exceeds reserved size {upload_session.reserved_bytes}")
+                return {'success': False, 'size_exceeded': True, 'error': 'Upload exceeds declared file size'}
             
-            logger.log(severity['DEBUG'], f"STREAMING UPLOAD: Staging block {block_id} for {upload_id}, size={chunk_size}")
+            logger.log(severity['DEBUG'], "STREAMING UPLOAD: Staging block %s for %s, size=%s", block_id, upload_id, chunk_size)
             
-            print("Container:", blob_client.container_name)
-            print("Blob:", blob_client.blob_name)
-            print("URL:", blob_client.url)
-
             # Stage block directly to Azure
-            blob_client.stage_block(
-                block_id=block_id,
-                data=chunk_bytes
-            )
-            logger.log(severity['DEBUG'], f"Staged block {block_id} for {upload_id}, size={chunk_size}")
+            stage_start = time.perf_counter()
+            with metrics.storage_call('stage_block', histogram=metrics.CHUNK_STAGE_SECONDS):
+                blob_client.stage_block(
+                    block_id=block_id,
+                    data=chunk_bytes
+                )
+            metrics.UPLOAD_BYTES.inc(chunk_size)
+            logger.log(severity['DEBUG'], "Staged block %s for %s, size=%s", block_id, upload_id, chunk_size, extra={
+                'operation': 'stage_block', 'upload_id': upload_id, 'chunk_index': chunk_index,
+                'bytes': chunk_size, 'duration_ms': round((time.perf_counter() - stage_start) * 1000, 2),
+            })
             
             # Update persistent session data
             uploaded_blocks = upload_session.uploaded_blocks
@@ -551,7 +579,7 @@ class Container:
             upload_session.uploaded_size += chunk_size
             upload_session.save(update_fields=['uploaded_blocks', 'uploaded_size', 'last_activity'])
             
-            logger.log(severity['DEBUG'], f"STREAMING UPLOAD: Successfully staged chunk {chunk_index} for {upload_id}")
+            logger.log(severity['DEBUG'], "STREAMING UPLOAD: Successfully staged chunk %s for %s", chunk_index, upload_id)
             return {'success': True, 'uploaded_size': upload_session.uploaded_size}
             
         except Exception as e:
@@ -580,28 +608,33 @@ class Container:
             uploaded_blocks = upload_session.uploaded_blocks
             start_time = upload_session.created_at
             
-            logger.log(severity['DEBUG'], f"STREAMING UPLOAD: Finalizing {upload_id}, committing {len(uploaded_blocks)} blocks")
+            logger.log(severity['DEBUG'], "STREAMING UPLOAD: Finalizing %s, committing %s blocks", upload_id, len(uploaded_blocks))
             
             # Commit all staged blocks to create the final blob
-            blob_client.commit_block_list(uploaded_blocks)
-            
-            # Create database record for the blob
-            assigned_blob_id = self.__add_blob_to_db(blob_name, total_uploaded, "file")
-            if not assigned_blob_id:
-                raise Exception("Failed to create database record for uploaded file")
-            
-            # Update user storage usage
-            self.__user_obj.storage_used_bytes += total_uploaded
-            self.__user_obj.save()
+            commit_start = time.perf_counter()
+            with metrics.storage_call('commit_block_list', histogram=metrics.COMMIT_SECONDS):
+                blob_client.commit_block_list(uploaded_blocks)
+            commit_ms = round((time.perf_counter() - commit_start) * 1000, 2)
+            
+            # Claim the session, create the blob record and turn the reservation into usage atomically.
+            # If the session was already discarded (e.g. expired), its reservation is gone too.
+            with transaction.atomic():
+                claimed, _ = UploadSession.objects.filter(upload_id=upload_id).delete()
+                reserved_bytes = upload_session.reserved_bytes if claimed else 0
+                add_success, assigned_blob_id = self.__add_blob_to_db(blob_name, total_uploaded, "file", reserved_bytes=reserved_bytes)
+                if not add_success:
+                    raise Exception("Failed to create database record for uploaded file")
             
             # Calculate upload duration
             from django.utils import timezone
             duration = (timezone.now() - start_time).total_seconds()
             
-            # Cleanup upload session from database
-            upload_session.delete()
-            
-            logger.log(severity['INFO'], f"STREAMING UPLOAD: Successfully finalized {upload_id}, blob_id={assigned_blob_id}, duration={duration:.2f}s")
+            logger.log(severity['INFO'], "STREAMING UPLOAD: Successfully finalized %s, blob_id=%s, duration=%.2fs",
+                       upload_id, assigned_blob_id, duration, extra={
+                'operation': 'upload', 'upload_id': upload_id, 'blob_id': assigned_blob_id,
+                'bytes': total_uploaded, 'blocks': len(uploaded_blocks),
+                'duration_ms': round(duration * 1000, 2), 'commit_ms': commit_ms,
+            })
             return {
                 'success': True, 
                 'blob_id': assigned_blob_id,
@@ -611,9 +644,9 @@ class Container:
             
         except Exception as e:
             logger.log(severity['ERROR'], f"Failed to finalize streaming upload {upload_id}: {str(e)}")
-            # Cleanup failed session from database
+            # Cleanup failed session from database and release its reservation
             try:
-                UploadSession.objects.filter(upload_id=upload_id).delete()
+                storage_usage.discard_upload_session(upload_id)
             except:
                 pass
             return {'success': False, 'error': 'Failed to finalize upload'}
@@ -649,8 +682,8 @@ class Container:
             from django.utils import timezone
             duration = (timezone.now() - start_time).total_seconds()
             
-            # Remove upload session from database
-            upload_session.delete()
+            # Remove upload session from database and release its quota reservation
+            storage_usage.discard_upload_session(upload_id)
             
             logger.log(severity['INFO'], f"STREAMING UPLOAD: Cancelled {upload_id}, duration={duration:.2f}s, uploaded_size={uploaded_size}")
             
@@ -667,7 +700,7 @@ class Container:
             logger.log(severity['ERROR'], f"Failed to cancel streaming upload {upload_id}: {str(e)}")
             # Force cleanup of session even if error occurred
             try:
-                UploadSession.objects.filter(upload_id=upload_id).delete()
+                storage_usage.discard_upload_session(upload_id)
             except:
                 pass
             return {'success': False, 'error': f'Failed to cancel upload: {str(e)}'}
@@ -697,7 +730,7 @@ class Container:
                     'last_activity': session.last_activity.timestamp()
                 })
             
-            logger.log(severity['DEBUG'], f"ACTIVE UPLOADS: User {self.__user_name} has {len(active_sessions)} active sessions")
+            logger.log(severity['DEBUG'], "ACTIVE UPLOADS: User %s has %s active sessions", self.__user_name, len(active_sessions))
             return {'success': True, 'active_sessions': active_sessions}
             
         except Exception as e:
@@ -718,8 +751,9 @@ class Container:
             blob_name = self.__blob_obj_dict[blob_id].blob_name
             blob_client = self.__container_client.get_blob_client(blob_name)
             
-            logger.log(severity['DEBUG'], f"DOWNLOAD STREAM: Creating stream for blob {blob_id} ({blob_name})")
-            return blob_client.download_blob()
+            logger.log(severity['DEBUG'], "DOWNLOAD STREAM: Creating stream for blob %s (%s)", blob_id, blob_name)
+            with metrics.storage_call('download_blob'):
+                return blob_client.download_blob()
             
         except Exception as e:
             logger.log(severity['ERROR'], f"Failed to get blob stream for {blob_id}: {str(e)}")
@@ -735,8 +769,9 @@ class Container:
             blob_name = self.__blob_obj_dict[blob_id].blob_name
             blob_client = self.__container_client.get_blob_client(blob_name)
             
-            logger.log(severity['DEBUG'], f"DOWNLOAD STREAM: Creating range stream for blob {blob_id} ({blob_name}), range {start}-{end}")
-            return blob_client.download_blob(offset=start, length=end - start + 1)
+            logger.log(severity['DEBUG'], "DOWNLOAD STREAM: Creating range stream for blob %s (%s), range %s-%s", blob_id, blob_name, start, end)
+            with metrics.storage_call('download_blob_range'):
+                return blob_client.download_blob(offset=start, length=end - start + 1)
 
         except Exception as e:
             logger.log(severity['ERROR'], f"Failed to get blob stream range for {blob_id}: {str(e)}")
@@ -6,18 +6,36 @@ import string
 import re
 #from urllib.parse import quote, unquote
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
 from storage_webapp import logger, severity
 
-from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+from azure.storage.blob import generate_blob_sas, BlobSasPermissions, BlobServiceClient
 
 AZURE_STORAGE_ACCOUNT_NAME=os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
 AZURE_STORAGE_ACCOUNT_KEY=os.getenv("AZURE_STORAGE_ACCOUNT_KEY")
 AZURE_STORAGE_ENDPOINT_SUFFIX=os.getenv("AZURE_STORAGE_ENDPOINT_SUFFIX")
 AZURE_STORAGE_CONNECTION_STRING=os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 
+def get_blob_service_client(account_url):
+    '''
+        BlobServiceClient for account_url, or the in-process fake from
+        az_intf.local_blob_service when settings.AZURE_STORAGE_BACKEND == 'local'.
+        settings.AZURE_STORAGE_ACCOUNT_URL replaces account_url for the real client
+        (e.g. az_intf.fake_blob_service or Azurite).
+    '''
+    if getattr(settings, 'AZURE_STORAGE_BACKEND', 'azure') == 'local':
+        from az_intf.local_blob_service import LocalBlobServiceClient
+        return LocalBlobServiceClient(
+            account_url,
+            latency_ms=getattr(settings, 'LOCAL_BLOB_LATENCY_MS', 0),
+            root=getattr(settings, 'LOCAL_BLOB_ROOT', None),
+        )
+    account_url = getattr(settings, 'AZURE_STORAGE_ACCOUNT_URL', None) or account_url
+    return BlobServiceClient(account_url=account_url, credential=AZURE_STORAGE_ACCOUNT_KEY)
+
 def assign_container(username):
     ''' 
         Logic to create new Container name for a New User
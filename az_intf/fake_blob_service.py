@@ -0,0 +1,501 @@
+"""
+In-process HTTP server speaking the subset of the Azure Blob REST API we use.
+Usage: python -m az_intf.fake_blob_service [--host 127.0.0.1] [--port 10000] [--account devstoreaccount1] [--root DIR] [--latency-ms 0] [--bandwidth 0] [--fault-rate 0] [--fault-status 503] [--seed 0]
+
+Unlike az_intf.local_blob_service, which replaces BlobServiceClient, this serves
+real HTTP so the real azure.storage.blob client - request pipeline, retries,
+chunked downloads, XML parsing - runs unchanged. Point the app at it with
+AZURE_STORAGE_ACCOUNT_URL=<server url> and the default AZURE_STORAGE_BACKEND.
+
+Operations: create/delete container, List Blobs (prefix, marker, maxresults),
+Put Block, Put Block List, Put Blob, Get Blob (Range / x-ms-range), Get Blob
+Properties, Delete Blob and Blob Batch (delete sub-requests). URLs are path
+style (<url>/<container>/<blob>), as with Azurite. Authentication headers are
+accepted and ignored.
+
+Slow-storage conditions:
+    latency_ms   fixed delay before every response
+    bandwidth    bytes per second for request and response bodies (0: unlimited)
+    fault_rate   share of requests answered with fault_status instead
+    inject_fault the next count matching requests fail (or drop the connection)
+
+Blobs live in the same stores as the local backend: in memory by default, or
+under root (the LOCAL_BLOB_ROOT layout), so a dataset seeded with
+generate_dataset --storage can be served as is.
+"""
+import argparse
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+from az_intf.local_blob_service import _DirectoryStore, _Store
+
+DEFAULT_ACCOUNT = 'devstoreaccount1'
+API_VERSION = '2021-12-02'
+MAX_RESULTS = 5000
+IO_SLICE = 64 * 1024
+FAULT_CODES = {500: 'InternalError', 503: 'ServerBusy', 408: 'OperationTimedOut', 403: 'AuthenticationFailed'}
+_RANGE = re.compile(r'bytes=(\d+)-(\d*)$')
+
+
+class _Fault:
+    def __init__(self, status, operation, count, drop):
+        self.status = status
+        self.operation = operation
+        self.remaining = count
+        self.drop = drop
+
+
+class _StorageError(Exception):
+    def __init__(self, status, code, message=''):
+        super().__init__(message or code)
+        self.status = status
+        self.code = code
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up (dropped-connection faults, cancelled downloads) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeBlobServer:
+    """
+    Threaded HTTP server around a blob store. start() returns self; url is the
+    account URL to hand to BlobServiceClient. Thread-safe; usable as a context manager.
+    """
+    def __init__(self, host='127.0.0.1', port=0, account=DEFAULT_ACCOUNT, root=None, latency_ms=0, bandwidth=0,
+                 fault_rate=0.0, fault_status=503, seed=None):
+        self.account = account
+        self.store = _DirectoryStore(root) if root else _Store()
+        self.latency_ms = latency_ms
+        self.bandwidth = bandwidth
+        self.fault_rate = fault_rate
+        self.fault_status = fault_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._faults = []
+        self._calls = {}
+        self._versions = {}  # (container, blob) -> write counter, for ETags
+        self._httpd = _HTTPServer((host, port), _Handler)
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/{self.account}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-blob-service', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def inject_fault(self, status=503, operation=None, count=1, drop=False):
+        """Fail the next count requests (of operation, or any) with status, or drop their connection"""
+        with self._lock:
+            self._faults.append(_Fault(status, operation, count, drop))
+
+    def call_counts(self):
+        """Requests served per operation, faults included"""
+        with self._lock:
+            return dict(self._calls)
+
+    def reset_call_counts(self):
+        with self._lock:
+            self._calls.clear()
+
+    # -- used by the handler --------------------------------------------------
+
+    def _record(self, operation):
+        with self._lock:
+            self._calls[operation] = self._calls.get(operation, 0) + 1
+
+    def _take_fault(self, operation):
+        with self._lock:
+            for fault in self._faults:
+                if fault.operation in (None, operation):
+                    fault.remaining -= 1
+                    if fault.remaining <= 0:
+                        self._faults.remove(fault)
+                    return fault
+            if self.fault_rate and self._rng.random() < self.fault_rate:
+                return _Fault(self.fault_status, operation, 1, False)
+        return None
+
+    def _etag(self, container, blob):
+        with self._lock:
+            return f'"0x{self._versions.get((container, blob), 0):X}"'
+
+    def _touch(self, container, blob):
+        with self._lock:
+            self._versions[(container, blob)] = self._versions.get((container, blob), 0) + 1
+
+    def _forget(self, container, blob):
+        with self._lock:
+            self._versions.pop((container, blob), None)
+
+    def throttle(self, nbytes):
+        if self.bandwidth and nbytes:
+            time.sleep(nbytes / self.bandwidth)
+
+
+def _operation(method, blob, query):
+    """Blob REST operation name of a request"""
+    comp = query.get('comp')
+    if blob is None:
+        if comp == 'list':
+            return 'list_blobs'
+        if comp == 'batch':
+            return 'blob_batch'
+        return {'PUT': 'create_container', 'DELETE': 'delete_container'}.get(method, 'get_container_properties')
+    if method == 'PUT':
+        return {'block': 'put_block', 'blocklist': 'put_block_list'}.get(comp, 'put_blob')
+    return {'GET': 'get_blob', 'HEAD': 'get_blob_properties', 'DELETE': 'delete_blob'}.get(method, 'unsupported')
+
+
+def _split_path(path, account):
+    """'/<account>/<container>/<blob>' or '/<container>/<blob>' -> (container, blob or None)"""
+    parts = [unquote(part) for part in path.lstrip('/').split('/', 2)]
+    if parts and parts[0] == account:
+        parts = parts[1:]
+    if not parts or not parts[0]:
+        return None, None
+    container = parts[0]
+    blob = '/'.join(parts[1:]) or None
+    return container, blob
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeBlobService/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def do_PUT(self):
+        self._dispatch()
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_HEAD(self):
+        self._dispatch()
+
+    def do_DELETE(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        chunks = []
+        while length > 0:
+            chunk = self.rfile.read(min(IO_SLICE, length))
+            if not chunk:
+                break
+            self.fake.throttle(len(chunk))
+            chunks.append(chunk)
+            length -= len(chunk)
+        return b''.join(chunks)
+
+    def _dispatch(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        container, blob = _split_path(url.path, self.fake.account)
+        operation = _operation(self.command, blob, query)
+        body = self._read_body()
+        self.fake._record(operation)
+        if self.fake.latency_ms:
+            time.sleep(self.fake.latency_ms / 1000.0)
+
+        fault = self.fake._take_fault(operation)
+        if fault is not None and fault.drop:
+            self.close_connection = True
+            self.connection.close()
+            return
+        try:
+            if fault is not None:
+                raise _StorageError(fault.status, FAULT_CODES.get(fault.status, 'InjectedFault'), 'Injected fault')
+            if container is None:
+                raise _StorageError(400, 'InvalidUri', 'Account-level operations are not supported')
+            status, headers, payload = self._execute(operation, container, blob, query, body)
+        except _StorageError as e:
+            status, headers, payload = self._error(e)
+        self._respond(status, headers, payload)
+
+    def _execute(self, operation, container, blob, query, body):
+        handler = getattr(self, f'_op_{operation}', None)
+        if handler is None:
+            raise _StorageError(400, 'UnsupportedOperation', f'{self.command} {operation} is not supported')
+        return handler(container, blob, query, body)
+
+    def _respond(self, status, headers, payload):
+        self.send_response(status)
+        headers = dict(headers)
+        headers.setdefault('x-ms-request-id', str(uuid.uuid4()))
+        headers.setdefault('x-ms-version', API_VERSION)
+        headers.setdefault('Date', formatdate(usegmt=True))
+        if 'Content-Length' not in headers:
+            headers['Content-Length'] = str(len(payload))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        for start in range(0, len(payload), IO_SLICE):
+            piece = payload[start:start + IO_SLICE]
+            self.fake.throttle(len(piece))
+            self.wfile.write(piece)
+
+    def _error(self, error):
+        headers = {'x-ms-error-code': error.code}
+        if self.command == 'HEAD':
+            return error.status, dict(headers, **{'Content-Length': '0'}), b''
+        payload = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            f'<Error><Code>{error.code}</Code><Message>{escape(str(error))}</Message></Error>'
+        ).encode()
+        headers['Content-Type'] = 'application/xml'
+        return error.status, headers, payload
+
+    def _blob_headers(self, container, blob, size):
+        return {
+            'ETag': self.fake._etag(container, blob),
+            'Last-Modified': formatdate(usegmt=True),
+            'x-ms-blob-type': 'BlockBlob',
+            'x-ms-creation-time': formatdate(usegmt=True),
+            'Content-Type': 'application/octet-stream',
+            'Accept-Ranges': 'bytes',
+            'x-ms-server-encrypted': 'true',
+            '_size': size,
+        }
+
+    def _require_container(self, container):
+        if not self.fake.store.has_container(container):
+            raise _StorageError(404, 'ContainerNotFound', f'Container {container} not found')
+
+    def _blob_size(self, container, blob):
+        self._require_container(container)
+        try:
+            return self.fake.store.size(container, blob)
+        except ResourceNotFoundError:
+            raise _StorageError(404, 'BlobNotFound', f'Blob {blob} not found')
+
+    # -- containers -----------------------------------------------------------
+
+    def _op_create_container(self, container, blob, query, body):
+        try:
+            self.fake.store.create_container(container)
+        except ResourceExistsError:
+            raise _StorageError(409, 'ContainerAlreadyExists', f'Container {container} already exists')
+        return 201, {'ETag': '"0x1"', 'Last-Modified': formatdate(usegmt=True)}, b''
+
+    def _op_delete_container(self, container, blob, query, body):
+        self._require_container(container)
+        self.fake.store.delete_container(container)
+        return 202, {}, b''
+
+    def _op_get_container_properties(self, container, blob, query, body):
+        self._require_container(container)
+        return 200, {'ETag': '"0x1"', 'Last-Modified': formatdate(usegmt=True)}, b''
+
+    def _op_list_blobs(self, container, blob, query, body):
+        self._require_container(container)
+        prefix = query.get('prefix', '')
+        marker = query.get('marker', '')
+        max_results = int(query.get('maxresults') or MAX_RESULTS)
+        names = [(name, size) for name, size in self.fake.store.list(container)
+                 if name.startswith(prefix) and name >= marker]
+        page, rest = names[:max_results], names[max_results:]
+        modified = formatdate(usegmt=True)
+        blobs = ''.join(
+            f'<Blob><Name>{escape(name)}</Name><Properties>'
+            f'<Creation-Time>{modified}</Creation-Time><Last-Modified>{modified}</Last-Modified>'
+            f'<Etag>{self.fake._etag(container, name).strip(chr(34))}</Etag>'
+            f'<Content-Length>{size}</Content-Length><Content-Type>application/octet-stream</Content-Type>'
+            f'<BlobType>BlockBlob</BlobType><AccessTier>Hot</AccessTier></Properties><Metadata /></Blob>'
+            for name, size in page
+        )
+        payload = (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            f'<EnumerationResults ServiceEndpoint="{escape(self.fake.url)}/" ContainerName="{escape(container)}">'
+            f'<Prefix>{escape(prefix)}</Prefix><Marker>{escape(marker)}</Marker><MaxResults>{max_results}</MaxResults>'
+            f'<Blobs>{blobs}</Blobs><NextMarker>{escape(rest[0][0]) if rest else ""}</NextMarker>'
+            '</EnumerationResults>'
+        ).encode()
+        return 200, {'Content-Type': 'application/xml'}, payload
+
+    def _op_blob_batch(self, container, blob, query, body):
+        self._require_container(container)
+        match = re.search(r'boundary=([^;]+)', self.headers.get('Content-Type', ''))
+        if not match:
+            raise _StorageError(400, 'InvalidInput', 'Missing multipart boundary')
+        response_boundary = f'batchresponse_{uuid.uuid4()}'
+        parts = []
+        for content_id, request in enumerate(_batch_requests(body, match.group(1).strip('"'))):
+            status, reason, code = self._batch_delete(request)
+            lines = [
+                f'--{response_boundary}', 'Content-Type: application/http', f'Content-ID: {content_id}', '',
+                f'HTTP/1.1 {status} {reason}', f'x-ms-request-id: {uuid.uuid4()}', f'x-ms-version: {API_VERSION}',
+            ]
+            if code:
+                lines.append(f'x-ms-error-code: {code}')
+            lines.extend(['Content-Length: 0', '', ''])
+            parts.append('\r\n'.join(lines))
+        payload = (''.join(parts) + f'--{response_boundary}--\r\n').encode()
+        return 202, {'Content-Type': f'multipart/mixed; boundary={response_boundary}'}, payload
+
+    def _batch_delete(self, request_line):
+        method, _, target = request_line.partition(' ')
+        container, blob = _split_path(urlsplit(target.rsplit(' ', 1)[0]).path, self.fake.account)
+        if method != 'DELETE' or blob is None:
+            return 400, 'Bad Request', 'UnsupportedOperation'
+        self.fake._record('delete_blob')
+        try:
+            self._op_delete_blob(container, blob, {}, b'')
+        except _StorageError as e:
+            return e.status, 'Not Found' if e.status == 404 else 'Error', e.code
+        return 202, 'Accepted', None
+
+    # -- blobs ----------------------------------------------------------------
+
+    def _op_put_block(self, container, blob, query, body):
+        block_id = query.get('blockid')
+        if not block_id:
+            raise _StorageError(400, 'InvalidQueryParameterValue', 'Missing blockid')
+        self._require_container(container)
+        self.fake.store.stage(container, blob, block_id, body)
+        return 201, {'x-ms-request-server-encrypted': 'true'}, b''
+
+    def _op_put_block_list(self, container, blob, query, body):
+        self._require_container(container)
+        try:
+            ids = [element.text or '' for element in ET.fromstring(body)]
+        except ET.ParseError:
+            raise _StorageError(400, 'InvalidXmlDocument', 'Block list is not valid XML')
+        try:
+            self.fake.store.commit(container, blob, ids)
+        except ResourceNotFoundError as e:
+            raise _StorageError(400, 'InvalidBlockList', str(e))
+        self.fake._touch(container, blob)
+        return 201, {'ETag': self.fake._etag(container, blob), 'Last-Modified': formatdate(usegmt=True),
+                     'x-ms-request-server-encrypted': 'true'}, b''
+
+    def _op_put_blob(self, container, blob, query, body):
+        self._require_container(container)
+        if self.headers.get('If-None-Match') == '*' and self.fake.store.exists(container, blob):
+            raise _StorageError(409, 'BlobAlreadyExists', f'Blob {blob} already exists')
+        self.fake.store.write(container, blob, data=body)
+        self.fake._touch(container, blob)
+        return 201, {'ETag': self.fake._etag(container, blob), 'Last-Modified': formatdate(usegmt=True),
+                     'x-ms-request-server-encrypted': 'true'}, b''
+
+    def _op_get_blob_properties(self, container, blob, query, body):
+        size = self._blob_size(container, blob)
+        headers = self._blob_headers(container, blob, size)
+        headers['Content-Length'] = str(headers.pop('_size'))
+        return 200, headers, b''
+
+    def _op_get_blob(self, container, blob, query, body):
+        size = self._blob_size(container, blob)
+        headers = self._blob_headers(container, blob, size)
+        del headers['_size']
+        range_header = self.headers.get('x-ms-range') or self.headers.get('Range')
+        if not range_header:
+            return 200, headers, self.fake.store.read(container, blob, 0, size)
+        match = _RANGE.match(range_header.strip())
+        if not match:
+            raise _StorageError(400, 'InvalidRange', f'Unsupported range {range_header}')
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+        if start >= size:
+            error = _StorageError(416, 'InvalidRange', 'The range specified is invalid for the current size of the resource.')
+            status, error_headers, payload = self._error(error)
+            error_headers['Content-Range'] = f'bytes */{size}'
+            return status, error_headers, payload
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return 206, headers, self.fake.store.read(container, blob, start, end - start + 1)
+
+    def _op_delete_blob(self, container, blob, query, body):
+        self._require_container(container)
+        try:
+            self.fake.store.delete(container, blob)
+        except ResourceNotFoundError:
+            raise _StorageError(404, 'BlobNotFound', f'Blob {blob} not found')
+        self.fake._forget(container, blob)
+        return 202, {'x-ms-delete-type-permanent': 'true'}, b''
+
+
+def _batch_requests(body, boundary):
+    """Request lines ('DELETE /container/blob HTTP/1.1') of a multipart/mixed batch body, in order"""
+    requests = []
+    for part in body.decode('utf-8', 'replace').split(f'--{boundary}'):
+        # Each part: MIME headers, a blank line, then the embedded HTTP request
+        _, _, embedded = part.partition('\r\n\r\n')
+        line = embedded.strip().split('\r\n', 1)[0]
+        if line and not line.startswith('--'):
+            requests.append(line)
+    return requests
+
+
+def main(argv=None):
+    from benchmarks.common import parse_size
+
+    parser = argparse.ArgumentParser(description='Serve a fake Azure Blob endpoint for tests and benchmarks')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=10000)
+    parser.add_argument('--account', default=DEFAULT_ACCOUNT)
+    parser.add_argument('--root', default=None, help='Keep blobs under this directory (LOCAL_BLOB_ROOT layout)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay before every response')
+    parser.add_argument('--bandwidth', default='0', help='Body bytes per second, e.g. 20M (0: unlimited)')
+    parser.add_argument('--fault-rate', type=float, default=0.0, help='Share of requests that fail')
+    parser.add_argument('--fault-status', type=int, default=503, help='Status of random faults')
+    parser.add_argument('--seed', type=int, default=None)
+    options = parser.parse_args(argv)
+    server = FakeBlobServer(
+        options.host, options.port, options.account, options.root, options.latency_ms,
+        parse_size(options.bandwidth), options.fault_rate, options.fault_status, options.seed,
+    )
+    print(f'AZURE_STORAGE_ACCOUNT_URL={server.url}', flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
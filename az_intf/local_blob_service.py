@@ -0,0 +1,377 @@
+"""
+In-process stand-in for azure.storage.blob.BlobServiceClient.
+
+Implements the subset of the SDK that az_intf.api_utils.Container calls (containers,
+staged blocks, block-list commits, ranged downloads, deletes) so the real Container
+code can run without network access. Selected with AZURE_STORAGE_BACKEND = 'local';
+used by the benchmark commands and tests.
+
+By default all clients share one in-memory store per process. With LOCAL_BLOB_ROOT
+set, blobs are files under that directory instead (one sub-directory per container),
+so several worker processes and the generate_dataset command see the same objects and
+large seeded blobs can be sparse files. LOCAL_BLOB_LATENCY_MS adds a fixed delay to
+every storage call to approximate a round-trip to Azure, and call_counts() reports
+how many of those round-trips each operation made.
+"""
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote, unquote
+
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+
+DOWNLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class _Store:
+    """In-memory store: container -> {blob name -> bytes}"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.containers = {}
+        self.staged = {}  # (container, blob) -> {block id -> bytes}
+
+    def reset(self):
+        with self.lock:
+            self.containers.clear()
+            self.staged.clear()
+
+    def _container(self, container):
+        blobs = self.containers.get(container)
+        if blobs is None:
+            raise ResourceNotFoundError(f"Container {container} not found")
+        return blobs
+
+    def create_container(self, container):
+        with self.lock:
+            if container in self.containers:
+                raise ResourceExistsError(f"Container {container} already exists")
+            self.containers[container] = {}
+
+    def has_container(self, container):
+        with self.lock:
+            return container in self.containers
+
+    def delete_container(self, container):
+        with self.lock:
+            if self.containers.pop(container, None) is None:
+                raise ResourceNotFoundError(f"Container {container} not found")
+            for key in [key for key in self.staged if key[0] == container]:
+                del self.staged[key]
+
+    def stage(self, container, blob, block_id, payload):
+        with self.lock:
+            self._container(container)
+            self.staged.setdefault((container, blob), {})[block_id] = payload
+
+    def commit(self, container, blob, ids):
+        with self.lock:
+            blobs = self._container(container)
+            staged = self.staged.get((container, blob), {})
+            missing = [block_id for block_id in ids if block_id not in staged]
+            if missing:
+                raise ResourceNotFoundError(f"Blocks not staged: {missing[:3]}")
+            blobs[blob] = b''.join(staged[block_id] for block_id in ids)
+            self.staged.pop((container, blob), None)
+
+    def write(self, container, blob, data=None, size=None):
+        """Store data, or size zero bytes when data is None"""
+        with self.lock:
+            self._container(container)[blob] = bytes(size) if data is None else bytes(data)
+
+    def write_chunks(self, container, blob, chunks):
+        """Store the concatenation of an iterable of byte chunks"""
+        data = b''.join(chunks)
+        with self.lock:
+            self._container(container)[blob] = data
+
+    def size(self, container, blob):
+        with self.lock:
+            data = self._container(container).get(blob)
+        if data is None:
+            raise ResourceNotFoundError(f"Blob {blob} not found")
+        return len(data)
+
+    def read(self, container, blob, offset, length):
+        with self.lock:
+            data = self._container(container).get(blob)
+        if data is None:
+            raise ResourceNotFoundError(f"Blob {blob} not found")
+        return data[offset:offset + length]
+
+    def delete(self, container, blob):
+        with self.lock:
+            if self._container(container).pop(blob, None) is None:
+                raise ResourceNotFoundError(f"Blob {blob} not found")
+
+    def exists(self, container, blob):
+        with self.lock:
+            return blob in self.containers.get(container, {})
+
+    def list(self, container):
+        with self.lock:
+            return sorted((name, len(data)) for name, data in self.containers.get(container, {}).items())
+
+    def stats(self):
+        with self.lock:
+            blobs = [data for container in self.containers.values() for data in container.values()]
+            return {
+                'containers': len(self.containers),
+                'blobs': len(blobs),
+                'bytes': sum(len(data) for data in blobs),
+                'staged_blocks': sum(len(blocks) for blocks in self.staged.values()),
+            }
+
+
+class _DirectoryStore:
+    """
+    Same interface as _Store on top of a directory, safe across processes.
+
+    <root>/<container>/<quoted blob name> holds committed blobs and
+    <root>/<container>/.staged/<quoted blob name>/<block id hex> holds staged blocks,
+    so chunks of one upload can be staged by different workers. Commits write to a
+    temporary file and rename it into place.
+    """
+    STAGED_DIR = '.staged'
+
+    def __init__(self, root):
+        self.root = root
+
+    def _container(self, container):
+        path = os.path.join(self.root, container)
+        if not os.path.isdir(path):
+            raise ResourceNotFoundError(f"Container {container} not found")
+        return path
+
+    def _blob_path(self, container, blob):
+        return os.path.join(self._container(container), quote(blob, safe=''))
+
+    def _staged_dir(self, container, blob):
+        return os.path.join(self._container(container), self.STAGED_DIR, quote(blob, safe=''))
+
+    def create_container(self, container):
+        try:
+            os.makedirs(os.path.join(self.root, container))
+        except FileExistsError:
+            raise ResourceExistsError(f"Container {container} already exists")
+
+    def has_container(self, container):
+        return os.path.isdir(os.path.join(self.root, container))
+
+    def delete_container(self, container):
+        shutil.rmtree(self._container(container))
+
+    def stage(self, container, blob, block_id, payload):
+        staged_dir = self._staged_dir(container, blob)
+        os.makedirs(staged_dir, exist_ok=True)
+        with open(os.path.join(staged_dir, block_id.encode().hex()), 'wb') as handle:
+            handle.write(payload)
+
+    def commit(self, container, blob, ids):
+        staged_dir = self._staged_dir(container, blob)
+        paths = [os.path.join(staged_dir, block_id.encode().hex()) for block_id in ids]
+        missing = [block_id for block_id, path in zip(ids, paths) if not os.path.exists(path)]
+        if missing:
+            raise ResourceNotFoundError(f"Blocks not staged: {missing[:3]}")
+        target = self._blob_path(container, blob)
+        temp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, 'wb') as out:
+            for path in paths:
+                with open(path, 'rb') as block:
+                    shutil.copyfileobj(block, out)
+        os.replace(temp, target)
+        shutil.rmtree(staged_dir, ignore_errors=True)
+
+    def write(self, container, blob, data=None, size=None):
+        """Write data, or a sparse file of size bytes when data is None"""
+        with open(self._blob_path(container, blob), 'wb') as handle:
+            if data is None:
+                handle.truncate(size)
+            else:
+                handle.write(data)
+
+    def write_chunks(self, container, blob, chunks):
+        """Stream an iterable of byte chunks to a temporary file and rename it into place"""
+        target = self._blob_path(container, blob)
+        temp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp, 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+        os.replace(temp, target)
+
+    def size(self, container, blob):
+        try:
+            return os.path.getsize(self._blob_path(container, blob))
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"Blob {blob} not found")
+
+    def read(self, container, blob, offset, length):
+        try:
+            with open(self._blob_path(container, blob), 'rb') as handle:
+                handle.seek(offset)
+                return handle.read(length)
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"Blob {blob} not found")
+
+    def delete(self, container, blob):
+        try:
+            os.remove(self._blob_path(container, blob))
+        except FileNotFoundError:
+            raise ResourceNotFoundError(f"Blob {blob} not found")
+
+    def exists(self, container, blob):
+        return os.path.isfile(os.path.join(self.root, container, quote(blob, safe='')))
+
+    def list(self, container):
+        try:
+            entries = list(os.scandir(os.path.join(self.root, container)))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            (unquote(entry.name), entry.stat().st_size) for entry in entries
+            if entry.is_file() and not entry.name.endswith('.tmp')
+        )
+
+
+_store = _Store()
+_calls = {}  # SDK operation -> calls made through any LocalBlobServiceClient
+_calls_lock = threading.Lock()
+
+
+def reset():
+    """Drop every container and staged block in the in-memory store (between benchmark runs and tests)"""
+    _store.reset()
+
+
+def stats():
+    """Counts of containers, committed blobs and bytes held in the in-memory store"""
+    return _store.stats()
+
+
+def call_counts():
+    """SDK calls per operation made by every local client since the last reset_call_counts()"""
+    with _calls_lock:
+        return dict(_calls)
+
+
+def reset_call_counts():
+    with _calls_lock:
+        _calls.clear()
+
+
+class _BlobProperties:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.metadata = {}
+
+
+class LocalDownloader:
+    """Mimics StorageStreamDownloader: .size, .chunks() and .readall(); reads lazily per chunk"""
+    def __init__(self, store, container_name, blob_name, offset, size):
+        self._store = store
+        self._container_name = container_name
+        self._blob_name = blob_name
+        self._offset = offset
+        self.size = size
+
+    def chunks(self):
+        for start in range(0, self.size, DOWNLOAD_CHUNK_SIZE):
+            yield self._store.read(
+                self._container_name, self._blob_name, self._offset + start, min(DOWNLOAD_CHUNK_SIZE, self.size - start),
+            )
+
+    def readall(self):
+        return self._store.read(self._container_name, self._blob_name, self._offset, self.size)
+
+
+class LocalBlobClient:
+    def __init__(self, service, container_name, blob_name):
+        self._service = service
+        self.container_name = container_name
+        self.blob_name = blob_name
+        self.url = f"{service.url}/{container_name}/{blob_name}"
+
+    def stage_block(self, block_id, data, **kwargs):
+        self._service._call('stage_block')
+        payload = data.read() if hasattr(data, 'read') else bytes(data)
+        self._service.store.stage(self.container_name, self.blob_name, block_id, payload)
+
+    def commit_block_list(self, block_list, **kwargs):
+        self._service._call('commit_block_list')
+        ids = [getattr(block, 'id', block) for block in block_list]
+        self._service.store.commit(self.container_name, self.blob_name, ids)
+        return {'etag': f'"{len(ids)}"'}
+
+    def upload_blob(self, data, overwrite=False, **kwargs):
+        self._service._call('upload_blob')
+        store = self._service.store
+        if not overwrite and store.exists(self.container_name, self.blob_name):
+            raise ResourceExistsError(f"Blob {self.blob_name} already exists")
+        payload = data.read() if hasattr(data, 'read') else bytes(data)
+        store.write(self.container_name, self.blob_name, payload)
+        return {'etag': '"1"'}
+
+    def download_blob(self, offset=None, length=None, **kwargs):
+        self._service._call('download_blob')
+        total = self._service.store.size(self.container_name, self.blob_name)
+        start = min(offset or 0, total)
+        end = total if length is None else min(total, start + length)
+        return LocalDownloader(self._service.store, self.container_name, self.blob_name, start, end - start)
+
+    def delete_blob(self, **kwargs):
+        self._service._call('delete_blob')
+        self._service.store.delete(self.container_name, self.blob_name)
+        return None
+
+    def exists(self, **kwargs):
+        self._service._call('get_blob_properties')
+        return self._service.store.exists(self.container_name, self.blob_name)
+
+
+class LocalContainerClient:
+    def __init__(self, service, container_name):
+        self._service = service
+        self.container_name = container_name
+
+    def create_container(self, **kwargs):
+        self._service._call('create_container')
+        self._service.store.create_container(self.container_name)
+
+    def delete_container(self, **kwargs):
+        self._service.delete_container(self.container_name)
+
+    def get_blob_client(self, blob):
+        return LocalBlobClient(self._service, self.container_name, blob)
+
+    def list_blobs(self, name_starts_with=None, **kwargs):
+        self._service._call('list_blobs')
+        prefix = name_starts_with or ''
+        return [
+            _BlobProperties(name, size) for name, size in self._service.store.list(self.container_name)
+            if name.startswith(prefix)
+        ]
+
+
+class LocalBlobServiceClient:
+    def __init__(self, account_url='local://cloudsynk', credential=None, latency_ms=0, root=None):
+        self.url = account_url
+        self.latency = latency_ms / 1000.0
+        self.store = _DirectoryStore(root) if root else _store
+
+    def _call(self, operation):
+        """Count one SDK call (one round-trip on the real service) and apply the configured latency"""
+        with _calls_lock:
+            _calls[operation] = _calls.get(operation, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_container_client(self, container):
+        return LocalContainerClient(self, container)
+
+    def get_blob_client(self, container, blob):
+        return LocalBlobClient(self, container, blob)
+
+    def delete_container(self, container, **kwargs):
+        self._call('delete_container')
+        self.store.delete_container(container)
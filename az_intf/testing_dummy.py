@@ -2,34 +2,60 @@
 
 This module implements the small az_api surface the application uses so tests
 can replace the real `az_intf.api` entrypoints with these functions without
-modifying application code.
+modifying application code. It touches neither the database nor blob storage;
+tests that need the real Container against a storage endpoint use
+az_intf.local_blob_service or az_intf.fake_blob_service instead.
 
 Functions provided:
  - init_container(user, username, assign, email) -> bool
  - get_container_instance(username) -> DummyContainer | None
  - del_container_instance(username) -> bool
 
-And a `DummyContainer` class with the methods used by views:
+And a `DummyContainer` class mirroring the public methods of
+az_intf.api_utils.Container.Container (same arguments and result shapes):
  - blob_create(name, size, typ, uploaded=None) -> (bool, blob_id)
  - blob_delete(blob_id) -> bool
  - get_blob_list() -> list
+ - get_blob_info(blob_id=None) -> list
  - container_delete(user_obj) -> bool
+ - validate_blob_name(blob_name) / validate_new_blob_addition(size, name)
+ - initialize_streaming_upload / append_chunk_to_blob / finalize_streaming_upload
+ - get_upload_status / cancel_streaming_upload / get_active_upload_sessions
+ - get_blob_stream / get_blob_stream_range / cancel_blob_download
 """
 
+import time
 from typing import Dict, Tuple, Optional
 
 _instances: Dict[str, "DummyContainer"] = {}
 
 
+class DummyDownloader:
+    """Mimics StorageStreamDownloader: .size, .chunks() and .readall()"""
+    def __init__(self, data: bytes):
+        self._data = data
+        self.size = len(data)
+
+    def chunks(self):
+        if self._data:
+            yield self._data
+
+    def readall(self):
+        return self._data
+
+
 class DummyContainer:
     def __init__(self, create_result: Tuple[bool, Optional[str]] = (True, "blob-12345")):
         self._create_result = create_result
+        self._blobs = {}  # blob_id -> {'blob_name', 'data', 'created'}
+        self._uploads = {}  # upload_id -> {'blob_name', 'total_size', 'chunks', 'started'}
 
     def blob_create(self, name, size, typ, uploaded=None):
         # ignore uploaded file; return configured result
         return self._create_result
 
     def blob_delete(self, blob_id):
+        self._blobs.pop(blob_id, None)
         return True
 
     def get_blob_list(self):
@@ -37,48 +63,112 @@ class DummyContainer:
         return []
 
     def container_delete(self, user_obj):
+        self._blobs.clear()
+        self._uploads.clear()
         return True
 
     def recalculate_storage_usage(self):
-        # Dummy implementation for testing
         return True
 
-    def get_blob_info(self):
-        # Dummy implementation for testing - return empty list
-        return []
+    def cached_blob_count(self):
+        return len(self._blobs)
+
+    def get_blob_info(self, blob_id=None):
+        ids = [blob_id] if blob_id else list(self._blobs)
+        return [
+            {
+                'blob_id': bid,
+                'blob_name': self._blobs[bid]['blob_name'],
+                'blob_size': len(self._blobs[bid]['data']),
+                'blob_uploaded_at': self._blobs[bid]['created'],
+                'blob_uploaded_at_formatted': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._blobs[bid]['created'])),
+            }
+            for bid in ids if bid in self._blobs
+        ]
+
+    def validate_blob_name(self, blob_name):
+        # Dummy implementation for testing - every name is valid as given
+        return {'is_valid': True, 'sanitized_name': blob_name, 'errors': []}
 
     def validate_new_blob_addition(self, file_size, file_name):
         # Dummy implementation for testing - always allow uploads
         return (True, "Upload allowed")
 
     def initialize_streaming_upload(self, file_name, upload_id, total_size):
-        """Dummy implementation for streaming upload initialization"""
-        return {'success': True, 'blob_id': f'blob-{upload_id[:8]}'}
+        self._uploads[upload_id] = {'blob_name': file_name, 'total_size': total_size, 'chunks': {}, 'started': time.time()}
+        return {'success': True, 'blob_name': file_name}
 
     def append_chunk_to_blob(self, upload_id, chunk_data, chunk_index):
-        """Dummy implementation for chunk appending"""
-        return {'success': True, 'uploaded_size': chunk_data.size}
+        upload = self._uploads.get(upload_id)
+        if upload is None:
+            return {'success': False, 'error': 'Upload session not found'}
+        payload = chunk_data.read() if hasattr(chunk_data, 'read') else bytes(chunk_data)
+        upload['chunks'][chunk_index] = payload
+        return {'success': True, 'uploaded_size': sum(len(chunk) for chunk in upload['chunks'].values())}
 
     def finalize_streaming_upload(self, upload_id, file_name):
-        """Dummy implementation for streaming upload finalization"""
+        upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            return {'success': False, 'error': 'Upload session not found'}
+        data = b''.join(upload['chunks'][index] for index in sorted(upload['chunks']))
+        blob_id = f'dummy-blob-{upload_id[:8]}'
+        self._blobs[blob_id] = {'blob_name': upload['blob_name'], 'data': data, 'created': time.time()}
         return {
-            'success': True, 
-            'blob_id': f'blob-final-{upload_id[:8]}',
-            'uploaded_size': 1024,
-            'duration': 0.5
+            'success': True,
+            'blob_id': blob_id,
+            'uploaded_size': len(data),
+            'duration': time.time() - upload['started'],
         }
 
-    def initialize_streaming_upload(self, file_name, upload_id, total_size):
-        # Dummy implementation for streaming upload testing
-        return {'success': True, 'blob_id': 'dummy-blob-123'}
+    def get_upload_status(self, upload_id):
+        upload = self._uploads.get(upload_id)
+        chunks = upload['chunks'] if upload else {}
+        return {
+            'upload_id': upload_id,
+            'chunks_uploaded': len(chunks),
+            'chunks': [{'index': index, 'size': len(chunks[index]), 'timestamp': None} for index in sorted(chunks)],
+        }
 
-    def append_chunk_to_blob(self, upload_id, chunk_data, chunk_index):
-        # Dummy implementation - simulate successful chunk append
-        return {'success': True}
+    def cancel_streaming_upload(self, upload_id):
+        upload = self._uploads.pop(upload_id, None)
+        if upload is None:
+            return {'success': False, 'error': 'Upload session not found'}
+        return {
+            'success': True,
+            'cancelled': True,
+            'uploaded_size': sum(len(chunk) for chunk in upload['chunks'].values()),
+            'duration': time.time() - upload['started'],
+            'message': 'Upload cancelled successfully',
+            'cleanup_errors': None,
+        }
 
-    def finalize_streaming_upload(self, upload_id, file_name):
-        # Dummy implementation - simulate successful finalization
-        return {'success': True, 'blob_id': 'dummy-blob-123'}
+    def get_active_upload_sessions(self):
+        now = time.time()
+        return {'success': True, 'active_sessions': [
+            {
+                'upload_id': upload_id,
+                'file_name': upload['blob_name'],
+                'blob_name': upload['blob_name'],
+                'total_size': upload['total_size'],
+                'uploaded_size': sum(len(chunk) for chunk in upload['chunks'].values()),
+                'uploaded_blocks': len(upload['chunks']),
+                'start_time': upload['started'],
+                'duration': now - upload['started'],
+                'last_activity': upload['started'],
+            }
+            for upload_id, upload in self._uploads.items()
+        ]}
+
+    def get_blob_stream(self, blob_id):
+        blob = self._blobs.get(blob_id)
+        return DummyDownloader(blob['data']) if blob else None
+
+    def get_blob_stream_range(self, blob_id, start, end):
+        blob = self._blobs.get(blob_id)
+        return DummyDownloader(blob['data'][start:end + 1]) if blob else None
+
+    def cancel_blob_download(self, blob_id, download_session_id=None):
+        return {'success': True, 'cancelled': True, 'message': 'Download cancellation processed (client-side cancellation required)'}
 
 
 def init_container(user, username, assign, email) -> bool:
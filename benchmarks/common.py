@@ -0,0 +1,40 @@
+"""
+Parsing and summary helpers shared by the bench_* commands and the loadtest tools.
+
+Kept free of Django imports so the loadtest scripts run on a load-generating machine
+that only has the client-side requirements installed.
+"""
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2, 'G': 1024 ** 3, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    """'256K' -> 262144; plain integers are bytes"""
+    text = text.strip().upper()
+    number = text.rstrip('KMGB')
+    unit = text[len(number):]
+    if not number or unit not in _SIZE_UNITS:
+        raise ValueError(f"Invalid size '{text}'")
+    return int(float(number) * _SIZE_UNITS[unit])
+
+
+def parse_list(text, parser=int):
+    return [parser(part) for part in text.split(',') if part.strip()]
+
+
+def percentiles(values):
+    """p50/p90/p99/max/mean of a list of numbers (empty list gives zeros)"""
+    if not values:
+        return {'p50': 0, 'p90': 0, 'p99': 0, 'max': 0, 'mean': 0, 'count': 0}
+    ordered = sorted(values)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+    return {
+        'p50': round(pick(50), 3),
+        'p90': round(pick(90), 3),
+        'p99': round(pick(99), 3),
+        'max': round(ordered[-1], 3),
+        'mean': round(sum(ordered) / len(ordered), 3),
+        'count': len(ordered),
+    }
@@ -0,0 +1,325 @@
+"""
+Bulk seeding of synthetic users, UserInfo, Blob, Directory and UploadSession rows.
+
+Rows are written with bulk_create in batches and never go through Container, so
+seeding a million blobs takes seconds rather than hours. The data is shaped like
+real usage rather than uniform:
+
+    blob types     weighted towards images and documents (BLOB_TYPE_WEIGHTS)
+    blob sizes     log-normal around a per-type median, capped at max_blob_size
+    blobs per user fixed, or Pareto-distributed around the mean (a few users own most files)
+    tiers          optional weighted subscription tiers with their real quotas
+
+UserInfo.storage_used_bytes and storage_reserved_bytes are set from the seeded
+blobs and upload sessions, so usage and quota checks see consistent data. Storage
+objects are only created by populate_storage, and only on the local backend.
+
+Used by bench_metadata and the generate_dataset command.
+"""
+import base64
+import math
+import os
+import random
+import time
+
+from azure.core.exceptions import ResourceExistsError
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from az_intf.api_utils import utils as app_utils
+from main.models import Blob, Directory, UploadSession, UserInfo, MAX_HASH_ID_FIELD_LENGTH, UPLOAD_SESSION_TTL
+from main.subscription_config import SUBSCRIPTION_VALUES
+
+BATCH_SIZE = 5000
+QUOTA_BYTES = 1 << 50
+BLOB_TYPE_WEIGHTS = {'image': 35, 'document': 30, 'file': 15, 'audio': 10, 'video': 10}
+BLOB_TYPES = tuple(BLOB_TYPE_WEIGHTS)
+# Median size per type; sizes spread log-normally around it
+MEDIAN_SIZES = {
+    'image': 2 * 1024 ** 2, 'document': 200 * 1024, 'file': 1024 ** 2, 'audio': 5 * 1024 ** 2, 'video': 50 * 1024 ** 2,
+}
+SIZE_SIGMA = 1.5
+MAX_BLOB_SIZE = 4 * 1024 ** 3
+TIER_WEIGHTS = {'STARTER': 60, 'STANDARD': 20, 'PREMIUM': 12, 'PREMIUM_PLUS': 6, 'TESTER': 2}
+PARETO_ALPHA = 1.2
+DISTRIBUTIONS = ('fixed', 'pareto')
+STORAGE_MODES = ('sparse', 'random')
+_EXTENSIONS = {'file': 'bin', 'image': 'jpg', 'video': 'mp4', 'audio': 'mp3', 'document': 'pdf'}
+_YEAR_SECONDS = 365 * 24 * 3600
+_UPLOAD_CHUNK_SIZE = 4 * 1024 ** 2
+_ID_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+# Seeded ids: kind letter + user pk + row number, in base 36, MAX_HASH_ID_FIELD_LENGTH long
+_ID_PK_WIDTH = 5
+_ID_ROW_WIDTH = MAX_HASH_ID_FIELD_LENGTH - 1 - _ID_PK_WIDTH
+
+
+def _base36(value, width):
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, 36)
+        digits.append(_ID_DIGITS[digit])
+    return ''.join(reversed(digits))
+
+
+def _seed_id(kind, pk, n):
+    """
+    MAX_HASH_ID_FIELD_LENGTH-character id for row n of user pk (kind 's' blob, 'd' directory).
+
+    Fits user pks below 36**5 (~60M) and 36**6 (~2.1G) rows per user; beyond that it
+    raises ValueError rather than writing ids the column cannot hold.
+    """
+    if not (0 <= pk < 36 ** _ID_PK_WIDTH and 0 <= n < 36 ** _ID_ROW_WIDTH):
+        raise ValueError(f"Seeded id for user pk {pk}, row {n} does not fit in {MAX_HASH_ID_FIELD_LENGTH} characters")
+    return f'{kind}{_base36(pk, _ID_PK_WIDTH)}{_base36(n, _ID_ROW_WIDTH)}'
+
+
+def _batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(model, rows, batch_size):
+    """bulk_create rows in batches; returns the created objects"""
+    created = []
+    for batch in _batches(rows, batch_size):
+        created.extend(model.objects.bulk_create(batch))
+    return created
+
+
+def blob_size(rng, blob_type, max_size=MAX_BLOB_SIZE):
+    return max(1, min(max_size, int(rng.lognormvariate(math.log(MEDIAN_SIZES[blob_type]), SIZE_SIGMA))))
+
+
+def blob_counts(rng, users, mean, distribution='fixed'):
+    """Blobs owned by each of users users; Pareto counts keep the requested mean and cap at 100x it"""
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{distribution}'")
+    if distribution == 'fixed' or mean == 0:
+        return [mean] * users
+    scale = mean * (PARETO_ALPHA - 1) / PARETO_ALPHA
+    return [min(mean * 100, int(scale * rng.paretovariate(PARETO_ALPHA))) for _ in range(users)]
+
+
+def seed_users(count, prefix='scale', batch_size=BATCH_SIZE):
+    """
+    Create count users named <prefix><n> sharing one password ('bench-pw').
+
+    Returns:
+        list: the created User objects, with primary keys
+    """
+    password = make_password('bench-pw')
+    users = _bulk_insert(User, (
+        User(username=f'{prefix}{n}', email=f'{prefix}{n}@example.com', password=password)
+        for n in range(count)
+    ), batch_size)
+    if users and users[0].pk is None:
+        # Backends that cannot return ids from bulk inserts
+        users = list(User.objects.filter(username__startswith=prefix).order_by('id'))
+    return users
+
+
+def seed_directories(users, per_user, batch_size=BATCH_SIZE):
+    """
+    Create per_user directories for every user: a third at the top level, the rest
+    nested under one of those.
+
+    Returns:
+        dict: user pk -> list of directory_id
+    """
+    if not per_user:
+        return {}
+    now = timezone.now()
+    roots_per_user = max(1, per_user // 3)
+
+    def rows(user, numbers, parents=None):
+        for n in numbers:
+            yield Directory(
+                directory_id=_seed_id('d', user.pk, n), directory_name=f'{user.username}/folder_{n}', user_id=user,
+                creation_time=now, last_modification_time=now,
+                parent_directory=parents[n % len(parents)] if parents else None,
+            )
+
+    roots = _bulk_insert(Directory, (
+        row for user in users for row in rows(user, range(roots_per_user))
+    ), batch_size)
+    if roots and roots[0].pk is None:
+        roots = list(Directory.objects.filter(user_id__in=users, parent_directory=None).order_by('id'))
+    roots_by_user = {}
+    for directory in roots:
+        roots_by_user.setdefault(directory.user_id_id, []).append(directory)
+    _bulk_insert(Directory, (
+        row for user in users for row in rows(user, range(roots_per_user, per_user), roots_by_user[user.pk])
+    ), batch_size)
+    return {user.pk: [_seed_id('d', user.pk, n) for n in range(per_user)] for user in users}
+
+
+def _blob_rows(user, count, rng, now, directory_ids=(), max_size=MAX_BLOB_SIZE):
+    for n in range(count):
+        blob_type = rng.choices(BLOB_TYPES, weights=BLOB_TYPE_WEIGHTS.values())[0]
+        created = now - rng.random() * _YEAR_SECONDS
+        # Half of a user's files live in a directory when the user has any
+        directory_id = rng.choice(directory_ids) if directory_ids and rng.random() < 0.5 else None
+        yield Blob(
+            # The leading 's' keeps seeded ids apart from md5-derived (hex) ones
+            blob_id=_seed_id('s', user.pk, n),
+            blob_name=f'file_{n:07d}.{_EXTENSIONS[blob_type]}',
+            blob_size=blob_size(rng, blob_type, max_size),
+            user_id=user,
+            blob_type=blob_type,
+            creation_time=created,
+            last_modification_time=created,
+            is_in_directory=directory_id is not None,
+            directory_id=directory_id,
+        )
+
+
+def seed_blobs(user, count, rng=None, batch_size=BATCH_SIZE):
+    """
+    Create count Blob rows for user.
+
+    Returns:
+        int: total bytes of the created blobs
+    """
+    rng = rng or random.Random()
+    created = _bulk_insert(Blob, _blob_rows(user, count, rng, time.time()), batch_size)
+    return sum(blob.blob_size for blob in created)
+
+
+def _upload_session_rows(users, count, stale_ratio, rng, max_size):
+    now = timezone.now()
+    for n in range(count):
+        user = rng.choice(users)
+        total = blob_size(rng, 'video', max_size)
+        chunks = int(total * rng.random()) // _UPLOAD_CHUNK_SIZE
+        # Stale sessions are past the TTL and get discarded by the next Container init
+        idle = UPLOAD_SESSION_TTL * 2 if rng.random() < stale_ratio else timezone.timedelta(seconds=rng.randint(0, 600))
+        yield UploadSession(
+            upload_id=f'seed-{user.pk}-{n}',
+            user=user,
+            blob_name=f'upload_{n:07d}.mp4',
+            total_size=total,
+            uploaded_size=chunks * _UPLOAD_CHUNK_SIZE,
+            uploaded_blocks=[base64.b64encode(f"block-{i:08d}".encode()).decode() for i in range(chunks)],
+            reserved_bytes=total,
+            container_name=f'{user.username}-container',
+            created_at=now - idle,
+            last_activity=now - idle,
+        )
+
+
+def seed(users=1000, blobs_per_user=10, heavy_users=0, heavy_user_blobs=0, prefix='scale', seed=0,
+         batch_size=BATCH_SIZE, distribution='fixed', directories_per_user=0, upload_sessions=0,
+         stale_session_ratio=0.2, tiers=False, max_blob_size=MAX_BLOB_SIZE):
+    """
+    Seed users with their UserInfo, directories, blobs and in-flight upload sessions.
+
+    The first heavy_users users own heavy_user_blobs blobs each; the others own
+    blobs_per_user, or a Pareto-distributed count with that mean. Containers are
+    named <username>-container. With tiers, users get weighted subscription tiers and
+    the tier's quota (raised to their seeded usage where that is larger); otherwise
+    every quota is effectively unlimited.
+
+    Returns:
+        dict: {'users': [User], 'heavy_users': [User], 'blobs': int, 'bytes': int,
+               'directories': int, 'upload_sessions': int, 'seconds': float}
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    with transaction.atomic():
+        created = seed_users(users, prefix=prefix, batch_size=batch_size)
+        counts = [heavy_user_blobs] * min(heavy_users, users) + blob_counts(
+            rng, max(0, users - heavy_users), blobs_per_user, distribution)
+        directories = seed_directories(created, directories_per_user, batch_size)
+
+        used = dict.fromkeys((user.pk for user in created), 0)
+        blobs = 0
+        now = time.time()
+        # Batches span users so that many small users still insert BATCH_SIZE rows at a time
+        rows = (
+            blob
+            for user, count in zip(created, counts)
+            for blob in _blob_rows(user, count, rng, now, directories.get(user.pk, ()), max_blob_size)
+        )
+        for batch in _batches(rows, batch_size):
+            Blob.objects.bulk_create(batch)
+            for blob in batch:
+                used[blob.user_id_id] += blob.blob_size
+            blobs += len(batch)
+
+        reserved = dict.fromkeys(used, 0)
+        sessions = _bulk_insert(UploadSession, _upload_session_rows(
+            created, upload_sessions, stale_session_ratio, rng, max_blob_size,
+        ), batch_size) if created else []
+        for session in sessions:
+            reserved[session.user_id] += session.reserved_bytes
+
+        def user_info(user):
+            tier = rng.choices(list(TIER_WEIGHTS), weights=TIER_WEIGHTS.values())[0] if tiers else 'STARTER'
+            quota = max(SUBSCRIPTION_VALUES[tier], used[user.pk] + reserved[user.pk]) if tiers else QUOTA_BYTES
+            return UserInfo(
+                user=user, user_name=user.username, container_name=f'{user.username}-container',
+                subscription_type=tier, storage_quota_bytes=quota,
+                storage_used_bytes=used[user.pk], storage_reserved_bytes=reserved[user.pk],
+                bytes_uploaded_total=used[user.pk],
+            )
+        _bulk_insert(UserInfo, (user_info(user) for user in created), batch_size)
+    return {
+        'users': created,
+        'heavy_users': created[:heavy_users],
+        'blobs': blobs,
+        'bytes': sum(used.values()),
+        'directories': sum(len(ids) for ids in directories.values()),
+        'upload_sessions': len(sessions),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def _random_chunks(size, chunk_size=_UPLOAD_CHUNK_SIZE):
+    """Yield size random bytes as chunks of at most chunk_size"""
+    for start in range(0, size, chunk_size):
+        yield os.urandom(min(chunk_size, size - start))
+
+
+def populate_storage(users, mode='sparse'):
+    """
+    Create a storage object for every seeded blob of users on the local backend.
+
+    'sparse' writes zero-filled sparse files under LOCAL_BLOB_ROOT, so they cost no
+    disk; 'random' streams os.urandom bytes of the full size in _UPLOAD_CHUNK_SIZE
+    pieces, so memory stays flat even for multi-GB objects. LOCAL_BLOB_ROOT is
+    required: the in-memory store would allocate every object and die with the process.
+
+    Returns:
+        dict: {'objects': int, 'bytes': int}
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode '{mode}'")
+    if getattr(settings, 'AZURE_STORAGE_BACKEND', 'azure') != 'local':
+        raise ValueError("Storage can only be populated on the local backend (AZURE_STORAGE_BACKEND=local)")
+    if not getattr(settings, 'LOCAL_BLOB_ROOT', None):
+        raise ValueError("Storage can only be populated under LOCAL_BLOB_ROOT, not in the in-memory store")
+    service = app_utils.get_blob_service_client('local://dataset')
+    objects = written = 0
+    for user in users:
+        container_name = f'{user.username}-container'
+        try:
+            service.get_container_client(container_name).create_container()
+        except ResourceExistsError:
+            pass
+        for blob_name, size in Blob.objects.filter(user_id=user).values_list('blob_name', 'blob_size').iterator():
+            if mode == 'sparse':
+                service.store.write(container_name, blob_name, size=size)
+            else:
+                service.store.write_chunks(container_name, blob_name, _random_chunks(size))
+            objects += 1
+            written += size
+    return {'objects': objects, 'bytes': written}
@@ -0,0 +1,213 @@
+"""
+Shared plumbing for the bench_* management commands.
+
+Benchmarks run the real views and Container code against the in-process storage
+fake (AZURE_STORAGE_BACKEND = 'local') and a throwaway database created with
+Django's test-database machinery, so they never touch Azure or the real database.
+The database engine is whatever the active settings configure; run the same
+command under different settings (or DATABASE_URL with settings_prod) to compare
+engines.
+
+Results are written as JSON to benchmarks/results/<benchmark>-<timestamp>.json.
+Each file records the git revision, Python/Django versions and database vendor, so
+files from different releases can be compared directly.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from az_intf import api as az_api
+from az_intf import local_blob_service
+from benchmarks.common import parse_list, parse_size, percentiles  # noqa: F401  used as harness.* by the bench_* commands
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class QueryCounter:
+    """Counts queries on the calling thread's connection; one instance can be shared by many threads"""
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        is_write = sql.lstrip().upper().startswith(WRITE_PREFIXES)
+        with self._lock:
+            if is_write:
+                self.writes += 1
+            else:
+                self.reads += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def installed(self):
+        """Install on this thread's default connection for the duration of the block"""
+        with connections['default'].execute_wrapper(self):
+            yield self
+
+
+STATM_PATH = '/proc/self/statm'
+RSS_SAMPLE_SECONDS = 0.005
+
+
+def _current_rss():
+    """Resident set size of this process in bytes, or None without /proc (non-Linux)"""
+    try:
+        with open(STATM_PATH) as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def memory_tracking(enabled, interval=RSS_SAMPLE_SECONDS):
+    """
+    Yield a dict that receives, when the block exits, the RSS at the start of the
+    block, the highest RSS sampled during it and their difference, plus the Python
+    heap peak (tracemalloc) when enabled. tracemalloc slows allocation-heavy code,
+    so only enable it when the Python heap is what is being measured.
+
+    RSS is sampled from /proc by a background thread because ru_maxrss is the
+    process-lifetime high-water mark: after the largest run every later run would
+    report the same number. Memory an earlier run freed but the allocator kept can
+    be reused without raising RSS, so the delta is a lower bound. Without /proc only
+    the lifetime ru_maxrss is reported.
+    """
+    result = {}
+    start_rss = _current_rss()
+    peak = [start_rss]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            peak[0] = max(peak[0], _current_rss() or 0)
+
+    sampler = None
+    if start_rss is not None:
+        sampler = threading.Thread(target=sample, name='rss-sampler', daemon=True)
+        sampler.start()
+    if enabled:
+        tracemalloc.start()
+    try:
+        yield result
+    finally:
+        if enabled:
+            result['python_peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if sampler is not None:
+            stop.set()
+            sampler.join()
+            peak[0] = max(peak[0], _current_rss() or 0)
+            result.update(rss_start_bytes=start_rss, rss_peak_bytes=peak[0], rss_peak_delta_bytes=peak[0] - start_rss)
+        else:
+            # ru_maxrss is KiB on Linux and bytes on macOS
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            result['process_max_rss_bytes'] = maxrss if platform.system() == 'Darwin' else maxrss * 1024
+
+
+@contextmanager
+def benchmark_environment(latency_ms=0):
+    """
+    Create a throwaway database and route storage to the local fake.
+
+    SQLite gets a file-backed database (not the default in-memory one) so that
+    worker threads in concurrency runs share it.
+    """
+    db_settings = connection.settings_dict
+    tmp_dir = None
+    if connection.vendor == 'sqlite':
+        tmp_dir = tempfile.mkdtemp(prefix='cloudsynk-bench-')
+        db_settings.setdefault('TEST', {})['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    local_blob_service.reset()
+    az_api.CONTAINER_INSTANCES.clear()
+    try:
+        with override_settings(
+            AZURE_STORAGE_BACKEND='local',
+            LOCAL_BLOB_LATENCY_MS=latency_ms,
+            LOCAL_BLOB_ROOT=None,
+            ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver'],
+            PROFILING_ENABLED=False,
+        ):
+            yield
+    finally:
+        az_api.CONTAINER_INSTANCES.clear()
+        local_blob_service.reset()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if tmp_dir is not None:
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+            os.rmdir(tmp_dir)
+
+
+def run_threads(count, target):
+    """Run target(worker_index) on count threads; re-raise the first failure"""
+    errors = []
+
+    def wrapper(index):
+        try:
+            target(index)
+        except Exception as error:  # surfaced after join
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=wrapper, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+    return elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_results(benchmark, params, runs, output_dir=None):
+    """
+    Write one results file and return its path.
+
+    Returns:
+        str: path of the JSON file written
+    """
+    output_dir = output_dir or RESULTS_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.strftime('%Y%m%d-%H%M%S')
+    document = {
+        'benchmark': benchmark,
+        'created_at': started,
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': {'vendor': connection.vendor, 'engine': connection.settings_dict['ENGINE']},
+        'params': params,
+        'runs': runs,
+    }
+    path = os.path.join(output_dir, f"{benchmark}-{started}.json")
+    with open(path, 'w') as handle:
+        json.dump(document, handle, indent=2)
+    return path
@@ -143,22 +143,31 @@ group = "utsingh"
 tmp_upload_dir = None
 errorlog = "/var/log/cloudsynk/gunicorn_error.log"
 accesslog = "/var/log/cloudsynk/gunicorn_access.log"
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+# %(h)s is always nginx (127.0.0.1); the last field is the real client (loadtest/replay.py groups uploads by it)
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" "%({x-forwarded-for}i)s"'
 loglevel = "info"
 preload_app = False  # Must be False to allow logger reinitialization in workers
 enable_stdio_inheritance = True
 daemon = False
 pidfile = "$PROJECT_DIR/cloudsynk_gunicorn.pid"
+# Workers queue log records and forward them to log_server.py, the only writer of log/cloudsynk.log
+raw_env = ["CLOUDSYNK_LOG_SOCKET=127.0.0.1:9020"]
+_log_server = None
+
+def on_starting(server):
+    """Start the single log writer before any worker is forked"""
+    global _log_server
+    import subprocess, sys
+    _log_server = subprocess.Popen([sys.executable, "$PROJECT_DIR/log_server.py", "--port", "9020"], cwd="$PROJECT_DIR")
+
+def on_exit(server):
+    if _log_server is not None:
+        _log_server.terminate()
 
 def post_worker_init(worker):
-    """Called after a worker has been forked - reinitialize logger for this worker"""
-    from logger import Logger
-    # Reset singleton and reinitialize logger for this worker process
-    Logger._instance = None
-    Logger.init_logger()
-    # Test log to confirm worker initialized
+    """Called after a worker has loaded the app; its logger listener is already running"""
     from storage_webapp import logger, severity
-    logger.info(f"Worker {worker.pid} initialized with logger")
+    logger.log(severity['INFO'], "Worker %s initialized with logger", worker.pid)
 EOF
 
 # Create systemd service for CloudSynk
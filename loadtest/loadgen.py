@@ -0,0 +1,311 @@
+"""
+Concurrent load generator for a running CloudSynk server.
+Usage: python -m loadtest.loadgen --base-url http://127.0.0.1:8000 [--host-header cloudsynk.org.in] [--users 20] [--user-prefix synth] [--user-count 1000] [--password bench-pw] [--duration 60] [--iterations 0] [--mix upload=1,download=4,home=4,delete=1] [--file-sizes 256K:6,4M:3,64M:1] [--chunk-size 4M] [--range-ratio 0.2] [--think-ms 0] [--seed 0] [--output FILE]
+
+Each virtual user logs in with its own session and loops over weighted actions on
+the real endpoints: chunked upload (/chunkedUpload/), download (/downloadFile/<id>/,
+full or ranged), home (/home/) and delete (/deleteFile/<id>/, only of files the
+virtual user uploaded itself). Latency percentiles, status codes, request rate and
+throughput are reported per endpoint. Uploads are reported both per chunk
+(upload_chunk) and per file (upload).
+
+Typical capacity-planning run against the local storage backend:
+
+    export AZURE_STORAGE_BACKEND=local LOCAL_BLOB_ROOT=/tmp/cloudsynk-blobs
+    python manage.py generate_dataset --users 1000 --storage sparse --max-blob-size 64M
+    gunicorn -w 4 -b 127.0.0.1:8000 storage_webapp.wsgi
+    python -m loadtest.loadgen --base-url http://127.0.0.1:8000 --host-header cloudsynk.org.in --users 50
+
+Repeat with different gunicorn -w values and compare the reports. Only needs the
+requests package on the load-generating machine.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+import requests
+
+from benchmarks.common import parse_list, parse_size, percentiles
+
+ACTIONS = ('upload', 'download', 'home', 'delete')
+DEFAULT_MIX = 'upload=1,download=4,home=4,delete=1'
+DEFAULT_FILE_SIZES = '256K:6,4M:3,64M:1'
+READ_SIZE = 1024 * 1024
+MIB = 1024 * 1024
+
+
+def parse_weights(text, parse_key=str, separator='='):
+    """'upload=1,home=4' -> {'upload': 1.0, 'home': 4.0}; a key without a weight counts 1"""
+    weights = {}
+    for part in parse_list(text, str):
+        key, _, weight = part.partition(separator)
+        weights[parse_key(key.strip())] = float(weight) if weight else 1.0
+    if not weights or any(weight < 0 for weight in weights.values()) or not sum(weights.values()):
+        raise ValueError(f"Invalid weights '{text}'")
+    return weights
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency, status, byte and error counters"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.started = time.perf_counter()
+
+    def record(self, endpoint, latency_ms, status=None, nbytes=0, error=None):
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {'latencies': [], 'statuses': {}, 'bytes': 0, 'errors': 0})
+            entry['latencies'].append(latency_ms)
+            entry['bytes'] += nbytes
+            key = str(status) if status is not None else 'exception'
+            entry['statuses'][key] = entry['statuses'].get(key, 0) + 1
+            if error is not None or status is None or status >= 400:
+                entry['errors'] += 1
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            return {
+                endpoint: {
+                    'requests': len(entry['latencies']),
+                    'errors': entry['errors'],
+                    'statuses': dict(entry['statuses']),
+                    'latency_ms': percentiles(entry['latencies']),
+                    'requests_per_s': round(len(entry['latencies']) / elapsed, 2) if elapsed else None,
+                    'bytes': entry['bytes'],
+                    'throughput_mib_s': round(entry['bytes'] / MIB / elapsed, 2) if elapsed else None,
+                }
+                for endpoint, entry in sorted(self._endpoints.items())
+            }
+
+
+class VirtualUser:
+    """One logged-in session driving the CloudSynk endpoints"""
+    def __init__(self, base_url, username, password, recorder, rng, host_header=None, chunk_size=4 * MIB,
+                 file_sizes=None, range_ratio=0.0, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.recorder = recorder
+        self.rng = rng
+        self.chunk_size = chunk_size
+        self.file_sizes = file_sizes or {MIB: 1.0}
+        self.range_ratio = range_ratio
+        self.timeout = timeout
+        self.own_blobs = []  # uploaded by this virtual user; the only ones it deletes
+        self.known_blobs = []  # (blob_id, size) seen on the home page
+        self.session = requests.Session()
+        self.session.headers['Accept'] = 'application/json'
+        if host_header:
+            self.session.headers['Host'] = host_header
+        self._payload = os.urandom(chunk_size)
+
+    def _request(self, endpoint, method, path, stream=False, **kwargs):
+        """Send one request and record it; returns the response or None on a connection error"""
+        headers = kwargs.pop('headers', {})
+        csrf_token = self.session.cookies.get('csrftoken')
+        if csrf_token and method != 'GET':
+            headers['X-CSRFToken'] = csrf_token
+        started = time.perf_counter()
+        try:
+            resp = self.session.request(method, self.base_url + path, headers=headers, stream=stream,
+                                        timeout=self.timeout, **kwargs)
+            received = 0
+            if stream:
+                for block in resp.iter_content(READ_SIZE):
+                    received += len(block)
+            else:
+                received = len(resp.content)
+        except requests.RequestException as e:
+            self.recorder.record(endpoint, (time.perf_counter() - started) * 1000, error=e)
+            return None
+        self.recorder.record(endpoint, (time.perf_counter() - started) * 1000, resp.status_code,
+                             received if stream else 0)
+        return resp
+
+    def login(self):
+        resp = self._request('login', 'POST', '/login/', json={'username': self.username, 'password': self.password})
+        if resp is None or resp.status_code != 200:
+            raise RuntimeError(f"Login failed for {self.username}: {resp.status_code if resp is not None else 'no response'}")
+
+    def home(self):
+        resp = self._request('home', 'GET', '/home/')
+        if resp is not None and resp.status_code == 200:
+            self.known_blobs = [(blob['blob_id'], blob['blob_size']) for blob in resp.json().get('blobs', [])]
+
+    def list_files(self):
+        self._request('list_files', 'GET', '/listFiles/')
+
+    def upload(self, chunk_sizes=None):
+        """Upload one file: a size drawn from file_sizes in chunk_size pieces, or exactly chunk_sizes"""
+        if chunk_sizes is None:
+            size = int(self.rng.choices(list(self.file_sizes), weights=list(self.file_sizes.values()))[0])
+            chunk_sizes = [min(self.chunk_size, size - start) for start in range(0, size, self.chunk_size)] or [0]
+        size = sum(chunk_sizes)
+        total_chunks = len(chunk_sizes)
+        upload_id = uuid.uuid4().hex
+        file_name = f'loadgen_{upload_id[:12]}.bin'
+        started = time.perf_counter()
+        resp = None
+        for chunk_index, length in enumerate(chunk_sizes):
+            resp = self._request('upload_chunk', 'POST', '/chunkedUpload/', data={
+                'upload_id': upload_id, 'chunk_index': chunk_index, 'total_chunks': total_chunks,
+                'file_name': file_name, 'total_size': size,
+            }, files={'chunk': ('chunk', self._chunk(length), 'application/octet-stream')})
+            if resp is None or resp.status_code >= 400:
+                self.recorder.record('upload', (time.perf_counter() - started) * 1000,
+                                     resp.status_code if resp is not None else None)
+                return
+        self.recorder.record('upload', (time.perf_counter() - started) * 1000, resp.status_code, size)
+        blob_id = resp.json().get('blob_id')
+        if blob_id:
+            self.own_blobs.append((blob_id, size))
+
+    def _chunk(self, length):
+        if length > len(self._payload):
+            self._payload = os.urandom(length)
+        return self._payload[:length]
+
+    def download(self, nbytes=None):
+        """
+        Download a known blob. With nbytes, pick a blob at least that large and request
+        only nbytes of it when it is larger; otherwise a share of range_ratio downloads
+        are chunk_size Range requests.
+        """
+        candidates = self.own_blobs + self.known_blobs
+        if nbytes is not None:
+            candidates = [blob for blob in candidates if blob[1] >= nbytes] or candidates
+        if not candidates:
+            return self.home()
+        blob_id, size = self.rng.choice(candidates)
+        length = nbytes if nbytes is not None else (
+            self.chunk_size if self.rng.random() < self.range_ratio else size)
+        headers = {}
+        endpoint = 'download'
+        if 0 < length < size:
+            start = self.rng.randrange(0, size - length + 1)
+            headers['Range'] = f'bytes={start}-{start + length - 1}'
+            endpoint = 'download_range'
+        self._request(endpoint, 'POST', f'/downloadFile/{blob_id}/', stream=True, headers=headers)
+
+    def delete(self):
+        if not self.own_blobs:
+            return self.upload()
+        blob_id, _ = self.own_blobs.pop(self.rng.randrange(len(self.own_blobs)))
+        self._request('delete', 'POST', f'/deleteFile/{blob_id}/')
+
+    def cleanup(self):
+        """Delete whatever this virtual user uploaded so repeated runs start from the same dataset"""
+        while self.own_blobs:
+            blob_id, _ = self.own_blobs.pop()
+            self._request('cleanup_delete', 'POST', f'/deleteFile/{blob_id}/')
+
+
+def run(options):
+    """Run the load test described by the parsed options; returns the report dict"""
+    mix = parse_weights(options.mix)
+    unknown = set(mix) - set(ACTIONS)
+    if unknown:
+        raise ValueError(f"Unknown actions in --mix: {', '.join(sorted(unknown))}")
+    file_sizes = parse_weights(options.file_sizes, parse_size, separator=':')
+    chunk_size = parse_size(options.chunk_size)
+    recorder = Recorder()
+    deadline = time.monotonic() + options.duration if options.duration else None
+    errors = []
+
+    def worker(index):
+        rng = random.Random(f'{options.seed}-{index}')
+        user = VirtualUser(
+            options.base_url, f'{options.user_prefix}{index % options.user_count}', options.password, recorder, rng,
+            host_header=options.host_header, chunk_size=chunk_size, file_sizes=file_sizes,
+            range_ratio=options.range_ratio,
+        )
+        try:
+            user.login()
+            user.home()
+            iteration = 0
+            while (deadline is None or time.monotonic() < deadline) and (
+                    not options.iterations or iteration < options.iterations):
+                action = rng.choices(list(mix), weights=list(mix.values()))[0]
+                getattr(user, action)()
+                iteration += 1
+                if options.think_ms:
+                    time.sleep(options.think_ms / 1000.0)
+            if not options.keep_uploads:
+                user.cleanup()
+        except Exception as e:  # reported after join; one broken virtual user should not stop the rest
+            errors.append(f"{user.username}: {e}")
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(options.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        'created_at': time.strftime('%Y%m%d-%H%M%S'),
+        'params': {key: value for key, value in vars(options).items() if key != 'password'},
+        'wall_seconds': round(time.perf_counter() - recorder.started, 3),
+        'virtual_user_errors': errors,
+        'endpoints': recorder.summary(),
+    }
+
+
+def format_report(report):
+    lines = [f"{'endpoint':<16}{'reqs':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'MiB/s':>9}"]
+    for endpoint, stats in report['endpoints'].items():
+        latency = stats['latency_ms']
+        lines.append(
+            f"{endpoint:<16}{stats['requests']:>8}{stats['errors']:>8}{stats['requests_per_s']:>9}"
+            f"{latency['p50']:>10}{latency['p90']:>10}{latency['p99']:>10}{stats['throughput_mib_s']:>9}"
+        )
+    for error in report['virtual_user_errors']:
+        lines.append(f"virtual user failed: {error}")
+    return '\n'.join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Drive a running CloudSynk server with concurrent virtual users')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--host-header', default=None, help='Host header to send (must be in ALLOWED_HOSTS)')
+    parser.add_argument('--users', type=int, default=20, help='Concurrent virtual users')
+    parser.add_argument('--user-prefix', default='synth', help='Account names are <prefix><n> (see generate_dataset)')
+    parser.add_argument('--user-count', type=int, default=1000, help='Accounts available; virtual users wrap around')
+    parser.add_argument('--password', default='bench-pw')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run (0: until --iterations)')
+    parser.add_argument('--iterations', type=int, default=0, help='Actions per virtual user (0: until --duration)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Weighted actions: upload, download, home, delete')
+    parser.add_argument('--file-sizes', default=DEFAULT_FILE_SIZES, help='Weighted upload sizes, size:weight')
+    parser.add_argument('--chunk-size', default='4M', help='Upload chunk size (and ranged download size)')
+    parser.add_argument('--range-ratio', type=float, default=0.2, help='Fraction of downloads sent as Range requests')
+    parser.add_argument('--think-ms', type=int, default=0, help='Pause between actions of one virtual user')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keep-uploads', action='store_true', help='Do not delete uploaded files at the end')
+    parser.add_argument('--output', default=None, help='Also write the report as JSON to this file')
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    if not options.duration and not options.iterations:
+        print('One of --duration or --iterations must be non-zero', file=sys.stderr)
+        return 2
+    try:
+        report = run(options)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    print(format_report(report))
+    if options.output:
+        with open(options.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    return 1 if report['virtual_user_errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
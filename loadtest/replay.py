@@ -0,0 +1,406 @@
+"""
+Replay production traffic against a staging CloudSynk server.
+Usage:
+    python -m loadtest.replay build --access-log gunicorn_access.log [--app-log log/cloudsynk.log] [--chunk-size 4M] --output workload.json
+    python -m loadtest.replay run workload.json --base-url http://staging:8000 [--host-header cloudsynk.org.in] [--speedup 10] [--users 20] [--user-prefix synth] [--user-count 1000] [--password bench-pw] [--max-events 0] [--keep-uploads] [--output FILE]
+
+build turns the gunicorn access log (archived by deploy_production.sh) and the
+application log into a workload file: one event per request with its offset in
+seconds, so the request mix, the arrival pattern (bursts included) and the
+download sizes are those of real traffic.
+
+Uploads come from the application log when it is given. The per-chunk "Staged
+block" records are DEBUG in both log formats and capped per second by the default
+LOG_RATE_LIMITS, so they usually cover only some chunks of an upload. JSON finalize
+records (CLOUDSYNK_LOG_FORMAT=json, INFO) carry the block count and total size and
+win whenever the chunk records disagree with them; text finalize records do not,
+so text logs replay complete sizes only for uploads logged with the rate limit off. Without an application log, uploads are rebuilt from the
+/chunkedUpload/ requests of each client (X-Forwarded-For address and user agent),
+with --chunk-size per chunk.
+Text application logs carry local time: run build with the server's TZ.
+
+run schedules every event at offset / --speedup seconds on a pool of --users
+logged-in virtual users (loadtest.loadgen.VirtualUser, accounts from
+generate_dataset) and reports per-endpoint latency plus the schedule lag, i.e. how
+far behind the recorded timing the replay fell. A lag that keeps growing means the
+server (or the pool) cannot sustain the traffic at that speedup.
+"""
+import argparse
+import base64
+import binascii
+import json
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.common import parse_size, percentiles
+from loadtest.loadgen import MIB, Recorder, VirtualUser, format_report
+
+WORKLOAD_VERSION = 1
+REPLAY_ACTIONS = ('upload', 'download', 'home', 'list_files', 'delete')
+
+# %(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" "%({x-forwarded-for}i)s" (see deploy_production.sh);
+# logs written before the X-Forwarded-For field was added end at the user agent
+ACCESS_LINE = re.compile(
+    r'^(?P<host>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) (?P<bytes>\S+)'
+    r'(?: "[^"]*" "(?P<agent>[^"]*)"(?: "(?P<forwarded>[^"]*)")?)?'
+)
+ACCESS_TIME_FORMAT = '%d/%b/%Y:%H:%M:%S %z'
+# logger.LOG_FORMAT: asctime::[LEVEL]::[module.py]::[func::line]::message
+APP_TEXT_LINE = re.compile(r'^(?P<time>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3})::\[\w+\]::\[[^\]]*\]::\[[^\]]*\]::(?P<msg>.*)$')
+APP_TIME_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+STAGED_BLOCK = re.compile(r'^Staged block (?P<block_id>\S+) for (?P<upload_id>\S+), size=(?P<size>\d+)')
+FINALIZED = re.compile(r'^STREAMING UPLOAD: Successfully finalized (?P<upload_id>\S+), blob_id=')
+
+ROUTES = (
+    ('POST', '/chunkedUpload/', 'upload_chunk'),
+    ('POST', '/downloadFile/', 'download'),
+    ('POST', '/deleteFile/', 'delete'),
+    ('GET', '/listFiles/', 'list_files'),
+    ('GET', '/home/', 'home'),
+    ('POST', '/login/', 'login'),
+)
+
+
+def classify(method, path):
+    """Replay action of an access-log request, 'other' for the rest and None for static files"""
+    path = path.split('?', 1)[0]
+    if path.startswith(('/static/', '/media/')) or path == '/favicon.ico':
+        return None
+    for route_method, prefix, action in ROUTES:
+        if method == route_method and path.startswith(prefix):
+            return action
+    return 'other'
+
+
+def parse_access_log(lines):
+    """
+    Yield {'t', 'host', 'client', 'action', 'status', 'bytes'} for every request line that is not a static file.
+
+    client identifies the browser: the first X-Forwarded-For address (host is nginx behind
+    the proxy) and the user agent.
+    """
+    for line in lines:
+        match = ACCESS_LINE.match(line)
+        if not match:
+            continue
+        action = classify(match['method'], match['path'])
+        if action is None:
+            continue
+        forwarded = (match['forwarded'] or '').split(',')[0].strip()
+        yield {
+            't': datetime.strptime(match['time'], ACCESS_TIME_FORMAT).timestamp(),
+            'host': match['host'],
+            'client': (forwarded if forwarded not in ('', '-') else match['host'], match['agent'] or ''),
+            'action': action,
+            'status': int(match['status']),
+            'bytes': int(match['bytes']) if match['bytes'].isdigit() else None,
+        }
+
+
+def _chunk_index(block_id):
+    """Container names blocks base64('block-%08d' % chunk_index)"""
+    try:
+        return int(base64.b64decode(block_id).decode().rpartition('-')[2])
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def parse_app_log(lines):
+    """
+    Collect uploads from text or JSON application log lines.
+
+    Returns:
+        dict: upload_id -> {'t': first seen, 'chunks': {chunk_index: size},
+              'finalized': bool, 'bytes': int | None, 'blocks': int | None}
+    """
+    uploads = {}
+
+    def upload(upload_id, t):
+        entry = uploads.setdefault(upload_id, {'t': t, 'chunks': {}, 'finalized': False, 'bytes': None, 'blocks': None})
+        entry['t'] = min(entry['t'], t)
+        return entry
+
+    for line in lines:
+        line = line.strip()
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+                t = datetime.fromisoformat(record['ts']).timestamp()
+            except (ValueError, KeyError, TypeError):
+                continue
+            operation = record.get('operation')
+            if operation == 'stage_block' and record.get('upload_id'):
+                entry = upload(record['upload_id'], t - (record.get('duration_ms') or 0) / 1000.0)
+                entry['chunks'][record.get('chunk_index', len(entry['chunks']))] = int(record.get('bytes') or 0)
+            elif operation == 'upload' and record.get('upload_id'):
+                entry = upload(record['upload_id'], t - (record.get('duration_ms') or 0) / 1000.0)
+                entry.update(finalized=True, bytes=record.get('bytes'), blocks=record.get('blocks'))
+            continue
+        match = APP_TEXT_LINE.match(line)
+        if not match:
+            continue
+        message = match['msg']
+        staged = STAGED_BLOCK.match(message)
+        finalized = FINALIZED.match(message) if staged is None else None
+        if staged is None and finalized is None:
+            continue
+        t = datetime.strptime(match['time'], APP_TIME_FORMAT).timestamp()
+        if staged:
+            entry = upload(staged['upload_id'], t)
+            index = _chunk_index(staged['block_id'])
+            entry['chunks'][index if index is not None else len(entry['chunks'])] = int(staged['size'])
+        else:
+            upload(finalized['upload_id'], t)['finalized'] = True
+    return uploads
+
+
+def _upload_chunk_sizes(entry):
+    """
+    Chunk sizes of one upload. Chunk records are sampled (DEBUG, rate limited), so the
+    finalize record's totals take precedence when the two disagree.
+    """
+    chunks = [entry['chunks'][index] for index in sorted(entry['chunks'])]
+    total, blocks = entry['bytes'], entry['blocks']
+    if not (total and blocks) or (len(chunks) == blocks and sum(chunks) == total):
+        return chunks or None
+    # Every chunk but the last is full-size: take that size from the sampled chunks when it fits
+    size = max(chunks, default=0)
+    if not size * (blocks - 1) < total <= size * blocks:
+        size = -(-total // blocks)
+    return [size] * (blocks - 1) + [total - size * (blocks - 1)]
+
+
+def _uploads_from_access_log(requests, chunk_size):
+    """
+    Without an application log: the chunk POSTs of one client up to a 201 form one upload.
+
+    Needs the X-Forwarded-For field: in older logs every proxied request shows nginx's
+    address, so concurrent uploads of different users would merge into one.
+    """
+    pending = {}
+    for request in requests:
+        if request['action'] != 'upload_chunk' or request['status'] >= 400:
+            continue
+        started = pending.setdefault(request['client'], [])
+        started.append(request['t'])
+        if request['status'] == 201:
+            del pending[request['client']]
+            yield {'t': started[0], 'action': 'upload', 'chunk_sizes': [chunk_size] * len(started)}
+
+
+def build_workload(access_lines, app_lines=None, chunk_size=4 * MIB):
+    """
+    Build a replayable workload from access-log lines and, optionally, application-log lines.
+
+    Returns:
+        dict: {'version', 'duration_s', 'events': [{'t', 'action', ...}], 'summary'}
+    """
+    requests = list(parse_access_log(access_lines))
+    events = []
+    for request in requests:
+        if request['action'] in ('download', 'home', 'list_files', 'delete') and request['status'] < 400:
+            event = {'t': request['t'], 'action': request['action']}
+            if request['action'] == 'download' and request['bytes']:
+                event['bytes'] = request['bytes']
+            events.append(event)
+
+    abandoned = 0
+    if app_lines is not None:
+        for entry in parse_app_log(app_lines).values():
+            chunk_sizes = _upload_chunk_sizes(entry)
+            if chunk_sizes:
+                abandoned += not entry['finalized']
+                events.append({'t': entry['t'], 'action': 'upload', 'chunk_sizes': chunk_sizes})
+    else:
+        events.extend(_uploads_from_access_log(requests, chunk_size))
+
+    events.sort(key=lambda event: event['t'])
+    start = events[0]['t'] if events else 0
+    for event in events:
+        event['t'] = round(event['t'] - start, 3)
+    duration = events[-1]['t'] if events else 0
+    return {
+        'version': WORKLOAD_VERSION,
+        'created_at': time.strftime('%Y%m%d-%H%M%S'),
+        'duration_s': duration,
+        'events': events,
+        'summary': summarize(events, duration, requests, abandoned),
+    }
+
+
+def summarize(events, duration, requests=(), abandoned_uploads=0):
+    """Request mix, rates and the upload/download size shape of a workload"""
+    mix = {}
+    for event in events:
+        mix[event['action']] = mix.get(event['action'], 0) + 1
+    uploads = [event['chunk_sizes'] for event in events if event['action'] == 'upload']
+    other = sum(1 for request in requests if request['action'] == 'other')
+    return {
+        'events': len(events),
+        'events_per_s': round(len(events) / duration, 3) if duration else None,
+        'mix': {action: {'count': count, 'share': round(count / len(events), 4)} for action, count in sorted(mix.items())},
+        'chunks_per_upload': percentiles([len(sizes) for sizes in uploads]),
+        'chunk_bytes': percentiles([size for sizes in uploads for size in sizes]),
+        'upload_bytes': percentiles([sum(sizes) for sizes in uploads]),
+        'download_bytes': percentiles([event['bytes'] for event in events if event.get('bytes')]),
+        'abandoned_uploads': abandoned_uploads,
+        'unreplayed_requests': other,
+    }
+
+
+def format_summary(summary):
+    lines = [f"{summary['events']} events, {summary['events_per_s']} per second"]
+    for action, stats in summary['mix'].items():
+        lines.append(f"  {action:<12}{stats['count']:>8}{stats['share'] * 100:>8.1f}%")
+    for key in ('chunks_per_upload', 'chunk_bytes', 'upload_bytes', 'download_bytes'):
+        stats = summary[key]
+        lines.append(f"  {key:<18} p50={stats['p50']} p90={stats['p90']} p99={stats['p99']} max={stats['max']}")
+    lines.append(f"  abandoned uploads: {summary['abandoned_uploads']}, "
+                 f"requests not replayed: {summary['unreplayed_requests']}")
+    return '\n'.join(lines)
+
+
+def load_workload(path):
+    with open(path) as handle:
+        workload = json.load(handle)
+    if workload.get('version') != WORKLOAD_VERSION:
+        raise ValueError(f"Unsupported workload version {workload.get('version')!r} in {path}")
+    return workload
+
+
+def replay(workload, options):
+    """Replay workload events against options.base_url; returns the report dict"""
+    if options.speedup <= 0:
+        raise ValueError('--speedup must be positive')
+    events = workload['events'][:options.max_events or None]
+    recorder = Recorder()
+    local = threading.local()
+    users = []
+    users_lock = threading.Lock()
+    lags = []
+    skipped = {}
+    errors = []
+
+    def skip(action):
+        with users_lock:
+            skipped[action] = skipped.get(action, 0) + 1
+
+    def virtual_user():
+        user = getattr(local, 'user', None)
+        if user is None:
+            with users_lock:
+                index = len(users)
+                user = VirtualUser(
+                    options.base_url, f'{options.user_prefix}{index % options.user_count}', options.password,
+                    recorder, random.Random(f'{options.seed}-{index}'), host_header=options.host_header,
+                )
+                users.append(user)
+            user.login()
+            user.home()
+            local.user = user
+        return user
+
+    def execute(event, due):
+        lags.append((time.monotonic() - due) * 1000)
+        try:
+            user = virtual_user()
+            action = event['action']
+            if action == 'upload':
+                user.upload(event['chunk_sizes'])
+            elif action == 'download':
+                user.download(event.get('bytes'))
+            elif action == 'delete' and not user.own_blobs:
+                # Recorded deletes target files this replay never uploaded
+                skip(action)
+            else:
+                getattr(user, action)()
+        except Exception as e:  # reported at the end; one failing event should not stop the replay
+            errors.append(f"{event['action']} at {event['t']}s: {e}")
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=options.users) as pool:
+        for event in events:
+            if event['action'] not in REPLAY_ACTIONS:
+                skip(event['action'])
+                continue
+            due = started + event['t'] / options.speedup
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(execute, event, due)
+    if not options.keep_uploads:
+        for user in users:
+            user.cleanup()
+
+    return {
+        'created_at': time.strftime('%Y%m%d-%H%M%S'),
+        'params': {key: value for key, value in vars(options).items() if key != 'password'},
+        'recorded_seconds': workload['duration_s'],
+        'wall_seconds': round(time.monotonic() - started, 3),
+        'events': len(events),
+        'schedule_lag_ms': percentiles(lags),
+        'skipped': skipped,
+        'virtual_user_errors': errors[:100],
+        'endpoints': recorder.summary(),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Build a workload from production logs and replay it against staging')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Parse access and application logs into a workload file')
+    build.add_argument('--access-log', required=True, help='gunicorn access log')
+    build.add_argument('--app-log', default=None, help='log/cloudsynk.log, text or JSON lines')
+    build.add_argument('--chunk-size', default='4M', help='Chunk size assumed when the app log has no chunk records')
+    build.add_argument('--output', required=True, help='Workload JSON file to write')
+
+    run = commands.add_parser('run', help='Replay a workload file against a running server')
+    run.add_argument('workload', help='Workload JSON file written by build')
+    run.add_argument('--base-url', default='http://127.0.0.1:8000')
+    run.add_argument('--host-header', default=None, help='Host header to send (must be in ALLOWED_HOSTS)')
+    run.add_argument('--speedup', type=float, default=1.0, help='Time compression: 10 replays an hour in 6 minutes')
+    run.add_argument('--users', type=int, default=20, help='Concurrent virtual users serving the events')
+    run.add_argument('--user-prefix', default='synth', help='Account names are <prefix><n> (see generate_dataset)')
+    run.add_argument('--user-count', type=int, default=1000, help='Accounts available; virtual users wrap around')
+    run.add_argument('--password', default='bench-pw')
+    run.add_argument('--max-events', type=int, default=0, help='Replay only the first N events (0: all)')
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--keep-uploads', action='store_true', help='Do not delete uploaded files at the end')
+    run.add_argument('--output', default=None, help='Also write the report as JSON to this file')
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    try:
+        if options.command == 'build':
+            with open(options.access_log, errors='replace') as access:
+                if options.app_log:
+                    with open(options.app_log, errors='replace') as app:
+                        workload = build_workload(access, app, parse_size(options.chunk_size))
+                else:
+                    workload = build_workload(access, chunk_size=parse_size(options.chunk_size))
+            with open(options.output, 'w') as handle:
+                json.dump(workload, handle)
+            print(format_summary(workload['summary']))
+            return 0
+        report = replay(load_workload(options.workload), options)
+    except (OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    print(format_report(report))
+    print(f"schedule lag ms: {report['schedule_lag_ms']}; skipped: {report['skipped'] or 'none'}")
+    if options.output:
+        with open(options.output, 'w') as handle:
+            json.dump(report, handle, indent=2)
+    return 1 if report['virtual_user_errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
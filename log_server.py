@@ -0,0 +1,74 @@
+"""
+Single writer for log/cloudsynk.log on one host.
+
+Web workers started with CLOUDSYNK_LOG_SOCKET=127.0.0.1:9020 forward their log
+records here over a local TCP socket (logging.handlers.SocketHandler). This process
+formats them and owns the RotatingFileHandler, so rotation happens in exactly one
+place instead of racing between gunicorn workers. CLOUDSYNK_LOG_FORMAT=json switches
+the file to JSON lines, as it does for workers writing the file directly.
+Usage: python log_server.py [--host 127.0.0.1] [--port 9020]
+
+Records arrive pickled, so only ever bind to a loopback address.
+"""
+import argparse
+import logging
+import pickle
+import socketserver
+import struct
+from logging.handlers import RotatingFileHandler
+
+from logger import Logger, build_formatter
+
+DEFAULT_PORT = 9020
+
+
+class LogRecordStreamHandler(socketserver.StreamRequestHandler):
+    """Read length-prefixed pickled LogRecords from one worker connection"""
+
+    def handle(self):
+        while True:
+            header = self.rfile.read(4)
+            if len(header) < 4:
+                return
+            length = struct.unpack('>L', header)[0]
+            payload = self.rfile.read(length)
+            if len(payload) < length:
+                return
+            record = logging.makeLogRecord(pickle.loads(payload))
+            self.server.handler.handle(record)
+
+
+class LogRecordServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host, port, handler):
+        super().__init__((host, port), LogRecordStreamHandler)
+        # Handler.handle() takes the handler lock, so connection threads write one record at a time
+        self.handler = handler
+
+
+def build_file_handler():
+    handler = RotatingFileHandler(Logger.get_log_file_name(), maxBytes=50*1024*1024, backupCount=10)
+    handler.setFormatter(build_formatter())
+    return handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Receive CloudSynk worker log records and write the rotating log file')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    server = LogRecordServer(args.host, args.port, build_file_handler())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,231 @@
 import logging
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener, SocketHandler
+from datetime import datetime, timezone
+import atexit
+import contextvars
+import copy
 import inspect
+import json
 import os
+import queue
 import threading
 # import sys
+
+LOG_FORMAT = '%(asctime)s::[%(levelname)s]::[%(module)s.py]::[%(funcName)s::%(lineno)d]::%(message)s'
+
+# Set per request by main.middleware.RequestIDMiddleware; holds request_id and user_id
+request_context = contextvars.ContextVar('cloudsynk_log_context', default=None)
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp request_id and user_id on records unless the caller passed them in extra"""
+    def filter(self, record):
+        context = request_context.get()
+        if not hasattr(record, 'request_id'):
+            record.request_id = context.request_id if context is not None else None
+        if not hasattr(record, 'user_id'):
+            record.user_id = context.user_id if context is not None else None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, source, message, request_id, user_id
+    and every field passed through extra (operation, upload_id, blob_id, bytes,
+    duration_ms, ...).
+    """
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'module': record.module,
+            'func': record.funcName,
+            'line': record.lineno,
+            'pid': record.process,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def build_formatter():
+    """JSON lines when CLOUDSYNK_LOG_FORMAT=json, otherwise the classic text layout"""
+    if os.environ.get('CLOUDSYNK_LOG_FORMAT', 'text').lower() == 'json':
+        return JsonFormatter()
+    return logging.Formatter(LOG_FORMAT)
+
+
+class _EnqueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock QueueHandler runs the full Formatter on the calling thread so records
+    can cross process boundaries. Our queue is in-process, so only the message is
+    merged here (to freeze mutable args) and timestamps, layout and I/O happen on
+    the listener.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class LogControlFilter(logging.Filter):
+    """
+    Per-module level thresholds and per-call-site rate limits, applied before enqueueing.
+
+    module_levels maps record.module (e.g. 'Container') to a minimum level; other
+    modules use default_level. rate_limits maps 'module.funcName' or 'module' to the
+    number of DEBUG records one call site may emit per second; the rest are dropped
+    and counted on the next record that gets through. INFO and above are never sampled.
+    """
+    def __init__(self, default_level=logging.DEBUG):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = {}
+        self.rate_limits = {}
+        self._windows = {}  # (pathname, lineno) -> [window start, emitted, suppressed]
+        self._lock = threading.Lock()
+
+    def configure(self, default_level, module_levels=None, rate_limits=None):
+        self.default_level = default_level
+        self.module_levels = dict(module_levels or {})
+        self.rate_limits = dict(rate_limits or {})
+        with self._lock:
+            self._windows.clear()
+
+    def filter(self, record):
+        if record.levelno < self.module_levels.get(record.module, self.default_level):
+            return False
+        if record.levelno > logging.DEBUG or not self.rate_limits:
+            return True
+        limit = self.rate_limits.get(f"{record.module}.{record.funcName}", self.rate_limits.get(record.module))
+        if limit is None:
+            return True
+
+        key = (record.pathname, record.lineno)
+        suppressed = 0
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or record.created - window[0] >= 1.0:
+                suppressed = window[2] if window is not None else 0
+                window = self._windows[key] = [record.created, 0, 0]
+            if window[1] >= limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+        if suppressed:
+            record.msg = f"{record.msg} [+{suppressed} similar suppressed]"
+        return True
+
+
 class Logger:
+    """
+    Process-wide 'cloudsynk' logger.
+
+    Callers only put records on an in-memory queue; a QueueListener thread does the
+    formatting and writing. When CLOUDSYNK_LOG_SOCKET ("host:port") is set, the
+    listener forwards records to the host's log_server.py, the single process that
+    owns and rotates log/cloudsynk.log, so workers never race on rotation. Without
+    it the listener writes the rotating file itself (development, tests, one worker).
+    CLOUDSYNK_LOG_FORMAT=json writes JSON lines (see JsonFormatter) instead of text.
+
+    CLOUDSYNK_LOG_LEVEL (default DEBUG) sets the logger level; records below it are
+    dropped by logger.log before any message formatting, so pass values as %s args
+    rather than pre-formatting the string on hot paths. Logger.configure changes the
+    levels and rate limits at runtime (driven by main/log_control.py).
+    """
     _instance = None
     _lock = threading.Lock()
-    
+
     @classmethod
     def init_logger(cls):
         with cls._lock:
             if cls._instance is None:
                 cls._instance = cls()
         return cls._instance
+
+    @classmethod
+    def configure(cls, default_level, module_levels=None, rate_limits=None):
+        """Apply runtime levels; the logger level drops to the most verbose one so module overrides can pass"""
+        instance = cls.init_logger()
+        module_levels = module_levels or {}
+        instance.control.configure(default_level, module_levels, rate_limits)
+        instance.logger.setLevel(min([default_level, *module_levels.values()]))
+
+    @classmethod
+    def shutdown(cls):
+        """Stop the listener after draining queued records"""
+        instance = cls._instance
+        if instance is not None and getattr(instance, 'listener', None) is not None:
+            instance.listener.stop()
+            instance.listener = None
+
     def __init__(self):
         # Prevent re-initialization if logger already exists
         if hasattr(self, 'logger'):
             return
-            
+
         self.logger = logging.getLogger('cloudsynk')
-        self.logger.setLevel(logging.DEBUG)
-        
+        self.logger.setLevel(os.environ.get('CLOUDSYNK_LOG_LEVEL', 'DEBUG').upper())
+        self.listener = None
+        self.control = LogControlFilter(self.logger.level)
+
         # Prevent duplicate handlers if logger already has handlers
         if self.logger.handlers:
             return
-            
-        formatter = logging.Formatter('%(asctime)s::[%(levelname)s]::[%(module)s.py]::[%(funcName)s::%(lineno)d]::%(message)s')
-        
+
+        formatter = logging.Formatter(LOG_FORMAT)
+
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.ERROR)
         console_handler.setFormatter(formatter)
 
-        # Use fixed log file name for continuous logging
-        file_handler = RotatingFileHandler(self.__get_log_file_name(), maxBytes=50*1024*1024, backupCount=10)
-        file_handler.setLevel(logging.DEBUG)
-        file_handler.setFormatter(formatter)
+        log_socket = os.environ.get('CLOUDSYNK_LOG_SOCKET')
+        if log_socket:
+            host, port = log_socket.rsplit(':', 1)
+            # log_server.py applies the formatter; records are pickled as-is
+            sink = SocketHandler(host, int(port))
+        else:
+            # Use fixed log file name for continuous logging
+            sink = RotatingFileHandler(self.get_log_file_name(), maxBytes=50*1024*1024, backupCount=10)
+            sink.setFormatter(build_formatter())
+        sink.setLevel(logging.DEBUG)
+
+        self.sinks = (console_handler, sink)
+        self.queue_handler = _EnqueueHandler(queue.SimpleQueue())
+        self.queue_handler.addFilter(self.control)
+        self.queue_handler.addFilter(RequestContextFilter())
+        self.logger.addHandler(self.queue_handler)
+        self._start_listener()
+        atexit.register(Logger.shutdown)
+        # Threads do not survive fork; give a forked worker its own queue and listener
+        os.register_at_fork(after_in_child=self._restart_in_child)
+
+    def _start_listener(self):
+        self.listener = QueueListener(self.queue_handler.queue, *self.sinks, respect_handler_level=True)
+        self.listener.start()
 
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+    def _restart_in_child(self):
+        self.queue_handler.queue = queue.SimpleQueue()
+        for sink in self.sinks:
+            # Open a connection of our own instead of interleaving on the parent's
+            if isinstance(sink, SocketHandler):
+                sink.sock = None
+        self._start_listener()
 
-    def __get_log_file_name(self):
+    @staticmethod
+    def get_log_file_name():
         # Use absolute path to ensure logs are written to correct location
         # even when Gunicorn changes working directory
         # __file__ is /home/utsingh/workspace/CloudSynk/logger.py
@@ -50,4 +234,4 @@ class Logger:
         log_directory = os.path.join(base_dir, "log")
         os.makedirs(log_directory, exist_ok=True)
         # Use fixed filename for continuous logging across restarts
-        return os.path.join(log_directory, 'cloudsynk.log')
\ No newline at end of file
+        return os.path.join(log_directory, 'cloudsynk.log')
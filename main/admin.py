@@ -1,10 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
 from .models import UserInfo, Blob, Directory, Sharing, LoginOTP, PendingUser
 from .subscription_config import SUBSCRIPTION_VALUES
+from . import storage_summary
 from storage_webapp import logger, severity
 
 
+# Updated only with F() increments by uploads, deletes and downloads; admin edits never write them
+ATOMIC_COUNTER_FIELDS = ('storage_used_bytes', 'storage_reserved_bytes', 'bytes_uploaded_total', 'bytes_downloaded_total')
+
+
 class UserInfoAdmin(admin.ModelAdmin):
     """
     Custom admin interface for UserInfo model.
@@ -69,7 +76,21 @@ class UserInfoAdmin(admin.ModelAdmin):
                     f"based on {new_subscription} subscription."
                 )
         
-        super().save_model(request, obj, form, change)
+        if change:
+            # Usage counters are maintained with atomic increments; never write back the form's copy
+            obj.data_version = F('data_version') + 1
+            with transaction.atomic():
+                obj.save(update_fields=[
+                    f.name for f in obj._meta.concrete_fields
+                    if not f.primary_key and f.name not in ATOMIC_COUNTER_FIELDS
+                ])
+                old_subscription = form.initial.get('subscription_type')
+                if old_subscription and obj.user_id:
+                    storage_summary.record_tier_change(obj.user_id, old_subscription, new_subscription)
+        else:
+            with transaction.atomic():
+                super().save_model(request, obj, form, change)
+                storage_summary.record_user_added(obj.subscription_type)
 
 
 class BlobAdmin(admin.ModelAdmin):
@@ -0,0 +1,159 @@
+"""
+Background execution of bulk admin operations.
+
+A bulk request creates an AdminJob row and returns immediately. The job runs on
+a daemon thread in the worker that accepted it (started after the row is committed),
+works through its items in batches, and records progress plus a heartbeat after
+every batch. A job whose worker died mid-way is picked up again by the
+run_admin_jobs management command; it resumes after the last recorded batch.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction, connection
+from django.db.models import Q
+from django.utils import timezone
+
+from az_intf import api as az_api
+from .models import AdminJob, UserInfo
+from . import storage_summary
+from storage_webapp import logger, severity
+
+JOB_BATCH_SIZE = 25
+MAX_BULK_USERS = 1000
+MAX_JOB_ERRORS = 100  # keep the error log bounded for huge jobs
+
+
+def delete_user_account(target_user):
+    """
+    Tear down a user's container and delete the account (cascades to UserInfo, Blob, ...).
+
+    Returns:
+        bool: True once the account row is gone; container teardown failures are logged
+        but do not stop the deletion, matching the single-user admin endpoint
+    """
+    user_info = UserInfo.objects.filter(user=target_user).first()
+    username = user_info.user_name if user_info else target_user.username
+    if user_info and user_info.container_name and user_info.container_name != "None":
+        try:
+            api_instance = az_api.get_container_instance(username)
+            if api_instance and api_instance.container_delete(user_info):
+                logger.log(severity['INFO'], f"Successfully deleted container '{user_info.container_name}' for user {username}")
+            else:
+                logger.log(severity['WARNING'], f"Failed to delete container '{user_info.container_name}' for user {username}")
+            az_api.del_container_instance(username)
+        except Exception as container_error:
+            logger.log(severity['ERROR'], f"Error deleting container for user {username}: {str(container_error)}")
+
+    with transaction.atomic():
+        # No-op if container_delete already removed UserInfo (and accounted for it)
+        storage_summary.record_user_removed(target_user.id)
+        target_user.delete()
+    return True
+
+
+def create_delete_users_job(requested_by, user_ids):
+    """Queue a DELETE_USERS job for user_ids (the requesting admin is never included)"""
+    user_ids = [uid for uid in dict.fromkeys(user_ids) if uid != requested_by.id]
+    return AdminJob.objects.create(
+        kind="DELETE_USERS",
+        created_by=requested_by,
+        payload={'user_ids': user_ids},
+        total=len(user_ids),
+    )
+
+
+def _claim(job_id, stale_before=None):
+    """Atomically mark a job RUNNING for this worker; returns False if someone else has it"""
+    now = timezone.now()
+    claimable = Q(status="PENDING")
+    if stale_before is not None:
+        claimable |= Q(status="RUNNING", heartbeat__lt=stale_before)
+    return AdminJob.objects.filter(claimable, pk=job_id).update(status="RUNNING", heartbeat=now, started_at=now) == 1
+
+
+def _run_delete_users(job, batch_size):
+    user_ids = job.payload.get('user_ids', [])
+    while job.processed < len(user_ids):
+        batch = user_ids[job.processed:job.processed + batch_size]
+        users = {usr.id: usr for usr in User.objects.filter(id__in=batch)}
+        for user_id in batch:
+            target_user = users.get(user_id)
+            try:
+                if target_user is None:
+                    raise ValueError("User not found")
+                delete_user_account(target_user)
+            except Exception as e:
+                job.failed += 1
+                if len(job.errors) < MAX_JOB_ERRORS:
+                    job.errors.append({'user_id': user_id, 'error': str(e)})
+        job.processed += len(batch)
+        job.heartbeat = timezone.now()
+        job.save(update_fields=['processed', 'failed', 'errors', 'heartbeat'])
+        logger.log(severity['INFO'], f"ADMIN JOB {job.pk}: {job.processed}/{job.total} processed, {job.failed} failed")
+
+
+JOB_HANDLERS = {
+    "DELETE_USERS": _run_delete_users,
+}
+
+
+def run_job(job_id, batch_size=JOB_BATCH_SIZE, stale_before=None):
+    """
+    Claim and execute one job to completion.
+
+    Args:
+        job_id (int): AdminJob primary key
+        batch_size (int): Items processed between progress updates
+        stale_before (datetime): Also reclaim RUNNING jobs whose heartbeat is older than this
+
+    Returns:
+        bool: True if this call ran the job
+    """
+    if not _claim(job_id, stale_before=stale_before):
+        return False
+    job = AdminJob.objects.get(pk=job_id)
+    logger.log(severity['INFO'], f"ADMIN JOB {job.pk}: starting {job.kind} ({job.processed}/{job.total} done)")
+    try:
+        JOB_HANDLERS[job.kind](job, batch_size)
+        job.status = "DONE"
+    except Exception as e:
+        logger.log(severity['ERROR'], f"ADMIN JOB {job.pk}: aborted: {str(e)}")
+        job.status = "FAILED"
+        job.errors.append({'error': str(e)})
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'errors', 'finished_at'])
+    return True
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        # This thread owns its own DB connection; don't leak it
+        connection.close()
+
+
+def start_job(job):
+    """Run job on a background thread once the surrounding transaction commits"""
+    if not getattr(settings, 'ADMIN_JOBS_IN_THREAD', True):
+        return
+    transaction.on_commit(
+        lambda: threading.Thread(target=_run_in_thread, args=(job.pk,), name=f"admin-job-{job.pk}", daemon=True).start()
+    )
+
+
+def serialize_job(job):
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'failed': job.failed,
+        'errors': job.errors,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,83 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main.models import UserInfo, Blob, AdminJob, TierUsageSummary
+from main import storage_summary
+from az_intf import api as az_api
+from az_intf import testing_dummy as az_dummy
+
+
+class AzDummyMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._orig_get = az_api.get_container_instance
+        cls._orig_del = az_api.del_container_instance
+        az_api.get_container_instance = az_dummy.get_container_instance
+        az_api.del_container_instance = az_dummy.del_container_instance
+
+    @classmethod
+    def tearDownClass(cls):
+        az_api.get_container_instance = cls._orig_get
+        az_api.del_container_instance = cls._orig_del
+        super().tearDownClass()
+
+
+@override_settings(ADMIN_JOBS_IN_THREAD=False)
+class BulkAdminTests(AzDummyMixin, TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_user(username='bulkadmin', password='pw123', email='bulkadmin@example.com')
+        UserInfo.objects.create(user=self.admin, user_name='bulkadmin', container_name='bulkadmin-container',
+                                subscription_type='OWNER')
+        self.members = []
+        for i in range(5):
+            usr = User.objects.create_user(username=f'bulk{i}', password='pw123', email=f'bulk{i}@example.com')
+            UserInfo.objects.create(user=usr, user_name=f'bulk{i}', container_name=f'bulk{i}-container',
+                                    subscription_type='STARTER')
+            Blob.objects.create(blob_name='a.zip', blob_size=10, user_id=usr)
+            self.members.append(usr)
+        storage_summary.compact_summaries()
+        self.client.force_login(self.admin)
+
+    def _post(self, name, payload):
+        return self.client.post(reverse(name), data=json.dumps(payload), content_type='application/json')
+
+    def test_bulk_subscription_is_one_update(self):
+        ids = [u.id for u in self.members[:3]]
+        resp = self._post('admin_bulk_subscription', {'user_ids': ids, 'subscription_type': 'PREMIUM'})
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()['updated'], 3)
+        self.assertEqual(UserInfo.objects.filter(subscription_type='PREMIUM').count(), 3)
+
+        tiers = {t.subscription_type: (t.user_count, t.blob_count, t.total_bytes) for t in TierUsageSummary.objects.all()}
+        self.assertEqual(tiers['PREMIUM'], (3, 3, 30))
+        self.assertEqual(tiers['STARTER'], (2, 2, 20))
+
+    def test_bulk_delete_runs_as_resumable_job(self):
+        ids = [u.id for u in self.members] + [self.admin.id, 999999]
+        resp = self._post('admin_bulk_delete', {'user_ids': ids})
+        self.assertEqual(resp.status_code, 202, resp.content)
+        job_id = resp.json()['job']['id']
+        # The requesting admin is dropped from the job
+        self.assertEqual(resp.json()['job']['total'], 6)
+        self.assertEqual(AdminJob.objects.get(pk=job_id).status, 'PENDING')
+
+        call_command('run_admin_jobs', '--batch-size', '2', stdout=StringIO())
+
+        status = self.client.get(reverse('admin_job_status', args=[job_id]), HTTP_ACCEPT='application/json').json()['job']
+        self.assertEqual(status['status'], 'DONE')
+        self.assertEqual((status['processed'], status['failed']), (6, 1))
+        self.assertFalse(User.objects.filter(id__in=[u.id for u in self.members]).exists())
+        self.assertTrue(User.objects.filter(id=self.admin.id).exists())
+
+    def test_bulk_requests_validated_and_admin_only(self):
+        self.assertEqual(self._post('admin_bulk_delete', {'user_ids': []}).status_code, 400)
+        self.assertEqual(self._post('admin_bulk_subscription', {'user_ids': [1], 'subscription_type': 'GOLD'}).status_code, 400)
+        self.client.force_login(self.members[0])
+        self.assertEqual(self._post('admin_bulk_delete', {'user_ids': [self.members[1].id]}).status_code, 403)
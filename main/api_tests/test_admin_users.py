@@ -0,0 +1,57 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main.models import UserInfo, Blob
+
+
+class AdminUserListTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('admin_users')
+        self.admin = User.objects.create_user(username='boss', password='pw123', email='boss@example.com')
+        UserInfo.objects.create(user=self.admin, user_name='boss', container_name='boss-container',
+                                subscription_type='OWNER')
+        for i in range(6):
+            usr = User.objects.create_user(username=f'member{i}', password='pw123', email=f'member{i}@example.com')
+            UserInfo.objects.create(user=usr, user_name=f'member{i}', container_name=f'member{i}-container',
+                                    storage_used_bytes=i * 100)
+            for j in range(i):
+                Blob.objects.create(blob_name=f'f{j}.zip', blob_size=100, user_id=usr)
+        # Account without UserInfo still shows up with defaults
+        User.objects.create_user(username='orphan', password='pw123', email='orphan@example.com')
+        self.client.force_login(self.admin)
+
+    def _get(self, **params):
+        resp = self.client.get(self.url, params, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_pages_with_aggregates_in_one_query(self):
+        # session + auth user + is_admin lookup + the page itself, independent of page size
+        with self.assertNumQueries(4 + 3):
+            data = self._get(sort='storage', page_size=3)
+        users = data['users']
+        self.assertEqual([u['username'] for u in users], ['member5', 'member4', 'member3'])
+        self.assertEqual(users[0]['blob_count'], 5)
+        self.assertEqual(users[0]['blob_bytes'], 500)
+        self.assertTrue(data['has_next'])
+        self.assertFalse(data['has_previous'])
+
+        last = self._get(sort='storage', page_size=3, page=3)
+        self.assertEqual(len(last['users']), 2)
+        self.assertFalse(last['has_next'])
+        orphan = [u for u in last['users'] if u['username'] == 'orphan'][0]
+        self.assertEqual(orphan['subscription_type'], 'TESTER')
+        self.assertEqual(orphan['blob_count'], 0)
+
+    def test_search_and_invalid_sort(self):
+        data = self._get(q='member3')
+        self.assertEqual([u['username'] for u in data['users']], ['member3'])
+        resp = self.client.get(self.url, {'sort': 'email'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_non_admin_forbidden(self):
+        self.client.force_login(User.objects.get(username='member1'))
+        resp = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 403)
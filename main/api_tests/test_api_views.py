@@ -34,17 +34,10 @@ from main.models import UserInfo
 class APITests(AzDummyMixin, TestCase):
     @classmethod
     def setUpClass(cls):
+        # AzDummyMixin saves the real az_api entrypoints and swaps in the dummies;
+        # saving them again here would capture the dummies and leak them to later tests
         super().setUpClass()
-        # Save originals
-        cls._orig_init = getattr(az_api, 'init_container', None)
-        cls._orig_get = getattr(az_api, 'get_container_instance', None)
-        cls._orig_del = getattr(az_api, 'del_container_instance', None)
-        # Replace with dummy implementations to avoid real Azure calls
-        # Use our centralized test-only dummy implementation
         cls._dummy_container = az_dummy.DummyContainer()
-        az_api.init_container = az_dummy.init_container
-        az_api.get_container_instance = az_dummy.get_container_instance
-        az_api.del_container_instance = az_dummy.del_container_instance
 
     @classmethod
     def tearDownClass(cls):
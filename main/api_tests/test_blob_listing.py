@@ -0,0 +1,112 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main import queries
+from main.models import UserInfo, Blob
+
+
+class BlobListingTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.list_url = reverse('list_files')
+        self.user = User.objects.create_user(username='lister', password='pw123', email='lister@example.com')
+        UserInfo.objects.create(user=self.user, user_name=self.user.username, container_name='lister-container')
+        # Sizes repeat on purpose so the blob_id tie-breaker is exercised
+        for i in range(7):
+            Blob.objects.create(
+                blob_name=f"report_{i}.txt.zip" if i % 2 == 0 else f"photo_{i}.png.zip",
+                blob_size=100 * (i % 3),
+                user_id=self.user,
+                creation_time=1700000000 + i,
+                blob_type='image' if i % 2 else 'file',
+            )
+        other = User.objects.create_user(username='other', password='pw123', email='other@example.com')
+        Blob.objects.create(blob_name='report_other.txt.zip', blob_size=1, user_id=other)
+        self.client.force_login(self.user)
+
+    def _get(self, **params):
+        return self.client.get(self.list_url, params, HTTP_ACCEPT='application/json')
+
+    def _walk(self, **params):
+        """Follow next_cursor until exhausted and return every blob in order"""
+        seen = []
+        cursor = None
+        for _ in range(20):
+            query = dict(params)
+            if cursor:
+                query['cursor'] = cursor
+            resp = self._get(**query)
+            self.assertEqual(resp.status_code, 200, resp.content)
+            data = resp.json()
+            seen.extend(data['blobs'])
+            cursor = data['next_cursor']
+            if not cursor:
+                self.assertFalse(data['has_more'])
+                return seen
+        self.fail("Pagination did not terminate")
+
+    def test_default_sort_is_newest_first(self):
+        blobs = self._walk(page_size=3)
+        times = [b['blob_uploaded_at'] for b in blobs]
+        self.assertEqual(len(blobs), 7)
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    def test_pages_cover_every_blob_once_for_each_sort(self):
+        expected = set(Blob.objects.filter(user_id=self.user).values_list('blob_id', flat=True))
+        for sort in ('name', 'size', 'type', 'uploaded'):
+            for order in ('asc', 'desc'):
+                blobs = self._walk(sort=sort, order=order, page_size=2)
+                ids = [b['blob_id'] for b in blobs]
+                self.assertEqual(len(ids), len(set(ids)), f"duplicates for {sort}/{order}")
+                self.assertEqual(set(ids), expected, f"missing rows for {sort}/{order}")
+
+    def test_size_sort_orders_rows(self):
+        sizes = [b['blob_size'] for b in self._walk(sort='size', order='asc', page_size=2)]
+        self.assertEqual(sizes, sorted(sizes))
+
+    def test_prefix_and_type_filters(self):
+        reports = self._walk(prefix='report_')
+        self.assertEqual(len(reports), 4)
+        self.assertTrue(all(b['blob_name'].startswith('report_') for b in reports))
+        images = self._walk(type='image')
+        self.assertEqual(len(images), 3)
+        self.assertTrue(all(b['blob_type'] == 'image' for b in images))
+
+    def test_invalid_cursor_and_sort_rejected(self):
+        self.assertEqual(self._get(cursor='not-a-cursor').status_code, 400)
+        self.assertEqual(self._get(sort='owner').status_code, 400)
+        cursor = self._get(sort='name', page_size=1).json()['next_cursor']
+        # A cursor issued for one sort cannot be replayed against another
+        self.assertEqual(self._get(sort='size', cursor=cursor).status_code, 400)
+
+    def test_cursor_values_of_the_wrong_type_rejected(self):
+        forged = [
+            ['size', 'desc', None, None, 'abc', 'id'],
+            ['size', 'desc', None, None, True, 'id'],
+            ['uploaded', 'desc', None, None, [1], 'id'],
+            ['name', 'asc', None, None, 5, 'id'],
+            ['type', 'asc', None, None, None, 'id'],
+            ['name', 'asc', None, None, 'a', {'x': 1}],
+        ]
+        for payload in forged:
+            resp = self._get(sort=payload[0], order=payload[1], cursor=queries.encode_cursor(payload))
+            self.assertEqual(resp.status_code, 400, payload)
+        cursor = queries.encode_cursor(['uploaded', 'desc', None, None, 1700000003, ''])
+        self.assertEqual(self._get(sort='uploaded', cursor=cursor).status_code, 200)
+
+    def test_cursor_is_bound_to_its_filters(self):
+        cursor = self._get(prefix='report', page_size=1).json()['next_cursor']
+        self.assertEqual(self._get(prefix='report', page_size=1, cursor=cursor).status_code, 200)
+        self.assertEqual(self._get(prefix='photo', page_size=1, cursor=cursor).status_code, 400)
+        self.assertEqual(self._get(page_size=1, cursor=cursor).status_code, 400)
+        self.assertEqual(self._get(order='asc', prefix='report', page_size=1, cursor=cursor).status_code, 400)
+
+        cursor = self._get(type='image', page_size=1).json()['next_cursor']
+        self.assertEqual(self._get(type='file', page_size=1, cursor=cursor).status_code, 400)
+        self.assertEqual(self._get(type='image', page_size=1, cursor=cursor).status_code, 200)
+
+    def test_requires_authentication(self):
+        self.client.logout()
+        resp = self._get()
+        self.assertIn(resp.status_code, (401, 403))
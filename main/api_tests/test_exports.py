@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main.models import UserInfo, Blob
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_user(username='exporter', password='pw123', email='exporter@example.com')
+        UserInfo.objects.create(user=self.admin, user_name='exporter', container_name='exporter-container',
+                                subscription_type='OWNER')
+        self.member = User.objects.create_user(username='member', password='pw123', email='member@example.com')
+        UserInfo.objects.create(user=self.member, user_name='member', container_name='member-container')
+        for i in range(5):
+            Blob.objects.create(blob_name=f'doc,{i}.zip', blob_size=i, user_id=self.member, creation_time=1700000000 + i)
+        self.client.force_login(self.admin)
+
+    def _body(self, resp):
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        return b''.join(resp.streaming_content).decode()
+
+    def test_users_csv(self):
+        body = self._body(self.client.get(reverse('admin_export_users')))
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:3], ['id', 'username', 'email'])
+        self.assertEqual([r[1] for r in rows[1:]], ['exporter', 'member'])
+
+    def test_user_blobs_ndjson(self):
+        url = reverse('admin_export_user_blobs', args=[self.member.id])
+        body = self._body(self.client.get(url, {'output': 'ndjson'}))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['blob_name'] for r in rows], [f'doc,{i}.zip' for i in range(5)])
+
+    def test_rejects_non_admin_and_bad_format(self):
+        self.assertEqual(self.client.get(reverse('admin_export_users'), {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('admin_export_user_blobs', args=[999])).status_code, 404)
+        self.client.force_login(self.member)
+        self.assertEqual(self.client.get(reverse('admin_export_users')).status_code, 403)
+
+    def test_csv_neutralizes_formula_cells(self):
+        names = ['=HYPERLINK("http://evil")', '+1', '-2', '@SUM(A1)', '\tx', '\rx', 'plain=1']
+        for name in names:
+            Blob.objects.create(blob_name=name, blob_size=1, user_id=self.admin, creation_time=1700000000)
+        url = reverse('admin_export_user_blobs', args=[self.admin.id])
+        rows = list(csv.reader(io.StringIO(self._body(self.client.get(url)), newline='')))
+        exported = sorted(row[1] for row in rows[1:])
+        self.assertEqual(exported, sorted(["'" + name for name in names[:-1]] + ['plain=1']))
+        # NDJSON is not opened by spreadsheets and keeps the raw names
+        body = self._body(self.client.get(url, {'output': 'ndjson'}))
+        self.assertEqual(sorted(json.loads(line)['blob_name'] for line in body.splitlines()), sorted(names))
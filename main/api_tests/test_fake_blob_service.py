@@ -0,0 +1,158 @@
+import base64
+import time
+
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceNotFoundError, ServiceResponseError
+from azure.storage.blob import BlobBlock, BlobServiceClient, ExponentialRetry
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+
+from az_intf import api as az_api
+from az_intf.fake_blob_service import FakeBlobServer
+from main.management.commands.bench_upload import create_bench_users, upload_file
+from main.models import Blob
+
+
+def _block_id(index):
+    return base64.b64encode(f"{index:08d}".encode()).decode()
+
+
+class FakeBlobServiceSDKTests(SimpleTestCase):
+    """The real azure.storage.blob client against the fake HTTP endpoint"""
+    def setUp(self):
+        self.server = FakeBlobServer(seed=1).start()
+        self.addCleanup(self.server.stop)
+        self.service = BlobServiceClient(self.server.url, retry_total=0)
+        self.container = self.service.get_container_client('photos')
+        self.container.create_container()
+
+    def test_container_lifecycle(self):
+        self.assertTrue(self.container.exists())
+        with self.assertRaises(ResourceExistsError):
+            self.container.create_container()
+        self.container.delete_container()
+        self.assertFalse(self.container.exists())
+        with self.assertRaises(ResourceNotFoundError):
+            self.container.delete_container()
+
+    def test_staged_blocks_commit_and_ranged_download(self):
+        blob = self.container.get_blob_client('trip/day 1.bin')
+        for index in range(3):
+            blob.stage_block(_block_id(index), bytes([index]) * 1000)
+        blob.commit_block_list([BlobBlock(_block_id(index)) for index in range(3)])
+
+        self.assertEqual(blob.get_blob_properties().size, 3000)
+        self.assertEqual(blob.download_blob().readall(), b'\x00' * 1000 + b'\x01' * 1000 + b'\x02' * 1000)
+        self.assertEqual(blob.download_blob(offset=995, length=10).readall(), b'\x00' * 5 + b'\x01' * 5)
+        with self.assertRaises(HttpResponseError):
+            self.container.get_blob_client('missing').commit_block_list([BlobBlock(_block_id(0))])
+
+    def test_chunked_download_of_large_blob(self):
+        payload = bytes(range(256)) * 4096  # 1 MiB
+        service = BlobServiceClient(self.server.url, retry_total=0, max_single_get_size=256 * 1024,
+                                    max_chunk_get_size=128 * 1024)
+        service.get_blob_client('photos', 'big.bin').upload_blob(payload)
+        self.server.reset_call_counts()
+
+        downloaded = b''.join(service.get_blob_client('photos', 'big.bin').download_blob().chunks())
+        self.assertEqual(downloaded, payload)
+        self.assertEqual(self.server.call_counts(), {'get_blob': 7})
+
+    def test_list_blobs_prefix_and_paging(self):
+        for name in ('a/1', 'a/2', 'a/3', 'b/1'):
+            self.container.upload_blob(name, name.encode())
+
+        self.assertEqual([blob.name for blob in self.container.list_blobs(name_starts_with='a/')], ['a/1', 'a/2', 'a/3'])
+        pages = [[blob.name for blob in page] for page in self.container.list_blobs(results_per_page=3).by_page()]
+        self.assertEqual(pages, [['a/1', 'a/2', 'a/3'], ['b/1']])
+        self.assertEqual([blob.size for blob in self.container.list_blobs()], [3, 3, 3, 3])
+
+    def test_delete_and_batch_delete(self):
+        for name in ('x', 'y', 'z'):
+            self.container.upload_blob(name, b'data')
+        self.container.delete_blob('x')
+        with self.assertRaises(ResourceNotFoundError):
+            self.container.delete_blob('x')
+
+        responses = list(self.container.delete_blobs('y', 'z', 'x', raise_on_any_failure=False))
+        self.assertEqual([response.status_code for response in responses], [202, 202, 404])
+        self.assertEqual(list(self.container.list_blobs()), [])
+        self.assertEqual(self.server.call_counts()['blob_batch'], 1)
+
+    def test_latency_and_bandwidth(self):
+        blob = self.container.get_blob_client('slow.bin')
+        blob.upload_blob(b'x' * 100000)
+        self.server.latency_ms = 50
+        self.server.bandwidth = 1000000
+        started = time.perf_counter()
+        blob.download_blob().readall()
+        self.assertGreaterEqual(time.perf_counter() - started, 0.15)
+
+    def test_injected_faults(self):
+        blob = self.container.get_blob_client('flaky.bin')
+        blob.upload_blob(b'data')
+
+        self.server.inject_fault(503, operation='get_blob')
+        with self.assertRaises(HttpResponseError) as raised:
+            blob.download_blob()
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(blob.download_blob().readall(), b'data')
+
+        self.server.inject_fault(operation='get_blob', drop=True)
+        with self.assertRaises(ServiceResponseError):
+            blob.download_blob()
+
+        # The SDK's default retry policy rides out transient faults
+        retry_policy = ExponentialRetry(initial_backoff=0, increment_base=0, random_jitter_range=0)
+        retrying = BlobServiceClient(self.server.url, retry_policy=retry_policy)
+        self.server.inject_fault(500, count=2)
+        self.assertEqual(retrying.get_blob_client('photos', 'flaky.bin').download_blob().readall(), b'data')
+
+    def test_random_fault_rate(self):
+        self.server.fault_rate = 1.0
+        with self.assertRaises(HttpResponseError):
+            self.container.upload_blob('never', b'data')
+        self.server.fault_rate = 0.0
+        self.assertFalse(self.container.get_blob_client('never').exists())
+
+
+class FakeBlobServiceContainerTests(TestCase):
+    """The real Container and BlobServiceClient code paths over HTTP to the fake"""
+    def setUp(self):
+        self.server = FakeBlobServer().start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(AZURE_STORAGE_BACKEND='azure', AZURE_STORAGE_ACCOUNT_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        az_api.CONTAINER_INSTANCES.clear()
+        self.addCleanup(az_api.CONTAINER_INSTANCES.clear)
+        self.user = create_bench_users(1, prefix='fake')[0]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_upload_download_delete(self):
+        payload = bytes(range(256)) * 40  # 10240 bytes
+        upload_file(self.client, 'fake.bin', payload, len(payload), 4096, [])
+        counts = self.server.call_counts()
+        self.assertEqual((counts['put_block'], counts['put_block_list']), (3, 1))
+
+        blob = Blob.objects.get(user_id=self.user, blob_name='fake.bin')
+        resp = self.client.post(reverse('download', args=[blob.blob_id]))
+        self.assertEqual(b''.join(resp.streaming_content), payload)
+        resp = self.client.post(reverse('download', args=[blob.blob_id]), HTTP_RANGE='bytes=4096-4105')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(b''.join(resp.streaming_content), payload[4096:4106])
+
+        resp = self.client.post(reverse('delete', args=[blob.blob_id]), HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.server.store.list('fake0-container'), [])
+
+    def test_storage_fault_fails_the_chunk(self):
+        # 403 is not retried by the SDK, so the failure reaches the view at once
+        self.server.inject_fault(403, operation='put_block')
+        resp = self.client.post(reverse('chunked_upload'), {
+            'upload_id': 'faulty', 'chunk_index': 0, 'total_chunks': 1, 'file_name': 'faulty.bin',
+            'total_size': 4, 'chunk': SimpleUploadedFile('chunk', b'data'),
+        }, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 500)
+        self.assertFalse(Blob.objects.filter(blob_name='faulty.bin').exists())
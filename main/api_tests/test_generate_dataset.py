@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from az_intf import api as az_api
+from az_intf.local_blob_service import LocalBlobServiceClient
+from benchmarks import dataset
+from main.models import Blob, BlobTypeSummary, Directory, UploadSession, UserInfo
+
+
+class GenerateDatasetTests(TestCase):
+    def test_generates_consistent_rows(self):
+        out = StringIO()
+        call_command(
+            'generate_dataset', users=6, blobs_per_user=5, directories_per_user=3, upload_sessions=4,
+            tiers=True, prefix='gen', batch_size=4, force=True, stdout=out,
+        )
+        self.assertIn("Dataset 'gen' ready", out.getvalue())
+        self.assertEqual(UserInfo.objects.filter(user_name__startswith='gen').count(), 6)
+        self.assertEqual(Directory.objects.filter(user_id__username__startswith='gen').count(), 18)
+        self.assertEqual(UploadSession.objects.filter(upload_id__startswith='seed-').count(), 4)
+        for info in UserInfo.objects.filter(user_name__startswith='gen'):
+            blobs = Blob.objects.filter(user_id=info.user_id)
+            self.assertEqual(info.storage_used_bytes, blobs.aggregate(total=Sum('blob_size'))['total'] or 0)
+            reserved = UploadSession.objects.filter(user_id=info.user_id).aggregate(total=Sum('reserved_bytes'))['total']
+            self.assertEqual(info.storage_reserved_bytes, reserved or 0)
+            self.assertGreaterEqual(info.storage_quota_bytes, info.storage_used_bytes + info.storage_reserved_bytes)
+        self.assertEqual(
+            sum(BlobTypeSummary.objects.values_list('blob_count', flat=True)),
+            Blob.objects.filter(user_id__username__startswith='gen').count(),
+        )
+
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', users=1, prefix='gen', force=True, stdout=StringIO())
+
+    def test_storage_requires_local_backend(self):
+        with override_settings(AZURE_STORAGE_BACKEND='azure'), self.assertRaises(CommandError):
+            call_command('generate_dataset', users=1, storage='sparse', force=True, stdout=StringIO())
+
+    def test_seeded_ids_fit_the_id_columns(self):
+        call_command('generate_dataset', users=2, blobs_per_user=3, distribution='fixed', directories_per_user=3,
+                     upload_sessions=0, prefix='ids', force=True, stdout=StringIO())
+        ids = list(Blob.objects.filter(user_id__username__startswith='ids').values_list('blob_id', flat=True))
+        ids += Directory.objects.filter(user_id__username__startswith='ids').values_list('directory_id', flat=True)
+        self.assertEqual({len(value) for value in ids}, {12})
+        # Primary keys past 0xFFFFF no longer push ids over the column length
+        self.assertEqual(len(dataset._seed_id('s', 0x100000, 0x1000000)), 12)
+        self.assertNotEqual(dataset._seed_id('s', 1, 36), dataset._seed_id('s', 36, 1))
+        with self.assertRaises(ValueError):
+            dataset._seed_id('s', 36 ** 5, 0)
+
+    def test_storage_requires_blob_root(self):
+        with override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=None), self.assertRaises(CommandError):
+            call_command('generate_dataset', users=1, prefix='noroot', storage='sparse', force=True, stdout=StringIO())
+        self.assertFalse(UserInfo.objects.filter(user_name__startswith='noroot').exists())
+
+
+class DirectoryStoreTests(TestCase):
+    """The LOCAL_BLOB_ROOT variant of the local storage backend"""
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='cloudsynk-blobs-')
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def test_blocks_ranges_and_listing(self):
+        service = LocalBlobServiceClient(root=self.root)
+        container = service.get_container_client('c1')
+        container.create_container()
+        blob = container.get_blob_client('dir/a b.bin')
+        blob.stage_block('YmxvY2stMQ==', b'hello ')
+        # A second client (another worker) commits what the first staged
+        other = LocalBlobServiceClient(root=self.root).get_blob_client('c1', 'dir/a b.bin')
+        other.stage_block('YmxvY2stMg==', b'world')
+        other.commit_block_list(['YmxvY2stMQ==', 'YmxvY2stMg=='])
+
+        self.assertEqual(blob.download_blob().readall(), b'hello world')
+        self.assertEqual(b''.join(blob.download_blob(offset=6, length=100).chunks()), b'world')
+        self.assertEqual([(b.name, b.size) for b in container.list_blobs()], [('dir/a b.bin', 11)])
+        blob.delete_blob()
+        self.assertFalse(blob.exists())
+
+    def test_random_objects_are_written_in_chunks(self):
+        self.assertEqual([len(chunk) for chunk in dataset._random_chunks(2500, chunk_size=1000)], [1000, 1000, 500])
+        service = LocalBlobServiceClient(root=self.root)
+        service.get_container_client('c1').create_container()
+        service.store.write_chunks('c1', 'r.bin', iter([b'ab', b'cd', b'e']))
+        self.assertEqual(service.get_blob_client('c1', 'r.bin').download_blob().readall(), b'abcde')
+
+        with override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=self.root):
+            call_command('generate_dataset', users=1, blobs_per_user=2, distribution='fixed', upload_sessions=0,
+                         max_blob_size='64K', prefix='rand', storage='random', force=True, stdout=StringIO())
+            sizes = dict(Blob.objects.filter(user_id__username='rand0').values_list('blob_name', 'blob_size'))
+            self.assertEqual(dict(LocalBlobServiceClient(root=self.root).store.list('rand0-container')), sizes)
+
+    def test_sparse_dataset_is_downloadable(self):
+        with override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=self.root):
+            az_api.CONTAINER_INSTANCES.clear()
+            self.addCleanup(az_api.CONTAINER_INSTANCES.clear)
+            call_command('generate_dataset', users=1, blobs_per_user=2, distribution='fixed', upload_sessions=0,
+                         max_blob_size='64K', prefix='sparse', storage='sparse', force=True, stdout=StringIO())
+            blob = Blob.objects.filter(user_id__username='sparse0').first()
+            client = Client()
+            client.force_login(blob.user_id)
+            resp = client.post(reverse('download', args=[blob.blob_id]))
+            self.assertEqual(b''.join(resp.streaming_content), bytes(blob.blob_size))
@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from az_intf import api as az_api
+from az_intf import local_blob_service
+from main.management.commands.bench_upload import create_bench_users, upload_file
+from main.models import UserInfo, Blob, UploadSession
+from main import queries, storage_usage
+
+
+class HomePayloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.home_url = reverse('home')
+        self.user = User.objects.create_user(username='homer', password='pw123', email='homer@example.com')
+        UserInfo.objects.create(user=self.user, user_name='homer', container_name='homer-container',
+                                storage_quota_bytes=10_000)
+        Blob.objects.create(blob_name='first.txt.zip', blob_size=10, user_id=self.user)
+        self.client.force_login(self.user)
+
+    def _home(self):
+        resp = self.client.get(self.home_url, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()
+
+    def test_repeat_load_is_served_from_cache(self):
+        self._home()
+        # session load + auth user + UserInfo, then the SESSION_SAVE_EVERY_REQUEST write
+        # (savepoint, update, release); the blob page comes from the cache
+        with self.assertNumQueries(6):
+            data = self._home()
+        self.assertEqual(len(data['blobs']), 1)
+
+    def test_usage_change_invalidates_cached_payload(self):
+        self._home()
+        Blob.objects.create(blob_name='second.txt.zip', blob_size=20, user_id=self.user)
+        storage_usage.add_usage(self.user.id, 20)
+        data = self._home()
+        self.assertEqual(len(data['blobs']), 2)
+        self.assertEqual(data['user_info']['storage_used_bytes'], 20)
+
+    def test_admin_user_list_query_count_is_fixed(self):
+        UserInfo.objects.filter(user=self.user).update(subscription_type='OWNER')
+        for i in range(5):
+            other = User.objects.create_user(username=f'u{i}', password='pw123', email=f'u{i}@example.com')
+            UserInfo.objects.create(user=other, user_name=f'u{i}', container_name=f'u{i}-container')
+        # Same as a regular user's cached load plus one JOINed query for the user list,
+        # regardless of user count; the admin's own blob page is never built or cached
+        for _ in range(2):
+            with self.assertNumQueries(7):
+                data = self._home()
+        self.assertTrue(data['is_admin'])
+        self.assertEqual(len(data['admin_users']), 6)
+        self.assertEqual(data['blobs'], [])
+        info = UserInfo.objects.get(user=self.user)
+        self.assertIsNone(cache.get(queries.home_cache_key(self.user.id, info.data_version)))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username='poller', password='pw123', email='poller@example.com')
+        UserInfo.objects.create(user=self.user, user_name='poller', container_name='poller-container',
+                                storage_quota_bytes=10_000)
+        Blob.objects.create(blob_name='first.txt.zip', blob_size=10, user_id=self.user)
+        self.client.force_login(self.user)
+
+    def _get(self, url, etag=None):
+        headers = {'HTTP_ACCEPT': 'application/json'}
+        if etag:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(url, **headers)
+
+    def test_home_returns_304_until_data_changes(self):
+        first = self._get(reverse('home'))
+        etag = first['ETag']
+        self.assertEqual(first.status_code, 200)
+
+        repeat = self._get(reverse('home'), etag)
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat['ETag'], etag)
+        self.assertEqual(repeat.content, b'')
+
+        storage_usage.add_usage(self.user.id, 5)
+        changed = self._get(reverse('home'), etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_list_files_etag_depends_on_query(self):
+        url = reverse('list_files')
+        etag = self._get(url + '?sort=name')['ETag']
+        self.assertEqual(self._get(url + '?sort=name', etag).status_code, 304)
+        self.assertEqual(self._get(url + '?sort=size', etag).status_code, 200)
+
+    def test_active_uploads_304_skips_container(self):
+        def no_container(username):
+            raise AssertionError('a 304 must not load the container')
+        self.addCleanup(setattr, az_api, 'get_container_instance', az_api.get_container_instance)
+        az_api.get_container_instance = no_container
+        az_api.CONTAINER_INSTANCES.clear()
+
+        data_version = UserInfo.objects.get(user=self.user).data_version
+        etag = queries.active_uploads_etag(self.user.id, data_version)
+        self.assertEqual(self._get(reverse('active_uploads'), etag).status_code, 304)
+        self.assertEqual(az_api.CONTAINER_INSTANCES, {})
+
+        UploadSession.objects.create(upload_id='up-1', user=self.user, blob_name='big.zip',
+                                     total_size=100, container_name='poller-container')
+        self.assertNotEqual(queries.active_uploads_etag(self.user.id, data_version), etag)
+
+
+@override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=None)
+class HomeInvalidationTests(TestCase):
+    """Changes made through the real Container must change the home ETag"""
+    def setUp(self):
+        cache.clear()
+        local_blob_service.reset()
+        az_api.CONTAINER_INSTANCES.clear()
+        self.addCleanup(local_blob_service.reset)
+        self.addCleanup(az_api.CONTAINER_INSTANCES.clear)
+        self.user = create_bench_users(1, prefix='empty')[0]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_deleting_empty_blob_invalidates_home(self):
+        upload_file(self.client, 'empty.bin', b'', 0, 1024, [])
+        blob = Blob.objects.get(user_id=self.user, blob_name='empty.bin')
+        etag = self.client.get(reverse('home'), HTTP_ACCEPT='application/json')['ETag']
+
+        resp = self.client.post(reverse('delete', args=[blob.blob_id]), HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
+        resp = self.client.get(reverse('home'), HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn('empty.bin', [b['blob_name'] for b in resp.json()['blobs']])
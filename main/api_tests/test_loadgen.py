@@ -0,0 +1,46 @@
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from az_intf import api as az_api
+from az_intf import local_blob_service
+from loadtest import loadgen
+from main.management.commands.bench_upload import create_bench_users
+from main.models import Blob
+
+
+@override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=None)
+class LoadgenLiveServerTests(LiveServerTestCase):
+    """The load generator against a real server thread and the local storage backend"""
+    def setUp(self):
+        local_blob_service.reset()
+        az_api.CONTAINER_INSTANCES.clear()
+        self.users = create_bench_users(1, prefix='lg')
+
+    def tearDown(self):
+        az_api.CONTAINER_INSTANCES.clear()
+        local_blob_service.reset()
+
+    def test_mixed_run_reports_every_endpoint_and_cleans_up(self):
+        options = loadgen.build_parser().parse_args([
+            '--base-url', self.live_server_url, '--users', '1', '--user-prefix', 'lg', '--user-count', '1',
+            '--duration', '0', '--iterations', '12', '--mix', 'upload=2,download=2,home=1,delete=1',
+            '--file-sizes', '10K', '--chunk-size', '4K', '--range-ratio', '0.5',
+        ])
+        report = loadgen.run(options)
+
+        self.assertEqual(report['virtual_user_errors'], [])
+        endpoints = report['endpoints']
+        for endpoint in ('login', 'home', 'upload', 'upload_chunk'):
+            self.assertIn(endpoint, endpoints)
+            self.assertEqual(endpoints[endpoint]['errors'], 0, endpoints[endpoint])
+        self.assertEqual(endpoints['upload_chunk']['requests'], 3 * endpoints['upload']['requests'])
+        # Everything the virtual user uploaded is deleted again at the end
+        self.assertFalse(Blob.objects.filter(blob_name__startswith='loadgen_').exists())
+        self.assertEqual(local_blob_service.stats()['blobs'], 0)
+
+
+class LoadgenParsingTests(SimpleTestCase):
+    def test_weights(self):
+        self.assertEqual(loadgen.parse_weights('upload=1,home'), {'upload': 1.0, 'home': 1.0})
+        self.assertEqual(loadgen.parse_weights('1K:3,2M:1', loadgen.parse_size, ':'), {1024: 3.0, 2 * 1024 ** 2: 1.0})
+        with self.assertRaises(ValueError):
+            loadgen.parse_weights('upload=0')
@@ -0,0 +1,102 @@
+import time
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import Sum
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from az_intf import api as az_api
+from az_intf import local_blob_service
+from benchmarks import dataset, harness
+from main.management.commands.bench_download import download_file
+from main.management.commands.bench_upload import create_bench_users, upload_file
+from main.models import Blob, UploadSession, UserInfo
+
+
+@override_settings(AZURE_STORAGE_BACKEND='local')
+class LocalStorageUploadTests(TestCase):
+    """The real Container upload path against the in-process storage fake"""
+    def setUp(self):
+        local_blob_service.reset()
+        az_api.CONTAINER_INSTANCES.clear()
+        self.user = create_bench_users(1, prefix='local')[0]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        az_api.CONTAINER_INSTANCES.clear()
+        local_blob_service.reset()
+
+    def test_chunked_upload_commits_blocks_in_order(self):
+        payload = bytes(range(256)) * 40  # 10240 bytes
+        latencies = []
+        chunks = upload_file(self.client, 'local.bin', payload, len(payload), 4096, latencies)
+        self.assertEqual((chunks, len(latencies)), (3, 3))
+
+        blob = Blob.objects.get(user_id=self.user, blob_name='local.bin')
+        self.assertEqual(blob.blob_size, len(payload))
+        self.assertEqual(UserInfo.objects.get(user=self.user).storage_used_bytes, len(payload))
+        self.assertEqual(local_blob_service.stats()['staged_blocks'], 0)
+
+        resp = self.client.post(reverse('download', args=[blob.blob_id]), HTTP_RANGE='bytes=4096-4105')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(b''.join(resp.streaming_content), payload[4096:4106])
+
+    def test_download_helper_consumes_full_and_ranged_streams(self):
+        payload = b'x' * 9000
+        upload_file(self.client, 'dl.bin', payload, len(payload), 4096, [])
+        blob_id = Blob.objects.get(user_id=self.user, blob_name='dl.bin').blob_id
+
+        received, first_byte_ms, total_ms = download_file(self.client, blob_id)
+        self.assertEqual(received, len(payload))
+        self.assertLessEqual(first_byte_ms, total_ms)
+        self.assertEqual(download_file(self.client, blob_id, (100, 1123))[0], 1024)
+
+    def test_missing_or_negative_total_size_is_rejected(self):
+        for total_size in (-1000000000, None):
+            data = {'upload_id': f'bad-size-{total_size}', 'chunk_index': 0, 'total_chunks': 1, 'file_name': 'bad.bin',
+                    'chunk': SimpleUploadedFile('chunk', b'x' * 10)}
+            if total_size is not None:
+                data['total_size'] = total_size
+            resp = self.client.post(reverse('chunked_upload'), data, HTTP_ACCEPT='application/json')
+            self.assertEqual(resp.status_code, 400, total_size)
+        self.assertEqual(UserInfo.objects.get(user=self.user).storage_reserved_bytes, 0)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        resp = self.client.post(reverse('chunked_upload'), {
+            'upload_id': 'too-big', 'chunk_index': 0, 'total_chunks': 2, 'file_name': 'big.bin',
+            'total_size': 10, 'chunk': SimpleUploadedFile('chunk', b'x' * 20),
+        }, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 413)
+        self.assertEqual(local_blob_service.stats()['staged_blocks'], 0)
+
+
+class BenchmarkHarnessTests(TestCase):
+    def test_sizes_and_percentiles(self):
+        self.assertEqual(harness.parse_list('256K,1M,64MB', harness.parse_size), [262144, 1048576, 64 * 1024 ** 2])
+        with self.assertRaises(ValueError):
+            harness.parse_size('12Q')
+        summary = harness.percentiles([float(v) for v in range(1, 101)])
+        self.assertEqual((summary['p50'], summary['max'], summary['count']), (51.0, 100.0, 100))
+
+    def test_memory_tracking_reports_each_run_not_the_process_peak(self):
+        def run(size):
+            with harness.memory_tracking(False, interval=0.001) as memory:
+                data = b'x' * size
+                time.sleep(0.05)
+                del data
+            return memory
+
+        large, small = run(64 * 1024 * 1024), run(1024)
+        self.assertGreaterEqual(large['rss_peak_delta_bytes'], 48 * 1024 * 1024)
+        self.assertLess(small['rss_peak_delta_bytes'], 16 * 1024 * 1024)
+        self.assertLessEqual(small['rss_start_bytes'], small['rss_peak_bytes'])
+
+    def test_dataset_seed_keeps_usage_consistent(self):
+        seeded = dataset.seed(users=3, blobs_per_user=4, heavy_users=1, heavy_user_blobs=30, prefix='seed', batch_size=7)
+        self.assertEqual(seeded['blobs'], 38)
+        self.assertEqual(Blob.objects.filter(user_id__username__startswith='seed').count(), 38)
+        for info in UserInfo.objects.filter(user_name__startswith='seed'):
+            used = Blob.objects.filter(user_id=info.user_id).aggregate(total=Sum('blob_size'))['total']
+            self.assertEqual(info.storage_used_bytes, used)
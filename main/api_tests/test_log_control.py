@@ -0,0 +1,79 @@
+import logging
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from logger import LogControlFilter
+from main import log_control
+from main.models import UserInfo
+from storage_webapp import logger
+
+
+def _record(level=logging.DEBUG, module='Container', func='append_chunk_to_blob', lineno=10, created=100.0):
+    record = logging.makeLogRecord({
+        'levelno': level, 'levelname': logging.getLevelName(level), 'module': module,
+        'funcName': func, 'pathname': f'{module}.py', 'lineno': lineno, 'msg': 'chunk staged',
+    })
+    record.created = created
+    return record
+
+
+class LogControlFilterTests(TestCase):
+    def test_module_levels_and_rate_limits(self):
+        control = LogControlFilter(logging.INFO)
+        control.configure(logging.INFO, {'Container': logging.DEBUG}, {'Container.append_chunk_to_blob': 2})
+        self.assertFalse(control.filter(_record(module='views', func='post')))
+
+        passed = [control.filter(_record(created=100.0 + i * 0.1)) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        # Other call sites have their own budget and INFO is never sampled
+        self.assertTrue(control.filter(_record(lineno=11, created=100.2)))
+        self.assertTrue(control.filter(_record(level=logging.INFO, created=100.3)))
+
+        later = _record(created=101.5)
+        self.assertTrue(control.filter(later))
+        self.assertIn('+3 similar suppressed', later.msg)
+
+
+class LogControlTests(TestCase):
+    def setUp(self):
+        cache.delete(log_control.CACHE_KEY)
+        self.user = User.objects.create_user(username='logadmin', password='pw123', email='logadmin@example.com')
+        UserInfo.objects.create(user=self.user, user_name='logadmin', container_name='logadmin-container')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.delete(log_control.CACHE_KEY)
+        log_control.apply(log_control.default_config())
+
+    def test_command_change_is_picked_up_by_poll(self):
+        call_command('set_log_level', '--default', 'WARNING', '--module', 'Container=DEBUG', stdout=StringIO())
+        # Simulate another worker that last applied the defaults
+        log_control.apply(log_control.default_config())
+        self.assertTrue(log_control.poll(force=True))
+        self.assertEqual(logger.level, logging.DEBUG)
+        config = log_control.current_config()
+        self.assertEqual(config['default_level'], 'WARNING')
+        self.assertEqual(config['modules']['Container'], 'DEBUG')
+        self.assertFalse(log_control.poll(force=True))
+
+        call_command('set_log_level', '--module', 'Container=', stdout=StringIO())
+        self.assertEqual(logger.level, logging.WARNING)
+
+    def test_endpoint_is_admin_only_and_validates(self):
+        url = reverse('admin_logging')
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT='application/json').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+
+        resp = self.client.post(url, {'default_level': 'LOUD'}, content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(url, {'rate_limits': {'views.post': 1}}, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['config']['rate_limits']['views.post'], 1)
+        self.assertEqual(self.client.get(url).json()['config']['version'], 1)
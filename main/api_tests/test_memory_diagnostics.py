@@ -0,0 +1,76 @@
+import os
+import tracemalloc
+
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from az_intf import api as az_api
+from main.models import UserInfo
+
+
+class MemoryDiagnosticsTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('admin_memory_diagnostics')
+        self.user = User.objects.create_user(username='memuser', password='pw123', email='memuser@example.com')
+        UserInfo.objects.create(user=self.user, user_name='memuser', container_name='memuser-container')
+        self.admin = User.objects.create_user(username='memadmin', password='pw123', is_staff=True)
+
+    def tearDown(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _post(self, **data):
+        return self.client.post(self.url, data, content_type='application/json', HTTP_ACCEPT='application/json')
+
+    def test_status_reports_worker_and_container_cache(self):
+        saved = dict(az_api.CONTAINER_INSTANCES)
+        az_api.CONTAINER_INSTANCES.clear()
+        az_api.CONTAINER_INSTANCES['gone'] = None
+        self.client.force_login(self.admin)
+        try:
+            data = self.client.get(self.url, HTTP_ACCEPT='application/json').json()
+        finally:
+            az_api.CONTAINER_INSTANCES.clear()
+            az_api.CONTAINER_INSTANCES.update(saved)
+        self.assertEqual(data['pid'], os.getpid())
+        self.assertFalse(data['tracing'])
+        self.assertEqual(data['container_cache']['entries'], 1)
+        self.assertEqual(data['container_cache']['live_instances'], 0)
+
+    def test_tracing_lifecycle_reports_growth(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self._post(action='snapshot').status_code, 400)
+        self.assertTrue(self._post(action='start').json()['tracing'])
+
+        retained = [bytearray(4096) for _ in range(200)]
+        diff = self._post(action='diff', top=5).json()
+        self.assertLessEqual(len(diff['top']), 5)
+        self.assertTrue(any('test_memory_diagnostics.py' in site['site'] for site in diff['top']))
+        self.assertGreater(diff['top'][0]['size_diff_bytes'], 0)
+        del retained
+
+        self.assertEqual(self._post(action='snapshot', pid=os.getpid() + 1).status_code, 409)
+        self.assertFalse(self._post(action='stop').json()['tracing'])
+
+    def test_remote_non_admin_is_forbidden(self):
+        self.client.force_login(self.user)
+        resp = self.client.get(self.url, REMOTE_ADDR='10.1.2.3', HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        resp = self.client.get(self.url, REMOTE_ADDR='10.1.2.3', HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(METRICS_TOKEN='diag-secret')
+    def test_proxied_loopback_requests_need_token(self):
+        # nginx forwards public traffic from 127.0.0.1; neither that nor a forged header is enough
+        for extra in ({}, {'HTTP_X_FORWARDED_FOR': '203.0.113.9', 'HTTP_X_REAL_IP': '203.0.113.9'}):
+            resp = self.client.post(self.url, {'action': 'start'}, content_type='application/json',
+                                    REMOTE_ADDR='127.0.0.1', HTTP_ACCEPT='application/json', **extra)
+            self.assertEqual(resp.status_code, 403)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        resp = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer diag-secret', HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from main import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.override = override_settings(METRICS_DIR=self.metrics_dir)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+
+    def test_other_worker_files_are_merged(self):
+        metrics.STORAGE_CALLS.inc(operation='stage_block', outcome='success')
+        # A second worker that has already flushed its own registry
+        with open(os.path.join(self.metrics_dir, 'metrics_999999.json'), 'w') as handle:
+            json.dump({
+                'cloudsynk_storage_calls_total': [[['stage_block', 'success'], 4]],
+                # A route no request in this process uses, so the buckets are exactly the file's
+                'cloudsynk_http_request_duration_seconds': [[['GET', 'merge-test/', '2xx'], [0] * 6 + [2] + [0] * 6 + [0.5]]],
+            }, handle)
+        metrics.flush(force=True)
+        merged = metrics.collect()
+        ours = metrics.STORAGE_CALLS.values[('stage_block', 'success')]
+        self.assertEqual(merged['cloudsynk_storage_calls_total'][('stage_block', 'success')], ours + 4)
+
+        text = metrics.render()
+        series = 'method="GET",route="merge-test/",status="2xx"'
+        self.assertIn('cloudsynk_http_request_duration_seconds_bucket{%s,le="0.25"} 0' % series, text)
+        self.assertIn('cloudsynk_http_request_duration_seconds_bucket{%s,le="0.5"} 2' % series, text)
+        self.assertIn('cloudsynk_http_request_duration_seconds_count{%s} 2' % series, text)
+
+    def _dead_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        return process.pid
+
+    def _write_worker_file(self, pid, calls):
+        with open(os.path.join(self.metrics_dir, f'metrics_{pid}.json'), 'w') as handle:
+            json.dump({'cloudsynk_storage_calls_total': [[['stage_block', 'success'], calls]]}, handle)
+
+    def _stage_calls(self):
+        return metrics.collect()['cloudsynk_storage_calls_total'][('stage_block', 'success')]
+
+    def test_dead_worker_files_are_folded(self):
+        metrics.STORAGE_CALLS.inc(operation='stage_block', outcome='success')
+        metrics.flush(force=True)
+        ours = metrics.STORAGE_CALLS.values[('stage_block', 'success')]
+        self._write_worker_file(self._dead_pid(), 3)
+        self._write_worker_file(self._dead_pid(), 4)
+
+        self.assertEqual(self._stage_calls(), ours + 7)
+        self.assertEqual(sorted(os.listdir(self.metrics_dir)),
+                         sorted(['.metrics.lock', metrics.EXITED_FILE, f'metrics_{os.getpid()}.json']))
+        self._write_worker_file(self._dead_pid(), 1)
+        self.assertEqual(self._stage_calls(), ours + 8)
+
+    def test_recycled_pid_folds_previous_owner_file(self):
+        # A dead worker that had our pid left its totals behind
+        self._write_worker_file(os.getpid(), 5)
+        saved, metrics._claimed_pid = metrics._claimed_pid, None
+        try:
+            metrics.STORAGE_CALLS.inc(operation='stage_block', outcome='success')
+            metrics.flush(force=True)
+        finally:
+            metrics._claimed_pid = saved
+        self.assertEqual(self._stage_calls(), metrics.STORAGE_CALLS.values[('stage_block', 'success')] + 5)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_endpoint_records_requests_and_requires_token_or_admin(self):
+        client = Client()
+        auth = {'HTTP_AUTHORIZATION': 'Bearer scrape-secret'}
+        client.get(reverse('metrics'), **auth)
+        resp = client.get(reverse('metrics'), **auth)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain'))
+        self.assertIn('cloudsynk_http_request_duration_seconds_count{method="GET",route="metrics",status="2xx"}',
+                      resp.content.decode())
+
+        # Behind nginx every public request comes from loopback; the address alone grants nothing
+        for extra in ({}, {'HTTP_X_FORWARDED_FOR': '203.0.113.9'}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            resp = client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1', HTTP_ACCEPT='application/json', **extra)
+            self.assertEqual(resp.status_code, 403, extra)
+
+    def test_endpoint_without_token_is_admin_only(self):
+        client = Client()
+        self.assertEqual(client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        admin = User.objects.create_user(username='metricsadmin', password='pw123', is_staff=True)
+        client.force_login(admin)
+        self.assertEqual(client.get(reverse('metrics')).status_code, 200)
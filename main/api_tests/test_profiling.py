@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main import profiling
+from main.models import UserInfo
+
+
+def _busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.override = override_settings(PROFILING_DIR=self.profile_dir, PROFILING_INTERVAL_MS=1)
+        self.override.enable()
+        self.client = Client()
+        self.user = User.objects.create_user(username='profiled', password='pw123', email='profiled@example.com')
+        UserInfo.objects.create(user=self.user, user_name='profiled', container_name='profiled-container')
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _files(self):
+        return sorted(os.listdir(self.profile_dir))
+
+    def test_sampler_collects_collapsed_stacks(self):
+        sampler = profiling.StackSampler(threading.get_ident(), interval_ms=1).start()
+        _busy_wait(0.05)
+        sampler.stop()
+        self.assertGreater(sampler.samples, 0)
+        self.assertIn('test_profiling.py:_busy_wait', sampler.collapsed())
+        stack, count = sampler.collapsed().splitlines()[0].rsplit(' ', 1)
+        self.assertTrue(int(count) > 0 and ';' in stack)
+
+    def test_off_by_default_and_header_needs_admin(self):
+        self.client.get(reverse('home'), HTTP_ACCEPT='application/json', HTTP_X_PROFILE='1')
+        self.assertEqual(self._files(), [])
+
+        self.user.is_staff = True
+        self.user.save()
+        resp = self.client.get(reverse('home'), HTTP_ACCEPT='application/json', HTTP_X_PROFILE='1')
+        self.assertEqual(self._files(), [resp['X-Profile-File']])
+        self.assertIn('_HomeAPIView_', resp['X-Profile-File'])
+
+    @override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0,
+                       PROFILING_VIEWS=['HomeAPIView'], PROFILING_MAX_FILES=2)
+    def test_sampled_views_rotate_files(self):
+        self.client.get(reverse('list_files'), HTTP_ACCEPT='application/json')
+        self.assertEqual(self._files(), [])
+        for _ in range(3):
+            resp = self.client.get(reverse('home'), HTTP_ACCEPT='application/json')
+            self.assertNotIn('X-Profile-File', resp)
+            time.sleep(0.01)
+        self.assertEqual(len(self._files()), 2)
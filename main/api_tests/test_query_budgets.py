@@ -0,0 +1,333 @@
+"""
+SQL query and storage SDK call budgets for every endpoint in main/urls.py.
+
+Each case sends one request through the test client against the local storage
+backend, with a cold container cache and an empty Django cache (the first request
+a worker serves), and fails when the request needs more queries or storage
+round-trips than its budget. The failure message lists every query, so an N+1
+shows up as the repeated statement. The members' data is sized so that a
+per-row query would exceed any budget here.
+
+When an endpoint gets cheaper, lower its budget; raising one needs a reason.
+"""
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from az_intf import api as az_api
+from az_intf import local_blob_service
+from az_intf.api_utils import Container as container_module
+from main import urls, views
+from main.management.commands.bench_upload import create_bench_users, upload_file
+from main.models import AdminJob, Blob, LoginOTP, PendingUser, UserInfo
+
+MEMBERS = 6
+BLOBS_PER_MEMBER = 5
+
+# case -> (url name, SQL queries, storage SDK calls)
+BUDGETS = {
+    'home': ('home', 7, 0),
+    'home_admin': ('home', 8, 0),
+    'signup_form': ('signup', 0, 0),
+    'signup': ('signup', 4, 0),
+    'verify_otp': ('verify_otp', 16, 1),
+    'resend_otp': ('resend_otp', 2, 0),
+    'login_form': ('login', 0, 0),
+    'login': ('login', 9, 0),
+    'verify_login_otp': ('verify_login_otp', 11, 0),
+    'resend_login_otp': ('resend_login_otp', 3, 0),
+    'logout': ('logout', 4, 0),
+    'deactivate': ('deactivate', 29, 1),
+    'list_files': ('list_files', 7, 0),
+    'delete': ('delete', 18, 2),
+    'download': ('download', 11, 1),
+    'download_range': ('download', 11, 1),
+    'upload_first_chunk': ('chunked_upload', 20, 1),
+    'upload_last_chunk': ('chunked_upload', 26, 2),
+    'upload_status': ('chunked_upload', 9, 1),
+    'upload_cancel': ('chunked_upload', 15, 0),
+    'cancel_download': ('cancel_download', 9, 0),
+    'active_uploads': ('active_uploads', 13, 0),
+    'metrics': ('metrics', 0, 0),
+    'admin_users': ('admin_users', 7, 0),
+    'admin_delete_user': ('admin_delete_user', 37, 1),
+    'admin_update_subscription': ('admin_update_subscription', 19, 0),
+    'admin_bulk_subscription': ('admin_bulk_subscription', 19, 0),
+    'admin_bulk_delete': ('admin_bulk_delete', 7, 0),
+    'admin_job_status': ('admin_job_status', 7, 0),
+    'admin_logging': ('admin_logging', 6, 0),
+    'admin_memory_diagnostics': ('admin_memory_diagnostics', 6, 0),
+    'admin_storage_analytics': ('admin_storage_analytics', 10, 0),
+    'admin_usage_series': ('admin_usage_series', 7, 0),
+    'admin_export_users': ('admin_export_users', 7, 0),
+    'admin_export_user_blobs': ('admin_export_user_blobs', 8, 0),
+}
+
+JSON = {'HTTP_ACCEPT': 'application/json'}
+
+
+def _chunk():
+    return SimpleUploadedFile('chunk', b'y' * 1024)
+
+
+@override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=None)
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        local_blob_service.reset()
+        az_api.CONTAINER_INSTANCES.clear()
+        # No SMTP or avatar service in tests; neither touches the database
+        self.sent_mail = []
+        for name in ('send_otp_email', 'send_login_otp_email'):
+            self.addCleanup(setattr, views, name, getattr(views, name))
+            setattr(views, name, lambda *args: self.sent_mail.append(args))
+        self.addCleanup(setattr, container_module, 'generate_and_store_avatar', container_module.generate_and_store_avatar)
+        container_module.generate_and_store_avatar = lambda username: None
+
+        self.admin = create_bench_users(1, prefix='boss')[0]
+        UserInfo.objects.filter(user=self.admin).update(subscription_type='OWNER')
+        self.members = create_bench_users(MEMBERS, prefix='member')
+        self.member = self.members[0]
+        self.client = Client()
+        self.client.force_login(self.member)
+        with self.captureOnCommitCallbacks(execute=True):
+            for member in self.members:
+                member_client = Client()
+                member_client.force_login(member)
+                for n in range(BLOBS_PER_MEMBER):
+                    upload_file(member_client, f'file{n}.bin', b'x' * 3000, 3000, 1024, [])
+        self.blob = Blob.objects.filter(user_id=self.member).order_by('blob_name').first()
+
+    def tearDown(self):
+        az_api.CONTAINER_INSTANCES.clear()
+        local_blob_service.reset()
+
+    @contextmanager
+    def assertWithinBudget(self, case):
+        """Fail with every captured query, on-commit work included, when the block exceeds the case's budget"""
+        url_name, query_budget, storage_budget = BUDGETS[case]
+        az_api.CONTAINER_INSTANCES.clear()
+        cache.clear()
+        local_blob_service.reset_call_counts()
+        with CaptureQueriesContext(connection) as captured, self.captureOnCommitCallbacks(execute=True):
+            yield
+        storage_calls = local_blob_service.call_counts()
+        queries = len(captured.captured_queries)
+        storage = sum(storage_calls.values())
+        if queries > query_budget or storage > storage_budget:
+            lines = [
+                f"{case} ({url_name}): {queries} queries (budget {query_budget}), "
+                f"{storage} storage calls (budget {storage_budget}) {storage_calls}",
+            ]
+            lines.extend(f"  {n}. {query['sql']}" for n, query in enumerate(captured.captured_queries, 1))
+            self.fail('\n'.join(lines))
+
+    def _consume(self, resp):
+        if resp.streaming:
+            b''.join(resp.streaming_content)
+        return resp
+
+    def assertStatus(self, resp, expected):
+        self.assertEqual(resp.status_code, expected, getattr(resp, 'content', b'')[:500])
+
+    def _as_admin(self):
+        self.client.force_login(self.admin)
+
+    def _stage_upload(self, upload_id, total_chunks=2):
+        resp = self.client.post(reverse('chunked_upload'), {
+            'upload_id': upload_id, 'chunk_index': 0, 'total_chunks': total_chunks, 'file_name': f'{upload_id}.bin',
+            'total_size': 2048, 'chunk': _chunk(),
+        }, **JSON)
+        self.assertStatus(resp, 200)
+
+    def test_every_route_has_a_budget(self):
+        routes = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(routes - {url_name for url_name, _, _ in BUDGETS.values()}, set())
+
+    # --- pages and listings -------------------------------------------------
+
+    def test_home(self):
+        with self.assertWithinBudget('home'):
+            self.assertStatus(self.client.get(reverse('home'), **JSON), 200)
+
+    def test_home_admin(self):
+        self._as_admin()
+        with self.assertWithinBudget('home_admin'):
+            self.assertStatus(self.client.get(reverse('home'), **JSON), 200)
+
+    def test_list_files(self):
+        with self.assertWithinBudget('list_files'):
+            self.assertStatus(self.client.get(reverse('list_files'), {'page_size': 2}, **JSON), 200)
+
+    def test_active_uploads(self):
+        self._stage_upload('active')
+        with self.assertWithinBudget('active_uploads'):
+            self.assertStatus(self.client.get(reverse('active_uploads'), **JSON), 200)
+
+    @override_settings(METRICS_TOKEN='budget-token')
+    def test_metrics(self):
+        # The Prometheus scrape path: token auth, no session
+        with self.assertWithinBudget('metrics'):
+            self.assertStatus(Client().get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer budget-token'), 200)
+
+    # --- signup, login, logout ----------------------------------------------
+
+    def test_signup(self):
+        anonymous = Client()
+        with self.assertWithinBudget('signup_form'):
+            self.assertStatus(anonymous.get(reverse('signup'), **JSON), 200)
+        with self.assertWithinBudget('signup'):
+            resp = anonymous.post(reverse('signup'), {
+                'username': 'newcomer', 'email': 'newcomer@example.com',
+                'password1': 'Sup3r-secret-pw', 'password2': 'Sup3r-secret-pw',
+            }, content_type='application/json', **JSON)
+            self.assertStatus(resp, 201)
+        pending = PendingUser.objects.get(username='newcomer')
+
+        PendingUser.objects.filter(pk=pending.pk).update(last_sent_at=timezone.now() - timezone.timedelta(minutes=5))
+        with self.assertWithinBudget('resend_otp'):
+            resp = anonymous.post(reverse('resend_otp'), {'pending_id': pending.pk},
+                                  content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+
+        pending.refresh_from_db()
+        with self.assertWithinBudget('verify_otp'):
+            resp = anonymous.post(reverse('verify_otp'), {'pending_id': pending.pk, 'code': pending.code},
+                                  content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+
+    def test_login(self):
+        anonymous = Client()
+        with self.assertWithinBudget('login_form'):
+            self.assertStatus(anonymous.get(reverse('login'), **JSON), 200)
+        with self.assertWithinBudget('login'):
+            resp = anonymous.post(reverse('login'), {'username': 'member1', 'password': 'bench-pw'},
+                                  content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+
+    def test_login_otp(self):
+        anonymous = Client()
+        resp = anonymous.post(reverse('login'), {'username': 'member1', 'login_method': 'otp'},
+                              content_type='application/json', **JSON)
+        self.assertStatus(resp, 200)
+        login_otp = LoginOTP.objects.get(pk=resp.json()['login_otp_id'])
+
+        LoginOTP.objects.filter(pk=login_otp.pk).update(last_sent_at=timezone.now() - timezone.timedelta(minutes=5))
+        with self.assertWithinBudget('resend_login_otp'):
+            resp = anonymous.post(reverse('resend_login_otp'), {'login_otp_id': login_otp.pk},
+                                  content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+
+        login_otp.refresh_from_db()
+        with self.assertWithinBudget('verify_login_otp'):
+            resp = anonymous.post(reverse('verify_login_otp'), {'login_otp_id': login_otp.pk, 'code': login_otp.code},
+                                  content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+
+    def test_logout(self):
+        with self.assertWithinBudget('logout'):
+            self.assertStatus(self.client.post(reverse('logout'), **JSON), 200)
+
+    def test_deactivate(self):
+        with self.assertWithinBudget('deactivate'):
+            self.assertStatus(self.client.post(reverse('deactivate'), **JSON), 200)
+        self.assertFalse(User.objects.filter(pk=self.member.pk).exists())
+
+    # --- files --------------------------------------------------------------
+
+    def test_delete(self):
+        with self.assertWithinBudget('delete'):
+            self.assertStatus(self.client.post(reverse('delete', args=[self.blob.blob_id]), **JSON), 200)
+
+    def test_download(self):
+        with self.assertWithinBudget('download'):
+            self.assertStatus(self._consume(self.client.post(reverse('download', args=[self.blob.blob_id]))), 200)
+        with self.assertWithinBudget('download_range'):
+            resp = self.client.post(reverse('download', args=[self.blob.blob_id]), HTTP_RANGE='bytes=0-99')
+            self.assertStatus(self._consume(resp), 206)
+
+    def test_chunked_upload(self):
+        with self.assertWithinBudget('upload_first_chunk'):
+            self._stage_upload('budget-up')
+        with self.assertWithinBudget('upload_status'):
+            resp = self.client.get(reverse('chunked_upload'), {'upload_id': 'budget-up'}, **JSON)
+            self.assertStatus(resp, 200)
+        with self.assertWithinBudget('upload_last_chunk'):
+            resp = self.client.post(reverse('chunked_upload'), {
+                'upload_id': 'budget-up', 'chunk_index': 1, 'total_chunks': 2, 'file_name': 'budget-up.bin',
+                'total_size': 2048, 'chunk': _chunk(),
+            }, **JSON)
+            self.assertStatus(resp, 201)
+
+        self._stage_upload('budget-cancel')
+        with self.assertWithinBudget('upload_cancel'):
+            resp = self.client.delete(reverse('chunked_upload') + '?upload_id=budget-cancel', **JSON)
+            self.assertStatus(resp, 200)
+
+    def test_cancel_download(self):
+        with self.assertWithinBudget('cancel_download'):
+            resp = self.client.post(reverse('cancel_download', args=[self.blob.blob_id]),
+                                    {'download_session_id': 'dl-1'}, content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+
+    # --- admin --------------------------------------------------------------
+
+    def test_admin_users(self):
+        self._as_admin()
+        with self.assertWithinBudget('admin_users'):
+            self.assertStatus(self.client.get(reverse('admin_users'), {'sort': 'storage'}, **JSON), 200)
+
+    def test_admin_user_changes(self):
+        self._as_admin()
+        target = self.members[1]
+        with self.assertWithinBudget('admin_update_subscription'):
+            resp = self.client.post(reverse('admin_update_subscription', args=[target.pk]),
+                                    {'subscription_type': 'PREMIUM'}, content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+        ids = [member.pk for member in self.members[1:]]
+        with self.assertWithinBudget('admin_bulk_subscription'):
+            resp = self.client.post(reverse('admin_bulk_subscription'),
+                                    {'user_ids': ids, 'subscription_type': 'STANDARD'},
+                                    content_type='application/json', **JSON)
+            self.assertStatus(resp, 200)
+        with self.assertWithinBudget('admin_delete_user'):
+            self.assertStatus(self.client.post(reverse('admin_delete_user', args=[target.pk]), **JSON), 200)
+
+    def test_admin_jobs(self):
+        self._as_admin()
+        ids = [member.pk for member in self.members[1:]]
+        with self.assertWithinBudget('admin_bulk_delete'):
+            resp = self.client.post(reverse('admin_bulk_delete'), {'user_ids': ids},
+                                    content_type='application/json', **JSON)
+            self.assertStatus(resp, 202)
+        job = AdminJob.objects.get()
+        with self.assertWithinBudget('admin_job_status'):
+            self.assertStatus(self.client.get(reverse('admin_job_status', args=[job.pk]), **JSON), 200)
+
+    def test_admin_operations(self):
+        self._as_admin()
+        with self.assertWithinBudget('admin_logging'):
+            self.assertStatus(self.client.get(reverse('admin_logging'), **JSON), 200)
+        with self.assertWithinBudget('admin_memory_diagnostics'):
+            self.assertStatus(self.client.get(reverse('admin_memory_diagnostics'), **JSON), 200)
+
+    def test_admin_analytics(self):
+        self._as_admin()
+        with self.assertWithinBudget('admin_storage_analytics'):
+            self.assertStatus(self.client.get(reverse('admin_storage_analytics'), **JSON), 200)
+        with self.assertWithinBudget('admin_usage_series'):
+            self.assertStatus(self.client.get(reverse('admin_usage_series'), {'tier': 'STARTER'}, **JSON), 200)
+
+    def test_admin_exports(self):
+        self._as_admin()
+        with self.assertWithinBudget('admin_export_users'):
+            self.assertStatus(self._consume(self.client.get(reverse('admin_export_users'))), 200)
+        with self.assertWithinBudget('admin_export_user_blobs'):
+            resp = self.client.get(reverse('admin_export_user_blobs', args=[self.member.pk]))
+            self.assertStatus(self._consume(resp), 200)
@@ -0,0 +1,118 @@
+import base64
+import json
+
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from az_intf import api as az_api
+from az_intf import local_blob_service
+from loadtest import replay
+from main.management.commands.bench_upload import create_bench_users
+from main.models import Blob
+
+# As written by gunicorn behind nginx: %(h)s is always the proxy, the client is in X-Forwarded-For
+ACCESS_LOG = [
+    '127.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "POST /login/ HTTP/1.1" 200 52 "-" "Mozilla/5.0" "198.51.100.1"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:01 +0000] "GET /home/ HTTP/1.1" 200 5120 "-" "Mozilla/5.0" "198.51.100.1"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:01 +0000] "GET /static/main/app.js HTTP/1.1" 200 900 "-" "Mozilla/5.0" "198.51.100.1"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:02 +0000] "POST /chunkedUpload/ HTTP/1.1" 200 60 "-" "Mozilla/5.0" "198.51.100.1"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:03 +0000] "POST /chunkedUpload/ HTTP/1.1" 201 80 "-" "Mozilla/5.0" "198.51.100.1"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:04 +0000] "POST /downloadFile/abc123/ HTTP/1.1" 206 3000 "-" "curl/8.0" "198.51.100.2"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:05 +0000] "GET /listFiles/?page=2 HTTP/1.1" 200 700 "-" "curl/8.0" "198.51.100.2"\n',
+    '127.0.0.1 - - [19/Oct/2026:10:00:06 +0000] "GET /metrics/ HTTP/1.1" 200 100 "-" "curl/8.0" "198.51.100.2"\n',
+    'not an access log line\n',
+]
+
+
+def _block_id(index):
+    return base64.b64encode(f"block-{index:08d}".encode()).decode()
+
+
+class ReplayWorkloadTests(SimpleTestCase):
+    def test_access_log_only(self):
+        workload = replay.build_workload(ACCESS_LOG, chunk_size=1024)
+
+        self.assertEqual([event['action'] for event in workload['events']],
+                         ['home', 'upload', 'download', 'list_files'])
+        upload = workload['events'][1]
+        self.assertEqual((upload['t'], upload['chunk_sizes']), (1.0, [1024, 1024]))
+        self.assertEqual(workload['events'][2]['bytes'], 3000)
+        self.assertEqual(workload['duration_s'], 4.0)
+        self.assertEqual(workload['summary']['unreplayed_requests'], 1)
+
+    def test_finalize_totals_override_sampled_chunk_records(self):
+        # Rate limiting kept two of five "Staged block" records; the finalize record has the totals
+        app_log = [
+            json.dumps({'ts': '2026-10-19T10:00:00.000+00:00', 'operation': 'stage_block', 'upload_id': 'up1',
+                        'chunk_index': 0, 'bytes': 1000, 'duration_ms': 1}) + '\n',
+            json.dumps({'ts': '2026-10-19T10:00:03.000+00:00', 'operation': 'stage_block', 'upload_id': 'up1',
+                        'chunk_index': 4, 'bytes': 200, 'duration_ms': 1}) + '\n',
+            json.dumps({'ts': '2026-10-19T10:00:04.000+00:00', 'operation': 'upload', 'upload_id': 'up1',
+                        'bytes': 4200, 'blocks': 5, 'duration_ms': 4000}) + '\n',
+        ]
+        workload = replay.build_workload([], app_log)
+        self.assertEqual(workload['events'][0]['chunk_sizes'], [1000, 1000, 1000, 1000, 200])
+
+    def test_concurrent_uploads_behind_proxy_stay_separate(self):
+        line = '127.0.0.1 - - [19/Oct/2026:10:00:{:02d} +0000] "POST /chunkedUpload/ HTTP/1.1" {} 60 "-" "Mozilla/5.0" "{}"\n'
+        access_log = [
+            line.format(0, 200, '198.51.100.1'),
+            line.format(1, 200, '198.51.100.2, 10.0.0.9'),
+            line.format(2, 201, '198.51.100.2, 10.0.0.9'),
+            line.format(3, 200, '198.51.100.1'),
+            line.format(4, 201, '198.51.100.1'),
+        ]
+        uploads = replay.build_workload(access_log, chunk_size=100)['events']
+        self.assertEqual([(event['t'], event['chunk_sizes']) for event in uploads],
+                         [(uploads[0]['t'], [100, 100, 100]), (uploads[0]['t'] + 1, [100, 100])])
+
+    def test_text_and_json_app_logs(self):
+        app_log = [
+            f"2026-10-19 10:00:02,100::[DEBUG]::[Container.py]::[append_chunk::570]::Staged block {_block_id(1)} for up1, size=500\n",
+            f"2026-10-19 10:00:02,000::[DEBUG]::[Container.py]::[append_chunk::570]::Staged block {_block_id(0)} for up1, size=2000\n",
+            "2026-10-19 10:00:03,000::[INFO]::[Container.py]::[finalize::632]::STREAMING UPLOAD: Successfully finalized up1, blob_id=b1, duration=1.00s\n",
+            json.dumps({'ts': '2026-10-19T10:00:04.000+00:00', 'operation': 'upload', 'upload_id': 'up2',
+                        'bytes': 2500, 'blocks': 3, 'duration_ms': 1000}) + '\n',
+            json.dumps({'ts': '2026-10-19T10:00:05.000+00:00', 'operation': 'stage_block', 'upload_id': 'up3',
+                        'chunk_index': 0, 'bytes': 100, 'duration_ms': 1}) + '\n',
+        ]
+        uploads = replay.parse_app_log(app_log)
+        self.assertEqual(uploads['up1']['chunks'], {0: 2000, 1: 500})
+        self.assertTrue(uploads['up1']['finalized'])
+
+        workload = replay.build_workload(ACCESS_LOG, app_log)
+        sizes = [event['chunk_sizes'] for event in workload['events'] if event['action'] == 'upload']
+        self.assertEqual(sorted(sizes), [[100], [834, 834, 832], [2000, 500]])
+        summary = workload['summary']
+        self.assertEqual(summary['abandoned_uploads'], 1)
+        self.assertEqual(summary['mix']['upload']['count'], 3)
+        self.assertEqual(summary['chunks_per_upload']['max'], 3)
+
+
+@override_settings(AZURE_STORAGE_BACKEND='local', LOCAL_BLOB_ROOT=None)
+class ReplayLiveServerTests(LiveServerTestCase):
+    """A built workload replayed against a real server thread and the local storage backend"""
+    def setUp(self):
+        local_blob_service.reset()
+        az_api.CONTAINER_INSTANCES.clear()
+        create_bench_users(1, prefix='rp')
+
+    def tearDown(self):
+        az_api.CONTAINER_INSTANCES.clear()
+        local_blob_service.reset()
+
+    def test_replay_compresses_time_and_cleans_up(self):
+        workload = replay.build_workload(ACCESS_LOG, chunk_size=4096)
+        options = replay.build_parser().parse_args([
+            'run', 'unused.json', '--base-url', self.live_server_url, '--users', '1', '--user-prefix', 'rp',
+            '--user-count', '1', '--speedup', '20',
+        ])
+        report = replay.replay(workload, options)
+
+        self.assertEqual(report['virtual_user_errors'], [])
+        self.assertEqual(report['events'], 4)
+        self.assertLess(report['wall_seconds'], workload['duration_s'])
+        endpoints = report['endpoints']
+        self.assertEqual(endpoints['upload_chunk']['requests'], 2)
+        for endpoint in ('login', 'home', 'upload', 'download_range', 'list_files'):
+            self.assertEqual(endpoints[endpoint]['errors'], 0, endpoints[endpoint])
+        self.assertFalse(Blob.objects.filter(blob_name__startswith='loadgen_').exists())
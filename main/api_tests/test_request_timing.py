@@ -0,0 +1,62 @@
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main import metrics, request_timing
+from main.models import UserInfo
+from storage_webapp import logger
+
+
+def _parse_server_timing(header):
+    parts = {}
+    for entry in header.split(','):
+        name, *params = [p.strip() for p in entry.split(';')]
+        parts[name] = dict(p.split('=', 1) for p in params)
+    return parts
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='timed', password='pw123', email='timed@example.com')
+        UserInfo.objects.create(user=self.user, user_name='timed', container_name='timed-container')
+        self.client.force_login(self.user)
+
+    @override_settings(DEBUG=True)
+    def test_header_breaks_down_request_time(self):
+        resp = self.client.get(reverse('home'), HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
+        parts = _parse_server_timing(resp['Server-Timing'])
+        self.assertEqual(set(parts), {'mw', 'db', 'storage', 'view', 'total'})
+        self.assertRegex(parts['db']['desc'], r'"[1-9]\d* queries"')
+        exclusive = sum(float(parts[name]['dur']) for name in ('mw', 'db', 'storage', 'view'))
+        self.assertAlmostEqual(exclusive, float(parts['total']['dur']), delta=0.1)
+
+    def test_header_is_limited_to_admins_outside_debug(self):
+        url = reverse('home')
+        self.assertNotIn('Server-Timing', self.client.get(url, HTTP_ACCEPT='application/json'))
+        self.assertNotIn('Server-Timing', self.client.get(url, HTTP_ACCEPT='application/json', HTTP_X_SERVER_TIMING='1'))
+        with override_settings(SERVER_TIMING_PUBLIC=True):
+            self.assertIn('Server-Timing', self.client.get(url, HTTP_ACCEPT='application/json'))
+
+        UserInfo.objects.filter(user=self.user).update(subscription_type='OWNER')
+        self.assertNotIn('Server-Timing', self.client.get(url, HTTP_ACCEPT='application/json'))
+        self.assertIn('Server-Timing', self.client.get(url, HTTP_ACCEPT='application/json', HTTP_X_SERVER_TIMING='1'))
+
+    def test_storage_calls_are_attributed_to_the_request(self):
+        timing, token = request_timing.start()
+        try:
+            with metrics.storage_call('download_blob'):
+                pass
+        finally:
+            request_timing.stop(token)
+        self.assertEqual(timing.storage_calls, 1)
+        self.assertIsNone(request_timing.current())
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_are_logged(self):
+        with self.assertLogs(logger, level='WARNING') as logs:
+            self.client.get(reverse('home'), HTTP_ACCEPT='application/json')
+        record = [line for line in logs.output if 'SLOW REQUEST' in line][0]
+        self.assertIn('"route": "home/"', record)
+        self.assertIn('"user_id": "{}"'.format(self.user.id), record)
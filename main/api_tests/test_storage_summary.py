@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from main.models import UserInfo, Blob, TierUsageSummary, BlobTypeSummary, DailyStorageGrowth
+from main import storage_summary
+
+
+class StorageSummaryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='summer', password='pw123', email='summer@example.com')
+        UserInfo.objects.create(user=self.user, user_name='summer', container_name='summer-container',
+                                subscription_type='STARTER')
+        storage_summary.record_user_added('STARTER')
+
+    def _add(self, name, size, blob_type='file'):
+        Blob.objects.create(blob_name=name, blob_size=size, blob_type=blob_type, user_id=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            storage_summary.record_blob_added('STARTER', blob_type, size)
+
+    def _tiers(self):
+        return {t.subscription_type: (t.user_count, t.blob_count, t.total_bytes) for t in TierUsageSummary.objects.all()}
+
+    def _types(self):
+        return {t.blob_type: (t.blob_count, t.total_bytes) for t in BlobTypeSummary.objects.all()}
+
+    def test_incremental_updates_match_compaction(self):
+        self._add('a.zip', 100)
+        self._add('b.zip', 50, 'image')
+        self._add('c.zip', 25, 'image')
+        with self.captureOnCommitCallbacks(execute=True):
+            storage_summary.record_blob_removed('STARTER', 'image', 25)
+        Blob.objects.filter(blob_name='c.zip').delete()
+
+        UserInfo.objects.filter(user=self.user).update(subscription_type='PREMIUM')
+        storage_summary.record_tier_change(self.user.id, 'STARTER', 'PREMIUM')
+
+        incremental = (self._tiers(), self._types())
+        self.assertEqual(incremental[0]['PREMIUM'], (1, 2, 150))
+        self.assertEqual(incremental[0]['STARTER'], (0, 0, 0))
+        self.assertEqual(incremental[1], {'file': (1, 100), 'image': (1, 50)})
+
+        growth = DailyStorageGrowth.objects.get()
+        self.assertEqual((growth.blobs_added, growth.bytes_added, growth.blobs_removed, growth.bytes_removed),
+                         (3, 175, 1, 25))
+
+        call_command('compact_storage_summaries', stdout=StringIO())
+        self.assertEqual(self._tiers(), {'PREMIUM': (1, 2, 150)})
+        self.assertEqual(self._types(), incremental[1])
+
+    def test_blob_deltas_wait_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            storage_summary.record_blob_added('STARTER', 'file', 100)
+            self.assertEqual(self._types(), {})
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self._types(), {'file': (1, 100)})
+        self.assertEqual(self._tiers()['STARTER'], (1, 1, 100))
+
+    def test_user_removal_drops_their_totals(self):
+        self._add('a.zip', 100)
+        self._add('b.zip', 40, 'video')
+        storage_summary.record_user_removed(self.user.id)
+        self.assertEqual(self._tiers()['STARTER'], (0, 0, 0))
+        self.assertEqual(self._types(), {'file': (0, 0), 'video': (0, 0)})
+
+    def test_analytics_endpoint_reads_summaries_only(self):
+        self._add('a.zip', 100)
+        client = Client()
+        resp = client.get(reverse('admin_storage_analytics'), HTTP_ACCEPT='application/json')
+        self.assertIn(resp.status_code, (401, 403))
+
+        UserInfo.objects.filter(user=self.user).update(subscription_type='OWNER')
+        client.force_login(self.user)
+        url = reverse('admin_storage_analytics')
+        # session + auth user + is_admin + tiers + types + top consumers + growth, then session save
+        with self.assertNumQueries(7 + 3):
+            data = client.get(url, HTTP_ACCEPT='application/json').json()
+        self.assertEqual(data['blob_types'], [{'blob_type': 'file', 'blob_count': 1, 'total_bytes': 100}])
+        self.assertEqual(data['top_consumers'][0]['user_name'], 'summer')
+        self.assertEqual(len(data['growth']), 1)
@@ -0,0 +1,103 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from main.models import UserInfo, Blob, UploadSession
+from main import storage_usage
+
+
+class StorageUsageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='usage', password='pw123', email='usage@example.com')
+        self.user_info = UserInfo.objects.create(
+            user=self.user, user_name='usage', container_name='usage-container',
+            storage_quota_bytes=10_000, storage_used_bytes=0,
+        )
+
+    def _used(self, user=None):
+        return UserInfo.objects.get(user=user or self.user).storage_used_bytes
+
+    def test_add_and_remove_usage_are_relative(self):
+        storage_usage.add_usage(self.user.id, 300)
+        storage_usage.add_usage(self.user.id, 200)
+        self.assertEqual(self._used(), 500)
+        storage_usage.remove_usage(self.user.id, 150)
+        self.assertEqual(self._used(), 350)
+
+    def test_remove_usage_never_goes_negative(self):
+        storage_usage.add_usage(self.user.id, 100)
+        storage_usage.remove_usage(self.user.id, 1000)
+        self.assertEqual(self._used(), 0)
+
+    def test_reconcile_command_repairs_only_drifted_users(self):
+        Blob.objects.create(blob_name='a.zip', blob_size=400, user_id=self.user)
+        Blob.objects.create(blob_name='b.zip', blob_size=600, user_id=self.user)
+        UserInfo.objects.filter(pk=self.user_info.pk).update(storage_used_bytes=42)
+
+        clean = User.objects.create_user(username='clean', password='pw123', email='clean@example.com')
+        UserInfo.objects.create(user=clean, user_name='clean', container_name='clean-container', storage_used_bytes=5)
+        Blob.objects.create(blob_name='c.zip', blob_size=5, user_id=clean)
+
+        empty = User.objects.create_user(username='empty', password='pw123', email='empty@example.com')
+        UserInfo.objects.create(user=empty, user_name='empty', container_name='empty-container', storage_used_bytes=77)
+
+        drift = {row[0]: row for row in storage_usage.find_usage_drift()}
+        self.assertEqual(set(drift), {self.user.id, empty.id})
+
+        out = StringIO()
+        call_command('reconcile_storage_usage', '--dry-run', stdout=out)
+        self.assertEqual(self._used(), 42)
+
+        call_command('reconcile_storage_usage', stdout=out)
+        self.assertEqual(self._used(), 1000)
+        self.assertEqual(self._used(clean), 5)
+        self.assertEqual(self._used(empty), 0)
+        self.assertEqual(list(storage_usage.find_usage_drift()), [])
+
+
+class QuotaReservationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reserve', password='pw123', email='reserve@example.com')
+        UserInfo.objects.create(
+            user=self.user, user_name='reserve', container_name='reserve-container',
+            storage_quota_bytes=1000, storage_used_bytes=200,
+        )
+
+    def _info(self):
+        return UserInfo.objects.get(user=self.user)
+
+    def _session(self, upload_id, size):
+        storage_usage.reserve_quota(self.user.id, size)
+        return UploadSession.objects.create(
+            upload_id=upload_id, user=self.user, blob_name=f'{upload_id}.zip',
+            total_size=size, reserved_bytes=size, container_name='reserve-container',
+        )
+
+    def test_parallel_reservations_cannot_overshoot_quota(self):
+        self.assertTrue(storage_usage.reserve_quota(self.user.id, 500))
+        self.assertFalse(storage_usage.reserve_quota(self.user.id, 400))
+        self.assertTrue(storage_usage.reserve_quota(self.user.id, 300))
+        self.assertEqual(self._info().storage_reserved_bytes, 800)
+        self.assertEqual(storage_usage.get_usage(self.user.id), (1000, 1000))
+
+    def test_negative_reservation_is_refused(self):
+        with self.assertRaises(ValueError):
+            storage_usage.reserve_quota(self.user.id, -10_000)
+        self.assertEqual(self._info().storage_reserved_bytes, 0)
+
+    def test_commit_moves_reservation_into_usage(self):
+        storage_usage.reserve_quota(self.user.id, 500)
+        storage_usage.commit_quota(self.user.id, 500, 480)
+        info = self._info()
+        self.assertEqual(info.storage_reserved_bytes, 0)
+        self.assertEqual(info.storage_used_bytes, 680)
+
+    def test_discard_releases_reservation_once(self):
+        self._session('up-1', 300)
+        self._session('up-2', 100)
+        self.assertTrue(storage_usage.discard_upload_session('up-1'))
+        self.assertFalse(storage_usage.discard_upload_session('up-1'))
+        self.assertEqual(self._info().storage_reserved_bytes, 100)
+        self.assertFalse(UploadSession.objects.filter(upload_id='up-1').exists())
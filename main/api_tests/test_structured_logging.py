@@ -0,0 +1,49 @@
+import json
+import logging
+from types import SimpleNamespace
+
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+from logger import JsonFormatter, RequestContextFilter, request_context
+from main.middleware import RequestLogContext
+from main.models import UserInfo
+
+
+class StructuredLoggingTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='jsonlog', password='pw123', email='jsonlog@example.com')
+        UserInfo.objects.create(user=self.user, user_name='jsonlog', container_name='jsonlog-container')
+
+    def test_request_id_is_propagated_or_generated(self):
+        resp = self.client.get(reverse('login'), HTTP_X_REQUEST_ID='edge-42.abc')
+        self.assertEqual(resp['X-Request-ID'], 'edge-42.abc')
+        resp = self.client.get(reverse('login'), HTTP_X_REQUEST_ID='bad id\nInjected: 1')
+        self.assertRegex(resp['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_records_carry_request_context_and_extra_fields(self):
+        request = SimpleNamespace(user=self.user)
+        token = request_context.set(RequestLogContext(request, 'req-1'))
+        try:
+            record = logging.makeLogRecord({
+                'msg': 'Staged block %s', 'args': ('b1',), 'levelno': logging.DEBUG, 'levelname': 'DEBUG',
+                'operation': 'stage_block', 'upload_id': 'up-1', 'bytes': 4096, 'duration_ms': 12.5,
+            })
+            RequestContextFilter().filter(record)
+        finally:
+            request_context.reset(token)
+
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry['msg'], 'Staged block b1')
+        self.assertEqual(entry['request_id'], 'req-1')
+        self.assertEqual(entry['user_id'], self.user.id)
+        self.assertEqual((entry['operation'], entry['upload_id'], entry['bytes'], entry['duration_ms']),
+                         ('stage_block', 'up-1', 4096, 12.5))
+
+        # Fields passed explicitly (e.g. from a streaming generator) win over the context
+        outside = logging.makeLogRecord({'msg': 'sent', 'request_id': 'req-2'})
+        RequestContextFilter().filter(outside)
+        self.assertEqual(outside.request_id, 'req-2')
+        self.assertIsNone(outside.user_id)
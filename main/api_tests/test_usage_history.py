@@ -0,0 +1,84 @@
+import datetime
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.db.models import F
+
+from main.models import UserInfo, Blob, UsageSnapshot
+from main import usage_history, storage_usage
+from main.admin import SUBSCRIPTION_VALUES, UserInfoAdmin
+
+
+class UsageSnapshotTests(TestCase):
+    def setUp(self):
+        self.users = []
+        for i in range(3):
+            usr = User.objects.create_user(username=f'snap{i}', password='pw123', email=f'snap{i}@example.com')
+            UserInfo.objects.create(user=usr, user_name=f'snap{i}', container_name=f'snap{i}-container',
+                                    subscription_type='STARTER' if i < 2 else 'PREMIUM')
+            self.users.append(usr)
+        Blob.objects.create(blob_name='a.zip', blob_size=10, user_id=self.users[1])
+        Blob.objects.create(blob_name='b.zip', blob_size=20, user_id=self.users[1])
+        storage_usage.add_usage(self.users[1].id, 30)
+
+    def test_admin_edit_keeps_concurrent_transfer_counters(self):
+        info = UserInfo.objects.get(user=self.users[0])  # the admin form's copy
+        info.storage_quota_bytes = SUBSCRIPTION_VALUES[info.subscription_type]
+        storage_usage.commit_quota(self.users[0].id, 0, 500)
+        UserInfo.objects.filter(pk=info.pk).update(bytes_downloaded_total=F('bytes_downloaded_total') + 70)
+
+        info.email_id = 'edited@example.com'
+        UserInfoAdmin(UserInfo, site).save_model(
+            None, info, SimpleNamespace(initial={'subscription_type': info.subscription_type}), change=True,
+        )
+        saved = UserInfo.objects.get(pk=info.pk)
+        self.assertEqual(saved.email_id, 'edited@example.com')
+        self.assertEqual((saved.bytes_uploaded_total, saved.bytes_downloaded_total), (500, 70))
+
+    def test_command_writes_one_row_per_user_per_day(self):
+        out = StringIO()
+        call_command('snapshot_usage', '--date', '2025-01-06', '--batch-size', '2', stdout=out)
+        call_command('snapshot_usage', '--date', '2025-01-06', stdout=out)
+        rows = {row.user_id: row for row in UsageSnapshot.objects.filter(date=datetime.date(2025, 1, 6))}
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[self.users[1].id].blob_count, 2)
+        self.assertEqual(rows[self.users[1].id].bytes_uploaded_total, 30)
+        self.assertEqual(rows[self.users[0].id].blob_count, 0)
+
+    def _snapshot(self, user, day, used, uploaded):
+        UsageSnapshot.objects.create(user=user, date=day, subscription_type='STARTER',
+                                     storage_used_bytes=used, bytes_uploaded_total=uploaded)
+
+    def test_weekly_series_averages_storage_and_diffs_transfer(self):
+        monday = datetime.date(2025, 1, 6)
+        for offset in range(14):
+            self._snapshot(self.users[0], monday + datetime.timedelta(days=offset), 100 * (offset // 7 + 1), 10 * offset)
+        series = usage_history.usage_series(monday, monday + datetime.timedelta(days=13),
+                                            bucket='week', user_id=self.users[0].id)
+        self.assertEqual([p['period'] for p in series], [monday, monday + datetime.timedelta(days=7)])
+        self.assertEqual([p['storage_used_bytes'] for p in series], [100, 200])
+        self.assertEqual([p['bytes_uploaded'] for p in series], [60, 70])
+
+    def test_tier_series_sums_users(self):
+        day = datetime.date(2025, 2, 1)
+        self._snapshot(self.users[0], day, 100, 0)
+        self._snapshot(self.users[1], day, 50, 0)
+        series = usage_history.usage_series(day, day, subscription_type='STARTER')
+        self.assertEqual(series[0]['storage_used_bytes'], 150)
+
+    def test_series_endpoint(self):
+        client = Client()
+        client.force_login(self.users[0])
+        url = reverse('admin_usage_series')
+        self.assertEqual(client.get(url, {'tier': 'STARTER'}, HTTP_ACCEPT='application/json').status_code, 403)
+
+        UserInfo.objects.filter(user=self.users[0]).update(subscription_type='OWNER')
+        resp = client.get(url, {'user_id': self.users[1].id, 'bucket': 'month'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(resp.status_code, 200)
+        bad = client.get(url, {'bucket': 'month'}, HTTP_ACCEPT='application/json')
+        self.assertEqual(bad.status_code, 400)
@@ -0,0 +1,124 @@
+"""
+Runtime log levels and sampling shared by every worker.
+
+The active configuration lives under one cache key (the shared Redis or file cache
+in production). The admin endpoint and the set_log_level command write it; each
+worker's LogControlMiddleware polls it at most once per LOG_CONTROL_POLL_SECONDS
+and applies changes through Logger.configure, so no restart is needed.
+
+Config shape:
+    {'version': int, 'default_level': 'DEBUG', 'modules': {'Container': 'WARNING'},
+     'rate_limits': {'Container.append_chunk_to_blob': 1}}
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from logger import Logger
+from storage_webapp import logger, severity
+
+CACHE_KEY = 'logging:control'
+DEFAULT_POLL_SECONDS = 5
+
+_applied_version = None
+_last_poll = 0.0
+
+
+def _level_value(name):
+    value = logging.getLevelName(str(name).upper())
+    if not isinstance(value, int):
+        raise ValueError(f"Unknown log level '{name}'")
+    return value
+
+
+def _rate_value(key, limit):
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError(f"Rate limit for '{key}' must be an integer")
+    if limit < 0:
+        raise ValueError(f"Rate limit for '{key}' cannot be negative")
+    return limit
+
+
+def default_config():
+    """Configuration from settings, used until someone changes it at runtime"""
+    return {
+        'version': 0,
+        'default_level': os.environ.get('CLOUDSYNK_LOG_LEVEL', 'DEBUG').upper(),
+        'modules': dict(getattr(settings, 'LOG_MODULE_LEVELS', {})),
+        'rate_limits': dict(getattr(settings, 'LOG_RATE_LIMITS', {})),
+    }
+
+
+def current_config():
+    return cache.get(CACHE_KEY) or default_config()
+
+
+def apply(config):
+    """Push a config into this process's logger"""
+    global _applied_version
+    Logger.configure(
+        _level_value(config['default_level']),
+        {module: _level_value(level) for module, level in config['modules'].items()},
+        config['rate_limits'],
+    )
+    _applied_version = config['version']
+
+
+def update_config(default_level=None, modules=None, rate_limits=None, reset=False):
+    """
+    Merge changes into the shared config, bump its version and apply it here.
+
+    A module or rate-limit value of None removes that override.
+
+    Returns:
+        dict: the new config
+    Raises:
+        ValueError: on unknown level names or invalid rate limits
+    """
+    config = current_config()
+    version = config['version'] + 1
+    if reset:
+        config = default_config()
+    if default_level is not None:
+        _level_value(default_level)
+        config['default_level'] = str(default_level).upper()
+    for module, level in (modules or {}).items():
+        if level in (None, ''):
+            config['modules'].pop(module, None)
+        else:
+            _level_value(level)
+            config['modules'][module] = str(level).upper()
+    for key, limit in (rate_limits or {}).items():
+        if limit in (None, ''):
+            config['rate_limits'].pop(key, None)
+        else:
+            config['rate_limits'][key] = _rate_value(key, limit)
+    config['version'] = version
+    cache.set(CACHE_KEY, config, None)
+    apply(config)
+    return config
+
+
+def poll(force=False):
+    """Apply the shared config if it changed; cheap enough to call on every request"""
+    global _last_poll
+    now = time.monotonic()
+    interval = getattr(settings, 'LOG_CONTROL_POLL_SECONDS', DEFAULT_POLL_SECONDS)
+    if not force and _applied_version is not None and now - _last_poll < interval:
+        return False
+    _last_poll = now
+    try:
+        config = current_config()
+    except Exception as e:
+        # Logging control must never take a request down with the cache
+        logger.log(severity['WARNING'], "LOG CONTROL POLL FAILED : %s", e)
+        return False
+    if config['version'] == _applied_version:
+        return False
+    apply(config)
+    return True
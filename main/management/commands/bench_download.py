@@ -0,0 +1,183 @@
+"""
+Management command to benchmark download streaming and range requests
+Usage: python manage.py bench_download [--file-sizes 16M,64M] [--range-sizes 1M,4M] [--concurrency 1,4,16] [--downloads-per-worker 4] [--latency-ms 0] [--trace-memory] [--output-dir DIR]
+
+Seeds one blob per file size through the chunked upload pipeline, then drives
+DownloadBlobAPIView through the Django test client against the local storage fake
+and a throwaway database (see benchmarks/harness.py). For full downloads and for
+every range size it reports time-to-first-byte, total latency, throughput and peak
+memory under N concurrent downloads. It also times reading the same blob straight
+from storage; the streamed part of a response minus that is the cost of the
+file_generator wrapper (generator_overhead_ms).
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from az_intf.api_utils import utils as app_utils
+from benchmarks import harness
+from main.management.commands.bench_upload import MIB, create_bench_users, upload_file
+from main.models import Blob, UserInfo
+
+SEED_CHUNK_SIZE = 4 * MIB
+
+
+def download_file(client, blob_id, byte_range=None):
+    """
+    Download one blob (or one inclusive (start, end) range) and consume the stream.
+
+    Returns:
+        tuple: (bytes received, time to first byte in ms, total time in ms)
+    """
+    extra = {'HTTP_RANGE': f'bytes={byte_range[0]}-{byte_range[1]}'} if byte_range else {}
+    started = time.perf_counter()
+    resp = client.post(reverse('download', args=[blob_id]), **extra)
+    if resp.status_code not in (200, 206):
+        raise CommandError(f"Download of {blob_id} failed ({resp.status_code}): {resp.content[:200]}")
+    received = 0
+    first_byte = None
+    for chunk in resp.streaming_content:
+        if first_byte is None:
+            first_byte = time.perf_counter()
+        received += len(chunk)
+    finished = time.perf_counter()
+    resp.close()
+    return received, ((first_byte or finished) - started) * 1000, (finished - started) * 1000
+
+
+def read_from_storage(container_name, blob_name):
+    """Consume a blob straight from the storage client, bypassing the view"""
+    service = app_utils.get_blob_service_client('local://bench')
+    started = time.perf_counter()
+    downloader = service.get_blob_client(container_name, blob_name).download_blob()
+    received = sum(len(chunk) for chunk in downloader.chunks())
+    return received, (time.perf_counter() - started) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full and ranged downloads against the local storage fake and write JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file-sizes', default='16M,64M', help='Comma-separated blob sizes')
+        parser.add_argument('--range-sizes', default='1M,4M', help='Comma-separated Range request sizes ("" for none)')
+        parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated numbers of parallel downloaders')
+        parser.add_argument('--downloads-per-worker', type=int, default=4, help='Requests each downloader makes per run')
+        parser.add_argument('--latency-ms', type=int, default=0, help='Simulated storage round-trip per call')
+        parser.add_argument('--trace-memory', action='store_true', help='Record the Python heap peak (slower)')
+        parser.add_argument('--output-dir', default=None, help='Where to write the results file')
+
+    def handle(self, *args, **options):
+        try:
+            file_sizes = harness.parse_list(options['file_sizes'], harness.parse_size)
+            range_sizes = harness.parse_list(options['range_sizes'], harness.parse_size)
+            concurrency_levels = harness.parse_list(options['concurrency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        payload = bytes(range(256)) * (max(file_sizes) // 256 + 1)
+        runs = []
+        overhead = []
+        with harness.benchmark_environment(latency_ms=options['latency_ms']):
+            users = create_bench_users(max(concurrency_levels))
+            for file_size in file_sizes:
+                blob_ids = self._seed(users, payload, file_size)
+                overhead.append(self._generator_overhead(users[0], blob_ids[0], file_size))
+                for range_size in [None] + [size for size in range_sizes if size < file_size]:
+                    for concurrency in concurrency_levels:
+                        runs.append(self._run(users, blob_ids, file_size, range_size, concurrency, options))
+
+        path = harness.write_results('bench_download', {
+            'file_sizes': file_sizes, 'range_sizes': range_sizes, 'concurrency': concurrency_levels,
+            'downloads_per_worker': options['downloads_per_worker'], 'latency_ms': options['latency_ms'],
+            'generator_overhead': overhead,
+        }, runs, options['output_dir'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(runs)} run(s) to {path}"))
+
+    def _seed(self, users, payload, file_size):
+        """Upload one blob of file_size per user; returns blob ids in user order"""
+        blob_ids = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            file_name = f'bench_download_{file_size}.bin'
+            upload_file(client, file_name, payload, file_size, SEED_CHUNK_SIZE, [])
+            blob_ids.append(Blob.objects.get(user_id=user, blob_name=file_name).blob_id)
+        return blob_ids
+
+    def _generator_overhead(self, user, blob_id, file_size):
+        """Time the same blob through the view and straight from storage, one request at a time"""
+        client = Client()
+        client.force_login(user)
+        container_name = UserInfo.objects.get(user=user).container_name
+        blob_name = Blob.objects.get(blob_id=blob_id).blob_name
+        # One untimed pass warms the container cache and the session
+        download_file(client, blob_id)
+        view_ms, stream_ms, storage_ms = [], [], []
+        for _ in range(5):
+            _, first_byte_ms, total_ms = download_file(client, blob_id)
+            view_ms.append(total_ms)
+            # Everything after the first byte is file_generator: chunk loop plus its finally block
+            stream_ms.append(total_ms - first_byte_ms)
+            storage_ms.append(read_from_storage(container_name, blob_name)[1])
+        stream, storage = harness.percentiles(stream_ms), harness.percentiles(storage_ms)
+        result = {
+            'file_size': file_size,
+            'view_ms': harness.percentiles(view_ms),
+            'stream_ms': stream,
+            'storage_ms': storage,
+            'generator_overhead_ms': round(stream['p50'] - storage['p50'], 3),
+        }
+        self.stdout.write(
+            f"file={file_size // 1024}K: stream p50 {stream['p50']} ms, storage p50 {storage['p50']} ms, "
+            f"generator overhead {result['generator_overhead_ms']} ms"
+        )
+        return result
+
+    def _run(self, users, blob_ids, file_size, range_size, concurrency, options):
+        ttfb, latencies, received = [], [], []
+        rng = random.Random(f'{file_size}-{range_size}-{concurrency}')
+        ranges = [
+            (start, start + range_size - 1)
+            for start in (rng.randrange(0, file_size - range_size + 1) for _ in range(concurrency * options['downloads_per_worker']))
+        ] if range_size else None
+
+        def worker(index):
+            client = Client()
+            client.force_login(users[index])
+            for n in range(options['downloads_per_worker']):
+                byte_range = ranges[index * options['downloads_per_worker'] + n] if ranges else None
+                size, first_byte_ms, total_ms = download_file(client, blob_ids[index], byte_range)
+                expected = range_size if range_size else file_size
+                if size != expected:
+                    raise CommandError(f"Expected {expected} bytes from {blob_ids[index]}, received {size}")
+                ttfb.append(first_byte_ms)
+                latencies.append(total_ms)
+                received.append(size)
+
+        with harness.memory_tracking(options['trace_memory']) as memory:
+            elapsed = harness.run_threads(concurrency, worker)
+
+        total_bytes = sum(received)
+        run = {
+            'file_size': file_size,
+            'mode': 'range' if range_size else 'full',
+            'range_size': range_size,
+            'concurrency': concurrency,
+            'downloads': len(received),
+            'bytes': total_bytes,
+            'wall_seconds': round(elapsed, 4),
+            'throughput_mib_s': round(total_bytes / MIB / elapsed, 2) if elapsed else None,
+            'ttfb_ms': harness.percentiles(ttfb),
+            'latency_ms': harness.percentiles(latencies),
+            'memory': memory,
+        }
+        label = f"range={range_size // 1024}K" if range_size else 'full'
+        self.stdout.write(
+            f"file={file_size // 1024}K {label} x{concurrency}: {run['throughput_mib_s']} MiB/s, "
+            f"ttfb p50 {run['ttfb_ms']['p50']} ms, p99 {run['ttfb_ms']['p99']} ms"
+        )
+        return run
@@ -0,0 +1,189 @@
+"""
+Management command to benchmark metadata operations at scale
+Usage: python manage.py bench_metadata [--users 10000] [--blobs-per-user 100] [--heavy-user-blobs 100000] [--repeat 5] [--batch-size 5000] [--output-dir DIR]
+
+Seeds --users users (the first one owning --heavy-user-blobs blobs, the others
+--blobs-per-user each) with benchmarks/dataset.py into a throwaway database, then
+times the metadata paths whose cost depends on data volume:
+
+    container_init      Container.__init__ for the heavy user and a regular user
+    validate            Container.validate_new_blob_addition on the heavy user
+    home_cold/warm      HomeAPIView (JSON) with an empty and a primed cache
+    list_first/deep     BlobListAPIView first page and a page reached by cursor
+    delete              DeleteBlobAPIView on the heavy user's blobs
+    admin_*             AdminUserListAPIView first page, deep page, storage sort, search
+
+Each operation records latency percentiles and DB reads/writes per call. The
+database is whatever the active settings configure; run once with the default
+settings (SQLite) and once with settings_prod and DATABASE_URL pointing at
+PostgreSQL to compare engines.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from az_intf import api as az_api
+from az_intf.api_utils import utils as app_utils
+from az_intf.api_utils.Container import Container
+from benchmarks import dataset, harness
+from main.management.commands.bench_upload import create_bench_users
+from main.models import Blob
+
+JSON = {'HTTP_ACCEPT': 'application/json'}
+
+
+class Command(BaseCommand):
+    help = 'Benchmark listing, validation, deletion and admin queries against a seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Number of users to seed')
+        parser.add_argument('--blobs-per-user', type=int, default=100, help='Blobs owned by each regular user')
+        parser.add_argument('--heavy-user-blobs', type=int, default=100000, help='Blobs owned by the heavy user')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed calls per operation')
+        parser.add_argument('--batch-size', type=int, default=dataset.BATCH_SIZE, help='Rows per bulk insert')
+        parser.add_argument('--output-dir', default=None, help='Where to write the results file')
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('--users must be at least 2 (one heavy user and one regular user)')
+        if options['heavy_user_blobs'] < options['repeat']:
+            raise CommandError('--heavy-user-blobs must be at least --repeat (deletes need blobs)')
+
+        self.repeat = options['repeat']
+        self.counter = harness.QueryCounter()
+        results = {}
+        with harness.benchmark_environment():
+            seeded = dataset.seed(
+                users=options['users'], blobs_per_user=options['blobs_per_user'],
+                heavy_users=1, heavy_user_blobs=options['heavy_user_blobs'], batch_size=options['batch_size'],
+            )
+            self.stdout.write(f"Seeded {len(seeded['users'])} users and {seeded['blobs']} blobs in {seeded['seconds']} s")
+            heavy, regular = seeded['heavy_users'][0], seeded['users'][-1]
+            admin = create_bench_users(1, prefix='benchadmin')[0]
+            admin.is_staff = True
+            admin.save(update_fields=['is_staff'])
+
+            with self.counter.installed():
+                results.update(self._container_ops(heavy, regular))
+                results.update(self._view_ops(heavy))
+                results.update(self._delete_ops(heavy))
+                results.update(self._admin_ops(admin))
+
+        path = harness.write_results('bench_metadata', {
+            'users': options['users'], 'blobs_per_user': options['blobs_per_user'],
+            'heavy_user_blobs': options['heavy_user_blobs'], 'repeat': options['repeat'],
+            'seeded_blobs': seeded['blobs'], 'seed_seconds': seeded['seconds'],
+        }, results, options['output_dir'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} operation(s) to {path}"))
+
+    def _measure(self, name, call, before=None):
+        """Time repeat calls of call(iteration); before(iteration) runs untimed and unmetered first"""
+        latencies = []
+        reads = writes = 0
+        for iteration in range(self.repeat):
+            if before is not None:
+                before(iteration)
+            reads_before, writes_before = self.counter.reads, self.counter.writes
+            started = time.perf_counter()
+            call(iteration)
+            latencies.append((time.perf_counter() - started) * 1000)
+            reads += self.counter.reads - reads_before
+            writes += self.counter.writes - writes_before
+        result = {
+            'latency_ms': harness.percentiles(latencies),
+            'db_reads_per_call': round(reads / self.repeat, 2),
+            'db_writes_per_call': round(writes / self.repeat, 2),
+        }
+        self.stdout.write(
+            f"{name}: p50 {result['latency_ms']['p50']} ms, max {result['latency_ms']['max']} ms, "
+            f"{result['db_reads_per_call']} reads / {result['db_writes_per_call']} writes per call"
+        )
+        return {name: result}
+
+    @staticmethod
+    def _client(user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    @staticmethod
+    def _expect(resp, name, statuses=(200,)):
+        if resp.status_code not in statuses:
+            raise CommandError(f"{name} failed ({resp.status_code}): {resp.content[:200]}")
+        return resp
+
+    def _container_ops(self, heavy, regular):
+        results = {}
+        results.update(self._measure('container_init_heavy', lambda _: Container(heavy.username)))
+        results.update(self._measure('container_init_regular', lambda _: Container(regular.username)))
+        container = Container(heavy.username)
+        results.update(self._measure(
+            'validate_new_name', lambda i: container.validate_new_blob_addition(1024, f'new_{i}.bin'),
+        ))
+        results.update(self._measure(
+            'validate_existing_name', lambda _: container.validate_new_blob_addition(1024, 'file_0000000.bin'),
+        ))
+        return results
+
+    def _view_ops(self, heavy):
+        client = self._client(heavy)
+        results = {}
+        home = lambda _: self._expect(client.get(reverse('home'), **JSON), 'home')
+        results.update(self._measure('home_cold', home, before=lambda _: cache.clear()))
+        results.update(self._measure('home_warm', home))
+
+        list_url = reverse('list_files')
+        results.update(self._measure(
+            'list_first_page', lambda _: self._expect(client.get(list_url, {'sort': 'name'}, **JSON), 'list_files'),
+        ))
+        # Walk a few pages in to get a cursor from the middle of the listing
+        cursor = None
+        for _ in range(3):
+            page = self._expect(client.get(list_url, {'sort': 'size', 'cursor': cursor or ''}, **JSON), 'list_files').json()
+            cursor = page['next_cursor'] or cursor
+        results.update(self._measure(
+            'list_deep_page',
+            lambda _: self._expect(client.get(list_url, {'sort': 'size', 'cursor': cursor or ''}, **JSON), 'list_files'),
+        ))
+        return results
+
+    def _delete_ops(self, heavy):
+        client = self._client(heavy)
+        container_name = heavy.userinfo.container_name
+        blobs = list(Blob.objects.filter(user_id=heavy).order_by('blob_id').values_list('blob_id', 'blob_name')[:self.repeat])
+        # Seeded rows have no stored object; give the ones being deleted an empty one
+        container_client = app_utils.get_blob_service_client('local://bench').get_container_client(container_name)
+        container_client.create_container()
+        for _, blob_name in blobs:
+            blob_client = container_client.get_blob_client(blob_name)
+            blob_client.stage_block('b0', b'')
+            blob_client.commit_block_list(['b0'])
+
+        def prime(_):
+            # Every delete drops the cached Container, so each measured call pays for a rebuild
+            az_api.CONTAINER_INSTANCES.clear()
+
+        return self._measure(
+            'delete', lambda i: self._expect(client.post(reverse('delete', args=[blobs[i][0]]), **JSON), 'delete'),
+            before=prime,
+        )
+
+    def _admin_ops(self, admin):
+        client = self._client(admin)
+        url = reverse('admin_users')
+        cases = {
+            'admin_first_page': {},
+            'admin_deep_page': {'page': 200},
+            'admin_sort_storage': {'sort': 'storage'},
+            'admin_search': {'q': 'scale99'},
+        }
+        results = {}
+        for name, params in cases.items():
+            results.update(self._measure(
+                name, lambda _, name=name, params=params: self._expect(client.get(url, params, **JSON), name),
+            ))
+        return results
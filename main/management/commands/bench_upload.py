@@ -0,0 +1,143 @@
+"""
+Management command to benchmark the chunked upload pipeline
+Usage: python manage.py bench_upload [--chunk-sizes 256K,1M,4M,16M,64M] [--file-sizes 16M,64M] [--concurrency 1,4] [--files-per-worker 1] [--latency-ms 0] [--trace-memory] [--output-dir DIR]
+
+Drives ChunkedUploadAPIView -> initialize_streaming_upload -> append_chunk_to_blob ->
+finalize_streaming_upload through the Django test client against the local storage
+fake and a throwaway database (see benchmarks/harness.py). Reports throughput,
+per-chunk latency, DB reads/writes per chunk and peak memory for every combination
+and writes them to a JSON results file.
+"""
+
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from az_intf.api_utils import utils as app_utils
+from benchmarks import harness
+from main.models import UserInfo
+
+MIB = 1024 * 1024
+
+
+def create_bench_users(count, prefix='bench'):
+    """Users (and their storage containers) with a quota large enough for any benchmark run"""
+    service = app_utils.get_blob_service_client('local://bench')
+    users = []
+    for i in range(count):
+        user = User.objects.create_user(username=f'{prefix}{i}', password='bench-pw', email=f'{prefix}{i}@example.com')
+        UserInfo.objects.create(
+            user=user, user_name=user.username, container_name=f'{prefix}{i}-container',
+            storage_quota_bytes=1 << 50,
+        )
+        service.get_container_client(f'{prefix}{i}-container').create_container()
+        users.append(user)
+    return users
+
+
+def upload_file(client, file_name, payload, file_size, chunk_size, latencies):
+    """Upload one file chunk by chunk, appending each chunk's latency in ms"""
+    upload_id = uuid.uuid4().hex
+    total_chunks = max(1, -(-file_size // chunk_size))
+    for chunk_index in range(total_chunks):
+        start = chunk_index * chunk_size
+        data = payload[start:min(start + chunk_size, file_size)]
+        started = time.perf_counter()
+        resp = client.post(reverse('chunked_upload'), {
+            'upload_id': upload_id,
+            'chunk_index': chunk_index,
+            'total_chunks': total_chunks,
+            'file_name': file_name,
+            'total_size': file_size,
+            'chunk': SimpleUploadedFile('chunk', data, content_type='application/octet-stream'),
+        }, HTTP_ACCEPT='application/json')
+        latencies.append((time.perf_counter() - started) * 1000)
+        if resp.status_code not in (200, 201):
+            raise CommandError(f"Chunk {chunk_index} of {file_name} failed ({resp.status_code}): {resp.content[:200]}")
+    return total_chunks
+
+
+class Command(BaseCommand):
+    help = 'Benchmark chunked uploads against the local storage fake and write JSON results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-sizes', default='256K,1M,4M,16M,64M', help='Comma-separated chunk sizes')
+        parser.add_argument('--file-sizes', default='16M,64M', help='Comma-separated file sizes')
+        parser.add_argument('--concurrency', default='1,4', help='Comma-separated numbers of parallel uploaders')
+        parser.add_argument('--files-per-worker', type=int, default=1, help='Files each uploader sends per run')
+        parser.add_argument('--latency-ms', type=int, default=0, help='Simulated storage round-trip per call')
+        parser.add_argument('--trace-memory', action='store_true', help='Record the Python heap peak (slower)')
+        parser.add_argument('--output-dir', default=None, help='Where to write the results file')
+
+    def handle(self, *args, **options):
+        try:
+            chunk_sizes = harness.parse_list(options['chunk_sizes'], harness.parse_size)
+            file_sizes = harness.parse_list(options['file_sizes'], harness.parse_size)
+            concurrency_levels = harness.parse_list(options['concurrency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        payload = bytes(range(256)) * (max(file_sizes) // 256 + 1)
+        runs = []
+        with harness.benchmark_environment(latency_ms=options['latency_ms']):
+            users = create_bench_users(max(concurrency_levels))
+            for file_size in file_sizes:
+                for chunk_size in chunk_sizes:
+                    # A chunk larger than the file is the same run as chunk == file
+                    if chunk_size > file_size and file_size in chunk_sizes:
+                        continue
+                    for concurrency in concurrency_levels:
+                        runs.append(self._run(users, payload, file_size, chunk_size, concurrency, options))
+
+        path = harness.write_results('bench_upload', {
+            'chunk_sizes': chunk_sizes, 'file_sizes': file_sizes, 'concurrency': concurrency_levels,
+            'files_per_worker': options['files_per_worker'], 'latency_ms': options['latency_ms'],
+        }, runs, options['output_dir'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(runs)} run(s) to {path}"))
+
+    def _run(self, users, payload, file_size, chunk_size, concurrency, options):
+        latencies = []
+        chunks = []
+        counter = harness.QueryCounter()
+        run_id = uuid.uuid4().hex[:8]
+
+        def worker(index):
+            client = Client()
+            client.force_login(users[index])
+            with counter.installed():
+                for n in range(options['files_per_worker']):
+                    chunks.append(upload_file(
+                        client, f'bench_{run_id}_{index}_{n}.bin', payload, file_size, chunk_size, latencies,
+                    ))
+
+        with harness.memory_tracking(options['trace_memory']) as memory:
+            elapsed = harness.run_threads(concurrency, worker)
+
+        total_chunks = sum(chunks)
+        total_bytes = file_size * len(chunks)
+        run = {
+            'file_size': file_size,
+            'chunk_size': chunk_size,
+            'concurrency': concurrency,
+            'files': len(chunks),
+            'chunks': total_chunks,
+            'bytes': total_bytes,
+            'wall_seconds': round(elapsed, 4),
+            'throughput_mib_s': round(total_bytes / MIB / elapsed, 2) if elapsed else None,
+            'chunk_latency_ms': harness.percentiles(latencies),
+            # Counted on the uploader threads' connections (includes session and auth queries)
+            'db_writes_per_chunk': round(counter.writes / total_chunks, 2),
+            'db_reads_per_chunk': round(counter.reads / total_chunks, 2),
+            'memory': memory,
+        }
+        self.stdout.write(
+            f"file={file_size // 1024}K chunk={chunk_size // 1024}K x{concurrency}: "
+            f"{run['throughput_mib_s']} MiB/s, p50 {run['chunk_latency_ms']['p50']} ms, "
+            f"p99 {run['chunk_latency_ms']['p99']} ms, {run['db_writes_per_chunk']} writes/chunk"
+        )
+        return run
@@ -0,0 +1,33 @@
+"""
+Management command to rebuild the materialized storage analytics tables
+Usage: python manage.py compact_storage_summaries [--keep-days 365]
+
+Run periodically (e.g. nightly from cron), and once after first deploying the
+summary tables to seed them. Uploads and deletes keep the summaries current
+incrementally; this job repairs anything that bypassed them (such as cascade
+deletes) and prunes old daily growth rows.
+"""
+
+from django.core.management.base import BaseCommand
+from main.storage_summary import compact_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild tier and blob type storage summaries and prune old daily growth rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=365,
+            help='Number of days of daily growth history to keep'
+        )
+
+    def handle(self, *args, **options):
+        result = compact_summaries(keep_days=options['keep_days'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {result['tiers']} tier and {result['types']} blob type summaries, "
+                f"pruned {result['pruned_days']} day(s) of growth history"
+            )
+        )
@@ -0,0 +1,92 @@
+"""
+Management command to generate a synthetic dataset for load tests and scale benchmarks
+Usage: python manage.py generate_dataset [--users 1000] [--blobs-per-user 50] [--distribution pareto] [--heavy-users 0] [--heavy-user-blobs 0] [--directories-per-user 3] [--upload-sessions 100] [--stale-session-ratio 0.2] [--tiers] [--max-blob-size 4G] [--prefix synth] [--seed 0] [--batch-size 5000] [--storage sparse|random] [--force]
+
+Writes users (password 'bench-pw'), UserInfo rows, directories, blobs and in-flight
+upload sessions into the configured database with bulk inserts (see
+benchmarks/dataset.py), then rebuilds the storage summary tables so admin
+analytics match. --storage also creates the blob objects on the local storage
+backend and needs AZURE_STORAGE_BACKEND=local and LOCAL_BLOB_ROOT: the in-memory
+store would hold every object in RAM and vanish when this process exits.
+
+Refuses to run with DEBUG off (production settings) unless --force is given.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import dataset, harness
+from main.storage_summary import compact_summaries
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic users, blobs, directories and upload sessions with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users to create')
+        parser.add_argument('--blobs-per-user', type=int, default=50, help='Mean blobs per regular user')
+        parser.add_argument('--distribution', choices=dataset.DISTRIBUTIONS, default='pareto',
+                            help='Blobs per user: the same for everyone or Pareto-skewed around the mean')
+        parser.add_argument('--heavy-users', type=int, default=0, help='Users that own --heavy-user-blobs each')
+        parser.add_argument('--heavy-user-blobs', type=int, default=0, help='Blobs owned by each heavy user')
+        parser.add_argument('--directories-per-user', type=int, default=3, help='Directories per user')
+        parser.add_argument('--upload-sessions', type=int, default=100, help='In-flight upload sessions to create')
+        parser.add_argument('--stale-session-ratio', type=float, default=0.2,
+                            help='Fraction of upload sessions already past their TTL')
+        parser.add_argument('--tiers', action='store_true',
+                            help='Spread users over subscription tiers with their quotas (default: unlimited quota)')
+        parser.add_argument('--max-blob-size', default='4G', help='Upper bound for a single blob size')
+        parser.add_argument('--prefix', default='synth', help='Username prefix')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for reproducible datasets')
+        parser.add_argument('--batch-size', type=int, default=dataset.BATCH_SIZE, help='Rows per bulk insert')
+        parser.add_argument('--storage', choices=dataset.STORAGE_MODES, default=None,
+                            help='Also create blob objects on the local backend: zero-filled sparse or random bytes')
+        parser.add_argument('--force', action='store_true', help='Run even when DEBUG is off')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError('Refusing to generate synthetic data with DEBUG off; pass --force if this is not production')
+        if options['storage'] and getattr(settings, 'AZURE_STORAGE_BACKEND', 'azure') != 'local':
+            raise CommandError('--storage requires AZURE_STORAGE_BACKEND=local')
+        if options['storage'] and not getattr(settings, 'LOCAL_BLOB_ROOT', None):
+            raise CommandError('--storage requires LOCAL_BLOB_ROOT; the in-memory store does not outlive this command')
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Users with prefix '{options['prefix']}' already exist; choose another --prefix")
+        try:
+            max_blob_size = harness.parse_size(options['max_blob_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        try:
+            result = dataset.seed(
+                users=options['users'],
+                blobs_per_user=options['blobs_per_user'],
+                heavy_users=options['heavy_users'],
+                heavy_user_blobs=options['heavy_user_blobs'],
+                prefix=options['prefix'],
+                seed=options['seed'],
+                batch_size=options['batch_size'],
+                distribution=options['distribution'],
+                directories_per_user=options['directories_per_user'],
+                upload_sessions=options['upload_sessions'],
+                stale_session_ratio=options['stale_session_ratio'],
+                tiers=options['tiers'],
+                max_blob_size=max_blob_size,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            f"Created {len(result['users'])} users, {result['blobs']} blobs ({result['bytes']} bytes), "
+            f"{result['directories']} directories and {result['upload_sessions']} upload sessions "
+            f"in {result['seconds']} s"
+        )
+
+        summaries = compact_summaries()
+        self.stdout.write(f"Rebuilt {summaries['tiers']} tier and {summaries['types']} blob type summaries")
+
+        if options['storage']:
+            stored = dataset.populate_storage(result['users'], options['storage'])
+            self.stdout.write(f"Wrote {stored['objects']} {options['storage']} objects ({stored['bytes']} bytes)")
+
+        self.stdout.write(self.style.SUCCESS(f"Dataset '{options['prefix']}' ready"))
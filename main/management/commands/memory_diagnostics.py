@@ -0,0 +1,83 @@
+"""
+Management command to drive tracemalloc diagnostics in a running web worker
+Usage: python manage.py memory_diagnostics {status,start,snapshot,diff,stop} [--pid 1234] [--url http://127.0.0.1:8000] [--token TOKEN] [--top 20] [--frames 10] [--reset]
+
+Runs on the application host and talks to /admin/diagnostics/memory/, authenticating
+with METRICS_TOKEN (or --token); the endpoint does not trust the caller's address
+because proxied public requests arrive from loopback too. Tracing state lives inside
+one worker, so pass --pid to target the same worker across calls; the request is
+retried until that worker answers.
+Typical leak hunt: start, let traffic run, diff (repeat with --reset), stop.
+"""
+
+import json
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from main.memory_diagnostics import ACTIONS, DEFAULT_TOP, DEFAULT_FRAMES
+
+ENDPOINT = '/admin/diagnostics/memory/'
+
+
+class Command(BaseCommand):
+    help = 'Start, snapshot, diff or stop tracemalloc in a web worker and print the report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=ACTIONS)
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Base URL of the local web server'
+        )
+        parser.add_argument(
+            '--token',
+            default=None,
+            help='Bearer token accepted by the endpoint (default: settings.METRICS_TOKEN)'
+        )
+        parser.add_argument(
+            '--pid',
+            type=int,
+            help='Worker pid to target (from a previous report)'
+        )
+        parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='Allocation sites to report')
+        parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='Stack depth recorded by start')
+        parser.add_argument('--reset', action='store_true', help='Make the diff snapshot the new baseline')
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=50,
+            help='Requests to make before giving up on reaching --pid'
+        )
+
+    def handle(self, *args, **options):
+        url = options['url'].rstrip('/') + ENDPOINT
+        token = options['token'] or getattr(settings, 'METRICS_TOKEN', None)
+        if not token:
+            raise CommandError("Set METRICS_TOKEN (or pass --token); the endpoint is otherwise admin-session only")
+        headers = {'Connection': 'close', 'Authorization': f'Bearer {token}'}
+        payload = {
+            'action': options['action'],
+            'pid': options['pid'],
+            'top': options['top'],
+            'frames': options['frames'],
+            'reset': options['reset'],
+        }
+        for _ in range(max(options['attempts'], 1)):
+            try:
+                # A fresh connection per attempt lets a different worker accept it
+                resp = requests.post(url, json=payload, headers=headers, timeout=30)
+            except requests.RequestException as e:
+                raise CommandError(f"Could not reach {url}: {e}")
+            if resp.status_code != 409:
+                break
+        else:
+            raise CommandError(f"Worker {options['pid']} did not answer after {options['attempts']} attempts")
+
+        try:
+            body = resp.json()
+        except ValueError:
+            raise CommandError(f"Unexpected response ({resp.status_code}) from {url}")
+        if not body.get('success'):
+            raise CommandError(body.get('error', f"Request failed with status {resp.status_code}"))
+        self.stdout.write(json.dumps(body, indent=2))
@@ -0,0 +1,36 @@
+"""
+Management command to repair drift in UserInfo.storage_used_bytes
+Usage: python manage.py reconcile_storage_usage [--dry-run] [--chunk-size 2000]
+
+Run periodically (e.g. nightly from cron). Request paths never recompute usage;
+they maintain it with atomic increments, so this is only a safety net.
+"""
+
+from django.core.management.base import BaseCommand
+from main.storage_usage import reconcile_usage
+
+
+class Command(BaseCommand):
+    help = 'Reconcile recorded storage usage with the sum of blob sizes for every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drifted users, do not fix them'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per round-trip while streaming aggregates'
+        )
+
+    def handle(self, *args, **options):
+        result = reconcile_usage(chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f"Found {result['drifted']} user(s) with drifted storage usage (dry run)")
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Reconciled {result['fixed']} of {result['drifted']} drifted user(s)")
+            )
@@ -0,0 +1,43 @@
+"""
+Management command to execute queued or abandoned bulk admin jobs
+Usage: python manage.py run_admin_jobs [--stale-minutes 10] [--batch-size 25]
+
+Jobs normally run on a background thread in the web worker that accepted them.
+Run this periodically (e.g. every few minutes from cron) to pick up jobs that are
+still PENDING (ADMIN_JOBS_IN_THREAD = False) or whose worker stopped heartbeating.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from main.admin_jobs import run_job, JOB_BATCH_SIZE
+from main.models import AdminJob
+
+
+class Command(BaseCommand):
+    help = 'Run pending admin jobs and resume RUNNING jobs whose heartbeat went stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=10,
+            help='Resume RUNNING jobs with no progress for this many minutes'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=JOB_BATCH_SIZE,
+            help='Items processed between progress updates'
+        )
+
+    def handle(self, *args, **options):
+        stale_before = timezone.now() - timezone.timedelta(minutes=options['stale_minutes'])
+        job_ids = list(
+            AdminJob.objects.filter(status__in=["PENDING", "RUNNING"]).order_by('created_at')
+            .values_list('pk', flat=True)
+        )
+        ran = 0
+        for job_id in job_ids:
+            if run_job(job_id, batch_size=options['batch_size'], stale_before=stale_before):
+                ran += 1
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} admin job(s)"))
@@ -0,0 +1,56 @@
+"""
+Management command to change log levels and sampling in every running worker
+Usage: python manage.py set_log_level [--default INFO] [--module Container=WARNING ...] [--rate-limit views.post=2 ...] [--reset]
+
+Writes the shared config in the cache; workers apply it within LOG_CONTROL_POLL_SECONDS.
+Use an empty value (--module Container=) to drop an override. With no options the
+current config is printed.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from main.log_control import current_config, update_config
+
+
+def _pairs(values, option):
+    pairs = {}
+    for value in values or []:
+        key, sep, setting = value.partition('=')
+        if not sep or not key:
+            raise CommandError(f"{option} expects NAME=VALUE, got '{value}'")
+        pairs[key] = setting
+    return pairs
+
+
+class Command(BaseCommand):
+    help = 'Change runtime log levels and DEBUG rate limits for all workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--default', help='Level for modules without an override')
+        parser.add_argument(
+            '--module',
+            action='append',
+            help='Per-module level as MODULE=LEVEL (module is the file name without .py)'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            action='append',
+            help='DEBUG records per second per call site as MODULE[.FUNCTION]=N'
+        )
+        parser.add_argument('--reset', action='store_true', help='Start again from the settings defaults')
+
+    def handle(self, *args, **options):
+        modules = _pairs(options['module'], '--module')
+        rate_limits = _pairs(options['rate_limit'], '--rate-limit')
+        if not (options['default'] or modules or rate_limits or options['reset']):
+            self.stdout.write(json.dumps(current_config(), indent=2))
+            return
+        try:
+            config = update_config(
+                default_level=options['default'], modules=modules, rate_limits=rate_limits, reset=options['reset']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps(config, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Log config version {config['version']} saved"))
@@ -0,0 +1,42 @@
+"""
+Management command to record today's per-user usage snapshot
+Usage: python manage.py snapshot_usage [--date YYYY-MM-DD] [--batch-size 1000]
+
+Run once a day (e.g. from cron shortly after midnight). Safe to re-run: users that
+already have a row for the date are skipped.
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from main.usage_history import take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Write one UsageSnapshot row per user for the given day'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            default=None,
+            help='Snapshot date (YYYY-MM-DD), defaults to today'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk insert and per streaming round-trip'
+        )
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['date']}', expected YYYY-MM-DD")
+
+        processed = take_snapshots(day, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {processed} user(s) for {day}"))
@@ -0,0 +1,148 @@
+"""
+Per-worker memory diagnostics built on tracemalloc.
+
+State lives in the worker process that serves the request: tracing is started,
+snapshotted and stopped in whichever gunicorn worker handles the call, and every
+report carries its pid. Callers that need one particular worker pass the pid they
+expect and retry on a mismatch (see the memory_diagnostics management command).
+
+Tracing costs CPU and memory on every allocation, so it stays off until started
+and should be stopped again once the leak is found.
+"""
+import gc
+import os
+import threading
+import tracemalloc
+
+from az_intf import api as az_api
+
+ACTIONS = ('status', 'start', 'snapshot', 'diff', 'stop')
+DEFAULT_TOP = 20
+DEFAULT_FRAMES = 10
+MAX_TOP = 200
+
+_lock = threading.Lock()
+_baseline = None  # tracemalloc.Snapshot taken by start() or the last diff(reset=True)
+
+# Allocations made by tracemalloc itself or by imports are noise for leak hunting
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def _rss_bytes():
+    """Current resident set size from /proc, or None where unavailable"""
+    try:
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _site(traceback):
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def _serialize_stats(stats, top):
+    return [{'site': _site(stat.traceback), 'size_bytes': stat.size, 'count': stat.count} for stat in stats[:top]]
+
+
+def _serialize_diff(stats, top):
+    return [
+        {
+            'site': _site(stat.traceback),
+            'size_bytes': stat.size,
+            'size_diff_bytes': stat.size_diff,
+            'count': stat.count,
+            'count_diff': stat.count_diff,
+        }
+        for stat in stats[:top]
+    ]
+
+
+def status():
+    """
+    Report this worker's memory state.
+
+    Returns:
+        dict: pid, RSS, tracemalloc state, gc counts and container cache sizes
+    """
+    report = {
+        'pid': os.getpid(),
+        'rss_bytes': _rss_bytes(),
+        'tracing': tracemalloc.is_tracing(),
+        'has_baseline': _baseline is not None,
+        'gc_counts': list(gc.get_count()),
+        'container_cache': az_api.container_cache_stats(),
+    }
+    if report['tracing']:
+        current, peak = tracemalloc.get_traced_memory()
+        report['traced_bytes'] = current
+        report['traced_peak_bytes'] = peak
+    return report
+
+
+def start(frames=DEFAULT_FRAMES):
+    """Start tracing (if not already) and take a baseline snapshot"""
+    global _baseline
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _baseline = _take_snapshot()
+    return status()
+
+
+def stop():
+    """Stop tracing and drop the baseline so the traced memory is freed"""
+    global _baseline
+    with _lock:
+        _baseline = None
+        tracemalloc.stop()
+    return status()
+
+
+def snapshot(top=DEFAULT_TOP):
+    """Top allocation sites currently alive, grouped by file and line"""
+    if not tracemalloc.is_tracing():
+        raise ValueError('tracemalloc is not running in this worker; start it first')
+    stats = _take_snapshot().statistics('lineno')
+    return {**status(), 'top': _serialize_stats(stats, top)}
+
+
+def diff(top=DEFAULT_TOP, reset=False):
+    """Allocation sites that grew most since the baseline; reset=True makes this snapshot the new baseline"""
+    global _baseline
+    if not tracemalloc.is_tracing():
+        raise ValueError('tracemalloc is not running in this worker; start it first')
+    with _lock:
+        if _baseline is None:
+            raise ValueError('No baseline snapshot in this worker; start tracing first')
+        current = _take_snapshot()
+        stats = current.compare_to(_baseline, 'lineno')
+        if reset:
+            _baseline = current
+    return {**status(), 'top': _serialize_diff(stats, top)}
+
+
+def run_action(action, top=DEFAULT_TOP, frames=DEFAULT_FRAMES, reset=False):
+    """Dispatch one of ACTIONS; raises ValueError for unknown actions or missing state"""
+    top = max(1, min(int(top), MAX_TOP))
+    if action == 'status':
+        return status()
+    if action == 'start':
+        return start(frames=int(frames))
+    if action == 'snapshot':
+        return snapshot(top=top)
+    if action == 'diff':
+        return diff(top=top, reset=reset)
+    if action == 'stop':
+        return stop()
+    raise ValueError(f"Unknown action '{action}'; expected one of {', '.join(ACTIONS)}")
@@ -0,0 +1,297 @@
+"""
+Prometheus-style metrics that work across gunicorn worker processes.
+
+Each process keeps its own in-memory registry (guarded by a lock) and periodically
+writes it to METRICS_DIR/metrics_<pid>.json with an atomic rename. The /metrics
+view merges every process file (counters and histogram buckets are summed) and
+renders the Prometheus text exposition format.
+
+Workers come and go (gunicorn max_requests), so each scrape folds the files of dead
+pids into METRICS_DIR/metrics_exited.json; the directory stays at one file per live
+worker and totals never go backwards. A worker that inherits a recycled pid folds
+the previous owner's file before its first write. Folding and reading take a lock
+file, so a scrape never counts a folded file twice. Clear METRICS_DIR on deploy.
+
+No third-party client is needed; only Counter and Histogram are supported.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import request_timing
+
+FLUSH_INTERVAL_SECONDS = 1.0
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+EXITED_FILE = 'metrics_exited.json'
+LOCK_FILE = '.metrics.lock'
+
+_lock = threading.Lock()
+_metrics = {}  # name -> Counter | Histogram
+_last_flush = 0.0
+_claimed_pid = None  # pid whose stale file (left by a dead process with the same pid) was folded
+
+
+def _metrics_dir():
+    return str(getattr(settings, 'METRICS_DIR', os.path.join(settings.BASE_DIR, 'log', 'metrics')))
+
+
+def _label_key(labelnames, labels):
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values tuple -> float
+        _metrics[name] = self
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dump(self):
+        return [[list(key), value] for key, value in self.values.items()]
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values tuple -> [per-bucket counts..., +Inf count, sum]
+        _metrics[name] = self
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with _lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def dump(self):
+        return [[list(key), list(state)] for key, state in self.values.items()]
+
+
+# ---------------------------------------------------------------------------
+# Application metrics
+# ---------------------------------------------------------------------------
+REQUEST_SECONDS = Histogram(
+    'cloudsynk_http_request_duration_seconds', 'HTTP request latency by route',
+    ('method', 'route', 'status'))
+UPLOAD_BYTES = Counter('cloudsynk_upload_bytes_total', 'Bytes staged to storage by chunked uploads')
+DOWNLOAD_BYTES = Counter('cloudsynk_download_bytes_total', 'Bytes streamed to clients by downloads')
+CHUNK_STAGE_SECONDS = Histogram('cloudsynk_chunk_stage_seconds', 'Latency of staging one upload chunk (stage_block)')
+COMMIT_SECONDS = Histogram('cloudsynk_commit_seconds', 'Latency of committing an upload (commit_block_list)')
+STORAGE_CALLS = Counter(
+    'cloudsynk_storage_calls_total', 'Storage SDK calls by operation and outcome', ('operation', 'outcome'))
+CONTAINER_CACHE = Counter(
+    'cloudsynk_container_cache_total', 'Per-worker container instance cache lookups', ('result',))
+
+
+@contextmanager
+def storage_call(operation, histogram=None):
+    """Count a storage SDK call by outcome, attribute it to the current request and optionally observe its latency"""
+    start = time.perf_counter()
+    outcome = 'success'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STORAGE_CALLS.inc(operation=operation, outcome=outcome)
+        request_timing.record_storage(elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed)
+
+
+# ---------------------------------------------------------------------------
+# Multiprocess persistence
+# ---------------------------------------------------------------------------
+@contextmanager
+def _directory_lock(directory, exclusive):
+    with open(os.path.join(directory, LOCK_FILE), 'a') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # alive, owned by another user
+    return True
+
+
+def _pid_of(path):
+    name = os.path.basename(path)[len('metrics_'):-len('.json')]
+    return int(name) if name.isdigit() else None
+
+
+def _merge(merged, data):
+    for name, samples in data.items():
+        target = merged.setdefault(name, {})
+        for labels, value in samples:
+            key = tuple(labels)
+            if isinstance(value, list):
+                current = target.get(key)
+                target[key] = value if current is None else [a + b for a, b in zip(current, value)]
+            else:
+                target[key] = target.get(key, 0) + value
+    return merged
+
+
+def _read(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return None  # gone, being replaced or a foreign file; the next scrape will see it
+
+
+def _write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as handle:
+        json.dump(data, handle)
+    os.replace(tmp_path, path)
+
+
+def _fold(directory, paths):
+    """Add the given process files to the exited-workers file and delete them (caller holds the exclusive lock)"""
+    exited_path = os.path.join(directory, EXITED_FILE)
+    merged = _merge({}, _read(exited_path) or {})
+    folded = []
+    for path in paths:
+        data = _read(path)
+        if data is not None:
+            _merge(merged, data)
+            folded.append(path)
+    if not folded:
+        return
+    _write(exited_path, {name: [[list(key), value] for key, value in samples.items()]
+                         for name, samples in merged.items()})
+    for path in folded:
+        os.remove(path)
+
+
+def _fold_dead_workers(directory):
+    dead = [path for path in glob.glob(os.path.join(directory, 'metrics_*.json'))
+            if (pid := _pid_of(path)) is not None and pid != os.getpid() and not _pid_alive(pid)]
+    if dead:
+        with _directory_lock(directory, exclusive=True):
+            _fold(directory, dead)
+
+
+def flush(force=False):
+    """Write this process's registry to its file (at most once per FLUSH_INTERVAL_SECONDS)"""
+    global _last_flush, _claimed_pid
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL_SECONDS:
+        return
+    _last_flush = now
+    with _lock:
+        snapshot = {name: metric.dump() for name, metric in _metrics.items() if metric.values}
+    directory = _metrics_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"metrics_{os.getpid()}.json")
+    if _claimed_pid != os.getpid():
+        # A file under our pid was written by an earlier process that had the same pid
+        with _directory_lock(directory, exclusive=True):
+            if os.path.exists(path):
+                _fold(directory, [path])
+        _claimed_pid = os.getpid()
+    _write(path, snapshot)
+
+
+def _flush_at_exit():
+    # Nothing to add to a directory that was removed (test runs, cleared on deploy)
+    if os.path.isdir(_metrics_dir()):
+        flush(force=True)
+
+
+atexit.register(_flush_at_exit)
+
+
+def collect():
+    """Merge every process file into {name: {label tuple: value or state list}}"""
+    directory = _metrics_dir()
+    if not os.path.isdir(directory):
+        return {}
+    _fold_dead_workers(directory)
+    merged = {}
+    with _directory_lock(directory, exclusive=False):
+        for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+            _merge(merged, _read(path) or {})
+    return merged
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def render():
+    """Return all metrics, merged across processes, in Prometheus text format"""
+    flush(force=True)
+    merged = collect()
+    lines = []
+    for name, metric in _metrics.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, value in sorted(merged.get(name, {}).items()):
+            if metric.kind == 'counter':
+                lines.append(f"{name}{_format_labels(metric.labelnames, labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                le = ('le', bound if bound == '+Inf' else repr(float(bound)))
+                lines.append(f"{name}_bucket{_format_labels(metric.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(metric.labelnames, labels)} {value[-1]}")
+            lines.append(f"{name}_count{_format_labels(metric.labelnames, labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
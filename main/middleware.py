@@ -0,0 +1,219 @@
+"""
+Request-level middleware for the main app.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import empty
+
+from logger import request_context
+
+from . import log_control, metrics, profiling, request_timing
+from storage_webapp import logger, severity
+
+
+class MetricsMiddleware:
+    """
+    Record per-route request latency and flush this worker's metrics.
+
+    Place it first in MIDDLEWARE so session and auth time is included.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        # Route patterns (not raw paths) keep label cardinality bounded
+        route = match.route if match is not None else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method, route=route, status=f"{response.status_code // 100}xx",
+        )
+        metrics.flush()
+        return response
+
+
+def _is_admin(request):
+    from .views import is_admin_user
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and is_admin_user(user)
+
+
+class ServerTimingMiddleware:
+    """
+    Attribute request time to middleware, DB queries, storage calls and the view.
+
+    Logs a structured record for requests slower than SLOW_REQUEST_THRESHOLD_MS. The
+    Server-Timing header exposes query counts and backend latency, so it is only
+    added with DEBUG on, when SERVER_TIMING_PUBLIC is set, or for admins who ask for
+    it with "X-Server-Timing: 1". Pair with ViewTimingMiddleware as the last entry of
+    MIDDLEWARE. For streaming responses only the time until the response object is
+    returned is covered; the body is sent afterwards.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing, token = request_timing.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(request_timing.db_execute_wrapper))
+                response = self.get_response(request)
+            parts = timing.breakdown()
+        finally:
+            request_timing.stop(token)
+
+        if self._show_header(request):
+            response['Server-Timing'] = ', '.join([
+                f'mw;dur={parts["middleware"]};desc="session/auth/csrf"',
+                f'db;dur={parts["db"]};desc="{timing.db_queries} queries"',
+                f'storage;dur={parts["storage"]};desc="{timing.storage_calls} calls"',
+                f'view;dur={parts["view"]}',
+                f'total;dur={parts["total"]}',
+            ])
+        threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', None)
+        if threshold is not None and parts['total'] >= threshold:
+            match = getattr(request, 'resolver_match', None)
+            session = getattr(request, 'session', None)
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'route': match.route if match is not None else None,
+                'status': response.status_code,
+                # Read from the session so logging never triggers a user lookup
+                'user_id': session.get('_auth_user_id') if session is not None else None,
+                'db_queries': timing.db_queries,
+                'storage_calls': timing.storage_calls,
+                'ms': parts,
+            }
+            logger.log(severity['WARNING'], "SLOW REQUEST : {}".format(json.dumps(record, sort_keys=True)))
+        return response
+
+    @staticmethod
+    def _show_header(request):
+        if settings.DEBUG or getattr(settings, 'SERVER_TIMING_PUBLIC', False):
+            return True
+        # The admin lookup costs a query, so only run it when the header was asked for
+        return request.headers.get('X-Server-Timing') == '1' and _is_admin(request)
+
+
+class ViewTimingMiddleware:
+    """Mark when the view runs for ServerTimingMiddleware; must be the last entry of MIDDLEWARE"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = request_timing.current()
+        if timing is None:
+            return self.get_response(request)
+        timing.view_start = time.perf_counter()
+        timing.in_view = True
+        try:
+            return self.get_response(request)
+        finally:
+            timing.in_view = False
+            timing.view_end = time.perf_counter()
+
+
+class ProfilingMiddleware:
+    """
+    Sample-profile a fraction of requests to selected views (see main/profiling.py).
+
+    Requests to views named in PROFILING_VIEWS are profiled at PROFILING_SAMPLE_RATE
+    while PROFILING_ENABLED is set. Admins can force a profile of any request with
+    the header "X-Profile: 1"; the file name is returned in X-Profile-File.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            active = getattr(request, '_profiling', None)
+            if active is not None:
+                sampler, view_name, forced = active
+                name = profiling.write_profile(sampler.stop(), view_name)
+                if forced and response is not None:
+                    response['X-Profile-File'] = name
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = getattr(view_func, 'view_class', view_func).__name__
+        forced = request.headers.get('X-Profile') == '1' and _is_admin(request)
+        if not forced:
+            if not getattr(settings, 'PROFILING_ENABLED', False):
+                return None
+            if view_name not in getattr(settings, 'PROFILING_VIEWS', ()):
+                return None
+            if random.random() >= getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0):
+                return None
+        sampler = profiling.StackSampler(
+            threading.get_ident(),
+            interval_ms=getattr(settings, 'PROFILING_INTERVAL_MS', profiling.DEFAULT_INTERVAL_MS),
+        )
+        request._profiling = (sampler.start(), view_name, forced)
+        return None
+
+
+class LogControlMiddleware:
+    """Pick up runtime log level changes made by other workers (see main/log_control.py)"""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        log_control.poll()
+        return self.get_response(request)
+
+
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+
+class RequestLogContext:
+    """What RequestContextFilter stamps on log records during one request"""
+    def __init__(self, request, request_id):
+        self.request = request
+        self.request_id = request_id
+
+    @property
+    def user_id(self):
+        # Only report a user that is already loaded; logging must not trigger a query
+        user = self.request.__dict__.get('user')
+        if user is None or getattr(user, '_wrapped', None) is empty:
+            return None
+        return user.pk if user.is_authenticated else None
+
+
+class RequestIDMiddleware:
+    """
+    Give every request an ID for log correlation.
+
+    A well-formed incoming X-Request-ID (e.g. from nginx) is kept, otherwise one is
+    generated. It is exposed as request.request_id, echoed in the response header
+    and stamped on every log record emitted while the request is handled. Place it
+    first in MIDDLEWARE so the other middleware's records carry it too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        incoming = request.headers.get('X-Request-ID', '')
+        request.request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex
+        token = request_context.set(RequestLogContext(request, request.request_id))
+        try:
+            response = self.get_response(request)
+        finally:
+            request_context.reset(token)
+        response['X-Request-ID'] = request.request_id
+        return response
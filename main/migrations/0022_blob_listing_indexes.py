@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0021_alter_userinfo_email_id_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['user_id', 'blob_name', 'blob_id'], name='blob_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['user_id', 'blob_size', 'blob_id'], name='blob_user_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['user_id', 'blob_type', 'blob_id'], name='blob_user_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blob',
+            index=models.Index(fields=['user_id', 'creation_time', 'blob_id'], name='blob_user_created_idx'),
+        ),
+    ]
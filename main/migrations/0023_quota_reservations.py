@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0022_blob_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='reserved_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='storage_reserved_bytes',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0023_quota_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
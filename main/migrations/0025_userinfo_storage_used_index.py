@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_userinfo_data_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userinfo',
+            index=models.Index(fields=['storage_used_bytes'], name='userinfo_used_idx'),
+        ),
+    ]
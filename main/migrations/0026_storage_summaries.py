@@ -0,0 +1,43 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0025_userinfo_storage_used_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobTypeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('blob_type', models.CharField(max_length=50, unique=True)),
+                ('blob_count', models.BigIntegerField(default=0)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyStorageGrowth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('blobs_added', models.BigIntegerField(default=0)),
+                ('bytes_added', models.BigIntegerField(default=0)),
+                ('blobs_removed', models.BigIntegerField(default=0)),
+                ('bytes_removed', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TierUsageSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subscription_type', models.CharField(max_length=36, unique=True)),
+                ('user_count', models.BigIntegerField(default=0)),
+                ('blob_count', models.BigIntegerField(default=0)),
+                ('total_bytes', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
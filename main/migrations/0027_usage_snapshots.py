@@ -0,0 +1,46 @@
+# Generated by Django 4.2.5 on 2026-10-19 17:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0026_storage_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userinfo',
+            name='bytes_downloaded_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userinfo',
+            name='bytes_uploaded_total',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='UsageSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('subscription_type', models.CharField(max_length=36)),
+                ('storage_used_bytes', models.BigIntegerField(default=0)),
+                ('blob_count', models.IntegerField(default=0)),
+                ('bytes_uploaded_total', models.BigIntegerField(default=0)),
+                ('bytes_downloaded_total', models.BigIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_snapshots', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subscription_type', 'date'], name='usage_snapshot_tier_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usagesnapshot',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='usage_snapshot_user_date_uniq'),
+        ),
+    ]
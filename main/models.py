@@ -20,9 +20,19 @@ class UserInfo(models.Model):
     container_name = models.CharField(max_length=250, null=False, blank=False, unique=True) # unique container name
     storage_quota_bytes = models.BigIntegerField(null=False, default=0)  # 0 GB default quota
     storage_used_bytes = models.BigIntegerField(null=False, default=0)
+    storage_reserved_bytes = models.BigIntegerField(null=False, default=0)  # held by in-flight uploads
     dob = models.DateField(null=True, blank=True)
     email_id = models.EmailField(max_length=254, null=True, blank=True, unique=True)
     avatar_url = models.CharField(max_length=500, null=True, blank=True)  # Store path to local avatar image
+    data_version = models.PositiveIntegerField(null=False, default=0)  # bumped on every change shown on the home page
+    bytes_uploaded_total = models.BigIntegerField(null=False, default=0)  # cumulative, for usage snapshots
+    bytes_downloaded_total = models.BigIntegerField(null=False, default=0)
+
+    class Meta:
+        indexes = [
+            # Admin user listing sorts by storage used
+            models.Index(fields=['storage_used_bytes'], name='userinfo_used_idx'),
+        ]
 
 class Blob(models.Model):
     blob_id = models.SlugField(max_length=MAX_HASH_ID_FIELD_LENGTH, unique=True, editable=False, null=False, blank=False) # primary key
@@ -36,6 +46,15 @@ class Blob(models.Model):
     is_in_directory = models.BooleanField(default=False)
     directory_id = models.SlugField(max_length=32, null=True, blank=True) # foreign Key
 
+    class Meta:
+        # One composite index per listing sort key; blob_id is the keyset tie-breaker
+        indexes = [
+            models.Index(fields=['user_id', 'blob_name', 'blob_id'], name='blob_user_name_idx'),
+            models.Index(fields=['user_id', 'blob_size', 'blob_id'], name='blob_user_size_idx'),
+            models.Index(fields=['user_id', 'blob_type', 'blob_id'], name='blob_user_type_idx'),
+            models.Index(fields=['user_id', 'creation_time', 'blob_id'], name='blob_user_created_idx'),
+        ]
+
     # Generate a hash based on timestamp and some unique data
     def save(self, *args, **kwargs):
         if not self.blob_id:
@@ -143,6 +162,9 @@ class LoginOTP(models.Model):
         return timezone.now() > self.expires_at
 
 
+# Upload sessions idle for longer than this are discarded along with their quota reservation
+UPLOAD_SESSION_TTL = timezone.timedelta(hours=1)
+
 class UploadSession(models.Model):
     """Model to store persistent upload session data across worker processes"""
     upload_id = models.CharField(max_length=100, unique=True, primary_key=True)
@@ -151,6 +173,7 @@ class UploadSession(models.Model):
     total_size = models.BigIntegerField()
     uploaded_size = models.BigIntegerField(default=0)
     uploaded_blocks = models.JSONField(default=list)  # Store list of uploaded block IDs
+    reserved_bytes = models.BigIntegerField(default=0)  # quota held against UserInfo.storage_reserved_bytes
     container_name = models.CharField(max_length=250)
     created_at = models.DateTimeField(default=timezone.now)
     last_activity = models.DateTimeField(default=timezone.now)
@@ -168,4 +191,78 @@ class UploadSession(models.Model):
     def update_activity(self):
         """Update last activity timestamp"""
         self.last_activity = timezone.now()
-        self.save(update_fields=['last_activity'])
\ No newline at end of file
+        self.save(update_fields=['last_activity'])
+
+# Materialized admin analytics, maintained incrementally by main/storage_summary.py and
+# rebuilt periodically by the compact_storage_summaries management command.
+class TierUsageSummary(models.Model):
+    subscription_type = models.CharField(max_length=UserInfo.MAX_CHOICES_LENGTH, unique=True)
+    user_count = models.BigIntegerField(default=0)
+    blob_count = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+
+
+class BlobTypeSummary(models.Model):
+    blob_type = models.CharField(max_length=50, unique=True)
+    blob_count = models.BigIntegerField(default=0)
+    total_bytes = models.BigIntegerField(default=0)
+
+
+class DailyStorageGrowth(models.Model):
+    date = models.DateField(unique=True)
+    blobs_added = models.BigIntegerField(default=0)
+    bytes_added = models.BigIntegerField(default=0)
+    blobs_removed = models.BigIntegerField(default=0)
+    bytes_removed = models.BigIntegerField(default=0)
+
+
+class UsageSnapshot(models.Model):
+    """One row per user per day, written in batches by the snapshot_usage management command"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='usage_snapshots')
+    date = models.DateField()
+    subscription_type = models.CharField(max_length=UserInfo.MAX_CHOICES_LENGTH)
+    storage_used_bytes = models.BigIntegerField(default=0)
+    blob_count = models.IntegerField(default=0)
+    # Cumulative counters copied from UserInfo; per-period transfer is the difference
+    bytes_uploaded_total = models.BigIntegerField(default=0)
+    bytes_downloaded_total = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves (user, date range) series queries
+            models.UniqueConstraint(fields=['user', 'date'], name='usage_snapshot_user_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['subscription_type', 'date'], name='usage_snapshot_tier_date_idx'),
+        ]
+
+
+class AdminJob(models.Model):
+    """Long-running admin operation executed in the background (see main/admin_jobs.py)"""
+    KIND_CHOICES = [
+        ("DELETE_USERS", "Delete users"),
+    ]
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("FAILED", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="PENDING")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='admin_jobs')
+    payload = models.JSONField(default=dict)  # e.g. {'user_ids': [...]}
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)  # items attempted so far; a resumed job continues from here
+    failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)  # refreshed after every batch
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'heartbeat']),
+        ]
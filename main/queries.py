@@ -0,0 +1,333 @@
+"""
+Read-side query helpers for the main app.
+
+These helpers build the paginated listings served by the API views. They talk to
+the ORM directly (no Azure calls) so listing cost depends only on the page size,
+not on how many blobs a user owns.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.db.models import Q, F, Count, Max, Sum, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Blob, UserInfo, UploadSession, UPLOAD_SESSION_TTL
+from .subscription_config import SUBSCRIPTION_VALUES
+from .utils import get_avatar_url
+from storage_webapp import logger, severity
+
+# Public sort keys -> Blob column. Each one is backed by a (user_id, column, blob_id)
+# composite index on Blob so that keyset pagination stays an index range scan.
+BLOB_SORT_FIELDS = {
+    'name': 'blob_name',
+    'size': 'blob_size',
+    'type': 'blob_type',
+    'uploaded': 'creation_time',
+}
+# Sort key -> JSON types a cursor value may have for that column
+BLOB_CURSOR_TYPES = {
+    'name': (str,),
+    'size': (int,),
+    'type': (str,),
+    'uploaded': (int, float),
+}
+DEFAULT_BLOB_SORT = 'uploaded'
+DEFAULT_BLOB_ORDER = 'desc'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+BLOB_LIST_FIELDS = ('blob_id', 'blob_name', 'blob_size', 'blob_type', 'creation_time')
+
+# Entries are keyed by UserInfo.data_version, so stale ones are never read; the
+# timeout only bounds how long superseded versions linger in the cache.
+HOME_CACHE_TIMEOUT = 60 * 60
+
+# Admin user listing: public sort key -> User column (date_joined) or joined UserInfo column
+ADMIN_USER_SORT_FIELDS = {
+    'joined': 'date_joined',
+    'storage': 'userinfo__storage_used_bytes',
+}
+DEFAULT_ADMIN_USER_SORT = 'joined'
+DEFAULT_ADMIN_PAGE_SIZE = 25
+ADMIN_USER_FIELDS = (
+    'id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser', 'date_joined', 'last_login',
+    'userinfo__id', 'userinfo__user_name', 'userinfo__subscription_type',
+    'userinfo__storage_used_bytes', 'userinfo__storage_quota_bytes', 'userinfo__avatar_url',
+)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the query"""
+
+
+def encode_cursor(payload):
+    """Encode a cursor payload (JSON-serializable list) into an opaque URL-safe token"""
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor, raising InvalidCursor on bad input"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(payload, list):
+        raise InvalidCursor('Malformed cursor')
+    return payload
+
+
+def clamp_page_size(page_size, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a user supplied page size and clamp it to [1, maximum]"""
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(page_size, maximum))
+
+
+def serialize_blob_row(row):
+    """Convert a Blob .values() row into the JSON shape used by the UI"""
+    created = row['creation_time']
+    return {
+        'blob_id': row['blob_id'],
+        'blob_name': row['blob_name'],
+        'blob_size': row['blob_size'],
+        'blob_type': row['blob_type'],
+        'blob_uploaded_at': created,
+        'blob_uploaded_at_formatted': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created)) if created else None,
+    }
+
+
+def blob_page(user_id, sort=DEFAULT_BLOB_SORT, order=DEFAULT_BLOB_ORDER, prefix=None,
+              blob_type=None, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Return one keyset-paginated page of a user's blobs.
+
+    Args:
+        user_id (int): Owner's User primary key
+        sort (str): One of BLOB_SORT_FIELDS
+        order (str): 'asc' or 'desc'
+        prefix (str): Optional blob_name prefix filter
+        blob_type (str): Optional exact blob_type filter
+        cursor (str): Token returned as next_cursor by the previous page
+        page_size (int): Number of rows to return
+
+    Returns:
+        dict: {'blobs': list, 'next_cursor': str | None, 'has_more': bool}
+
+    Raises:
+        ValueError: On unknown sort/order values
+        InvalidCursor: If the cursor is malformed or was issued for another sort or filter
+    """
+    if sort not in BLOB_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort '{sort}'")
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Unsupported order '{order}'")
+    field = BLOB_SORT_FIELDS[sort]
+    prefix, blob_type = prefix or None, blob_type or None
+
+    queryset = Blob.objects.filter(user_id=user_id)
+    if prefix:
+        queryset = queryset.filter(blob_name__startswith=prefix)
+    if blob_type:
+        queryset = queryset.filter(blob_type=blob_type)
+
+    if cursor:
+        payload = decode_cursor(cursor)
+        if len(payload) != 6:
+            raise InvalidCursor('Malformed cursor')
+        # Keyset values are only meaningful under the sort and filters they were issued for
+        if payload[:4] != [sort, order, prefix, blob_type]:
+            raise InvalidCursor('Cursor does not match the requested sort order and filters')
+        last_value, last_id = payload[4], payload[5]
+        # A forged value of the wrong type would reach the ORM and fail (or compare oddly) there
+        if (isinstance(last_value, bool) or not isinstance(last_value, BLOB_CURSOR_TYPES[sort])
+                or not isinstance(last_id, str)):
+            raise InvalidCursor('Malformed cursor')
+        # Row-value comparison "(field, blob_id) > (last_value, last_id)" spelled out
+        # so it works on every backend and still uses the composite index.
+        lookup = 'gt' if order == 'asc' else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{lookup}': last_value})
+            | Q(**{field: last_value, f'blob_id__{lookup}': last_id})
+        )
+
+    prefix_sign = '' if order == 'asc' else '-'
+    queryset = queryset.order_by(f'{prefix_sign}{field}', f'{prefix_sign}blob_id')
+
+    rows = list(queryset.values(*BLOB_LIST_FIELDS)[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor([sort, order, prefix, blob_type, last[field], last['blob_id']])
+
+    return {
+        'blobs': [serialize_blob_row(row) for row in rows],
+        'next_cursor': next_cursor,
+        'has_more': has_more,
+    }
+
+
+def home_cache_key(user_id, data_version):
+    return f"home:{user_id}:{data_version}"
+
+
+def serialize_user_info(user_info):
+    """Same shape as UserInfo.objects.filter(...).values()[0], plus the resolved avatar_url"""
+    data = {field.attname: getattr(user_info, field.attname) for field in UserInfo._meta.concrete_fields}
+    avatar_url = get_avatar_url(user_info)
+    if avatar_url is None:
+        logger.log(severity['ERROR'], f"Failed to get avatar URL for user {user_info.user_name}, using default placeholder")
+    data['avatar_url'] = avatar_url
+    return data
+
+
+def home_payload(user_info):
+    """
+    Return the per-user part of the home page: user_info, the first blob page and its cursor.
+
+    The payload is cached under the user's current data_version, which every upload,
+    delete and subscription change bumps, so a repeat load is one cache read.
+
+    Args:
+        user_info (UserInfo): The requesting user's UserInfo (data_version must be fresh)
+
+    Returns:
+        dict: {'user_info': dict, 'blobs': list, 'next_cursor': str | None}
+    """
+    key = home_cache_key(user_info.user_id, user_info.data_version)
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    page = blob_page(user_info.user_id)
+    payload = {
+        'user_info': serialize_user_info(user_info),
+        'blobs': page['blobs'],
+        'next_cursor': page['next_cursor'],
+    }
+    cache.set(key, payload, HOME_CACHE_TIMEOUT)
+    return payload
+
+
+def home_etag(user_info):
+    """Strong ETag for the per-user home payload; changes whenever data_version does"""
+    return f'"home-{user_info.user_id}-{user_info.data_version}"'
+
+
+def blob_list_etag(user_id, data_version, query_string):
+    """Strong ETag for one /listFiles/ page: the user's data_version plus the exact query"""
+    query_hash = hashlib.md5(query_string.encode()).hexdigest()[:12]
+    return f'"list-{user_id}-{data_version}-{query_hash}"'
+
+
+def active_uploads_etag(user_id, data_version):
+    """
+    Strong ETag for a user's active upload sessions, from one aggregate query.
+
+    Every chunk bumps last_activity and session create/finish/cancel changes the
+    reservation (and so data_version), so (count, newest activity, version) identifies
+    the list. Expired sessions are excluded so the list changes once they lapse.
+    """
+    stats = UploadSession.objects.filter(
+        user_id=user_id,
+        last_activity__gte=timezone.now() - UPLOAD_SESSION_TTL,
+    ).aggregate(count=Count('upload_id'), latest=Max('last_activity'))
+    latest = int(stats['latest'].timestamp() * 1_000_000) if stats['latest'] else 0
+    return f'"uploads-{user_id}-{data_version}-{stats["count"]}-{latest}"'
+
+
+def serialize_admin_user_row(row):
+    """Convert an admin_user_page .values() row into the JSON shape used by the admin UI"""
+    has_info = row['userinfo__id'] is not None
+    subscription_type = row['userinfo__subscription_type'] if has_info else 'TESTER'
+    return {
+        'id': row['id'],
+        'username': row['username'],
+        'email': row['email'],
+        'is_active': row['is_active'],
+        'date_joined': row['date_joined'],
+        'last_login': row['last_login'],
+        # Users without UserInfo (shouldn't happen in normal cases) get TESTER defaults
+        'user_name': row['userinfo__user_name'] if has_info else row['username'],
+        'subscription_type': subscription_type,
+        'storage_used_bytes': row['userinfo__storage_used_bytes'] if has_info else 0,
+        'storage_quota_bytes': row['userinfo__storage_quota_bytes'] if has_info else SUBSCRIPTION_VALUES['TESTER'],
+        'is_admin': row['is_superuser'] or row['is_staff'] or (has_info and subscription_type == 'OWNER'),
+        'avatar_url': row['userinfo__avatar_url'] if has_info else None,
+        'blob_count': row['blob_count'],
+        'blob_bytes': row['blob_bytes'],
+    }
+
+
+def admin_user_page(search=None, sort=DEFAULT_ADMIN_USER_SORT, order='desc', page=1,
+                    page_size=DEFAULT_ADMIN_PAGE_SIZE):
+    """
+    Return one page of users for the admin interface in a single query.
+
+    UserInfo is LEFT JOINed and per-user blob count/bytes are correlated subqueries,
+    so the database only aggregates blobs for the rows on the requested page.
+
+    Args:
+        search (str): Optional case-insensitive match on username, user_name or email
+        sort (str): One of ADMIN_USER_SORT_FIELDS
+        order (str): 'asc' or 'desc'
+        page (int): 1-based page number
+        page_size (int): Number of users per page
+
+    Returns:
+        dict: {'users': list, 'page': int, 'page_size': int, 'has_next': bool, 'has_previous': bool}
+
+    Raises:
+        ValueError: On unknown sort/order values
+    """
+    if sort not in ADMIN_USER_SORT_FIELDS:
+        raise ValueError(f"Unsupported sort '{sort}'")
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Unsupported order '{order}'")
+    try:
+        page = max(1, int(page))
+    except (TypeError, ValueError):
+        page = 1
+
+    blob_stats = Blob.objects.filter(user_id=OuterRef('pk')).order_by().values('user_id')
+    queryset = User.objects.annotate(
+        blob_count=Coalesce(Subquery(blob_stats.annotate(n=Count('blob_id')).values('n')[:1]), Value(0)),
+        blob_bytes=Coalesce(Subquery(blob_stats.annotate(n=Sum('blob_size')).values('n')[:1]), Value(0)),
+    )
+    if search:
+        queryset = queryset.filter(
+            Q(username__icontains=search)
+            | Q(email__icontains=search)
+            | Q(userinfo__user_name__icontains=search)
+        )
+
+    field = F(ADMIN_USER_SORT_FIELDS[sort])
+    if order == 'asc':
+        queryset = queryset.order_by(field.asc(nulls_first=True), 'id')
+    else:
+        queryset = queryset.order_by(field.desc(nulls_last=True), '-id')
+
+    # Fetch one extra row to learn whether a next page exists without a COUNT(*)
+    offset = (page - 1) * page_size
+    rows = list(queryset.values(*ADMIN_USER_FIELDS, 'blob_count', 'blob_bytes')[offset:offset + page_size + 1])
+    has_next = len(rows) > page_size
+
+    return {
+        'users': [serialize_admin_user_row(row) for row in rows[:page_size]],
+        'page': page,
+        'page_size': page_size,
+        'has_next': has_next,
+        'has_previous': page > 1,
+    }
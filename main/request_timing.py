@@ -0,0 +1,90 @@
+"""
+Per-request time attribution for Server-Timing headers and slow-request logs.
+
+A RequestTiming is bound to a context variable for the duration of one request by
+ServerTimingMiddleware. Database time is collected by an execute wrapper installed
+on every connection, storage SDK time by metrics.storage_call, and ViewTimingMiddleware
+(the innermost middleware) marks when the view starts and returns. Time outside the
+view is middleware work: session load/save, CSRF and auth.
+
+Time is split by phase so the reported parts are exclusive and add up to the total.
+"""
+import contextvars
+import time
+
+_current = contextvars.ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.view_start = None
+        self.view_end = None
+        self.in_view = False
+        self.db_seconds = {False: 0.0, True: 0.0}  # keyed by in_view
+        self.db_queries = 0
+        self.storage_seconds = 0.0
+        self.storage_calls = 0
+
+    def add_db(self, seconds):
+        self.db_seconds[self.in_view] += seconds
+        self.db_queries += 1
+
+    def add_storage(self, seconds):
+        self.storage_seconds += seconds
+        self.storage_calls += 1
+
+    def breakdown(self, end=None):
+        """
+        Return exclusive durations in milliseconds.
+
+        Returns:
+            dict: middleware, db, storage, view and total
+        """
+        end = end if end is not None else time.perf_counter()
+        total = end - self.start
+        view = 0.0
+        if self.view_start is not None:
+            view = (self.view_end if self.view_end is not None else end) - self.view_start
+        outside = total - view
+        parts = {
+            'middleware': outside - self.db_seconds[False],
+            'db': self.db_seconds[False] + self.db_seconds[True],
+            'storage': self.storage_seconds,
+            'view': view - self.db_seconds[True] - self.storage_seconds,
+            'total': total,
+        }
+        return {name: round(max(seconds, 0.0) * 1000, 2) for name, seconds in parts.items()}
+
+
+def start():
+    """Bind a fresh RequestTiming to the current context and return (timing, reset token)"""
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def record_storage(seconds):
+    """Attribute storage SDK time to the current request, if any"""
+    timing = _current.get()
+    if timing is not None:
+        timing.add_storage(seconds)
+
+
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper hook that attributes query time to the current request"""
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start_time = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_db(time.perf_counter() - start_time)
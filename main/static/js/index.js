@@ -876,6 +876,112 @@ document.addEventListener('DOMContentLoaded', function() {
         setViewMode('list');
     });
 
+    // Lazy-load further pages of the file list from /listFiles/
+    function escapeHtml(value) {
+        return String(value)
+            .replace(/&/g, '&amp;')
+            .replace(/</g, '&lt;')
+            .replace(/>/g, '&gt;')
+            .replace(/"/g, '&quot;')
+            .replace(/'/g, '&#39;');
+    }
+
+    function renderFileItem(file) {
+        const name = escapeHtml(file.blob_name);
+        const displayName = escapeHtml(file.blob_name.slice(0, -4));
+        const size = formatFileSize(file.blob_size);
+        const uploaded = escapeHtml(file.blob_uploaded_at_formatted || 'Unknown date');
+        const blobId = escapeHtml(file.blob_id);
+        return `
+          <div class="bg-white rounded-lg shadow p-3 sm:p-4 flex flex-col file-item-tile" style="display: none;">
+            <div class="flex items-center mb-2">
+              <i class="file-icon text-blue-500 text-xl sm:text-2xl mr-2 sm:mr-3 flex-shrink-0" data-filename="${name}"></i>
+              <span class="font-medium text-gray-800 truncate-name text-sm sm:text-base" title="${name}">${displayName}</span>
+            </div>
+            <div class="text-xs text-gray-500 mb-1">${size}</div>
+            <div class="text-xs text-gray-400 mb-2 sm:mb-0">${uploaded}</div>
+            <div class="flex items-center mt-2 space-x-2 sm:space-x-3">
+              <button class="file-download-btn text-blue-600 hover:underline p-2 sm:p-0 flex items-center bg-transparent border-0 rounded-md sm:rounded-none hover:bg-blue-50 sm:hover:bg-transparent transition-colors"
+                      type="button" data-blob-id="${blobId}" data-blob-name="${name}" data-blob-size="${file.blob_size}">
+                <i class="fas fa-download text-lg sm:text-sm mr-0 sm:mr-1"></i>
+                <span class="hidden sm:inline text-xs sm:text-sm ml-1 sm:ml-0">Download</span>
+              </button>
+              <button class="file-delete-btn text-red-600 hover:underline p-2 sm:p-0 flex items-center bg-transparent border-0 rounded-md sm:rounded-none hover:bg-red-50 sm:hover:bg-transparent transition-colors"
+                      type="button" data-blob-id="${blobId}">
+                <i class="fas fa-trash-alt text-lg sm:text-sm mr-0 sm:mr-1"></i>
+                <span class="hidden sm:inline text-xs sm:text-sm ml-1 sm:ml-0">Delete</span>
+              </button>
+            </div>
+          </div>
+          <div class="bg-white rounded-lg shadow p-3 flex items-center justify-between file-item-list mb-2">
+            <div class="flex items-center flex-1">
+              <i class="file-icon text-blue-500 text-lg mr-3" data-filename="${name}"></i>
+              <div class="flex-1">
+                <div class="font-medium text-gray-800 truncate-name" title="${name}">${displayName}</div>
+                <div class="text-xs text-gray-500">${size} • ${uploaded}</div>
+              </div>
+            </div>
+            <div class="flex items-center space-x-2">
+              <button class="file-download-btn bg-blue-100 hover:bg-blue-200 text-blue-700 px-2 py-2 rounded-md text-sm flex items-center justify-center transition-colors border-0"
+                      type="button" data-blob-id="${blobId}" data-blob-name="${name}" data-blob-size="${file.blob_size}" title="Download ${name}">
+                <i class="fas fa-download"></i>
+              </button>
+              <button class="file-delete-btn bg-red-100 hover:bg-red-200 text-red-700 px-2 py-2 rounded-md text-sm flex items-center justify-center transition-colors border-0"
+                      type="button" data-blob-id="${blobId}" title="Delete ${name}">
+                <i class="fas fa-trash-alt"></i>
+              </button>
+            </div>
+          </div>`;
+    }
+
+    let loadingMoreFiles = false;
+    function loadMoreFiles() {
+        const $btn = $('#load-more-files');
+        const cursor = $btn.attr('data-next-cursor');
+        if (!cursor || loadingMoreFiles) return;
+        loadingMoreFiles = true;
+        $btn.prop('disabled', true).text('Loading...');
+
+        fetch(`/listFiles/?cursor=${encodeURIComponent(cursor)}`, {
+            method: 'GET',
+            headers: {
+                'Accept': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest'
+            },
+            credentials: 'same-origin'
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.error || 'Failed to load files');
+            }
+            $('#file-list-container').append(data.blobs.map(renderFileItem).join(''));
+            initializeFileIcons();
+            setViewMode(localStorage.getItem('cloudsynk-view-mode') || 'list');
+            if (data.next_cursor) {
+                $btn.attr('data-next-cursor', data.next_cursor).prop('disabled', false).text('Load more files');
+            } else {
+                $('#load-more-container').remove();
+            }
+        })
+        .catch(error => {
+            console.error('Failed to load more files:', error);
+            $btn.prop('disabled', false).text('Load more files');
+        })
+        .finally(() => {
+            loadingMoreFiles = false;
+        });
+    }
+
+    $('#load-more-files').on('click', loadMoreFiles);
+
+    // Fetch the next page automatically when the button scrolls into view
+    if ('IntersectionObserver' in window && document.getElementById('load-more-files')) {
+        new IntersectionObserver(function(entries) {
+            if (entries.some(entry => entry.isIntersecting)) loadMoreFiles();
+        }, { rootMargin: '200px' }).observe(document.getElementById('load-more-files'));
+    }
+
     // Function to update storage progress bar
     function updateStorageProgress(usedBytes, quotaBytes) {
         var $container = $('#storage-container');
@@ -14,6 +14,8 @@ class TransferManager {
         this.chunkSize = 1 * 1024 * 1024; // 1MB chunks
         this.currentView = 'all'; // all, uploads, downloads
         this.pageReloadPending = false; // Track if page reload is pending
+        // Last ETag/body per polled endpoint, so unchanged state comes back as a bodiless 304
+        this.conditionalCache = new Map();
         
         this.init();
     }
@@ -782,15 +784,10 @@ class TransferManager {
      */
     refreshStorageProgress() {
         // Fetch updated storage information from server
-        fetch('/dashboard/', {
-            method: 'GET',
-            headers: {
-                'X-Requested-With': 'XMLHttpRequest',
-                'Content-Type': 'application/json',
-            },
-            credentials: 'same-origin'
+        this.conditionalFetchJson('/home/', {
+            'X-Requested-With': 'XMLHttpRequest',
+            'Accept': 'application/json',
         })
-        .then(response => response.json())
         .then(data => {
             if (data.success && data.user_info) {
                 // Update storage progress bar
@@ -807,6 +804,35 @@ class TransferManager {
         });
     }
 
+    /**
+     * GET a JSON endpoint with If-None-Match; on 304 reuse the body cached for that URL
+     */
+    async conditionalFetchJson(url, headers = {}) {
+        const cached = this.conditionalCache.get(url);
+        const requestHeaders = { ...headers };
+        if (cached) {
+            requestHeaders['If-None-Match'] = cached.etag;
+        }
+
+        const response = await fetch(url, {
+            method: 'GET',
+            headers: requestHeaders,
+            credentials: 'same-origin',
+        });
+
+        if (response.status === 304 && cached) {
+            return cached.data;
+        }
+        const data = await response.json();
+        const etag = response.headers.get('ETag');
+        if (response.ok && etag) {
+            this.conditionalCache.set(url, { etag, data });
+        } else {
+            this.conditionalCache.delete(url);
+        }
+        return data;
+    }
+
     /**
      * Update transfer statistics (speed, ETA)
      */
@@ -1512,31 +1538,24 @@ class TransferManager {
      */
     async syncActiveUploadsWithServer() {
         try {
-            const response = await fetch('/activeUploads/', {
-                method: 'GET',
-                headers: {
-                    'X-CSRFToken': this.getCsrfToken(),
-                    'Content-Type': 'application/json',
-                },
-                credentials: 'same-origin',
+            const result = await this.conditionalFetchJson('/activeUploads/', {
+                'X-CSRFToken': this.getCsrfToken(),
+                'Accept': 'application/json',
             });
 
-            if (response.ok) {
-                const result = await response.json();
-                if (result.success && result.active_sessions) {
-                    // Check if we have local uploads that are no longer on server
-                    for (const [transferId, transfer] of this.uploads) {
-                        if (transfer.type === 'upload' && transfer.status === 'active') {
-                            const serverSession = result.active_sessions.find(
-                                session => session.upload_id === transfer.uploadId
-                            );
-                            
-                            if (!serverSession) {
-                                console.warn(`Upload ${transferId} not found on server, marking as failed`);
-                                transfer.status = 'error';
-                                transfer.error = 'Upload session lost on server';
-                                this.updateUI();
-                            }
+            if (result.success && result.active_sessions) {
+                // Check if we have local uploads that are no longer on server
+                for (const [transferId, transfer] of this.uploads) {
+                    if (transfer.type === 'upload' && transfer.status === 'active') {
+                        const serverSession = result.active_sessions.find(
+                            session => session.upload_id === transfer.uploadId
+                        );
+                        
+                        if (!serverSession) {
+                            console.warn(`Upload ${transferId} not found on server, marking as failed`);
+                            transfer.status = 'error';
+                            transfer.error = 'Upload session lost on server';
+                            this.updateUI();
                         }
                     }
                 }
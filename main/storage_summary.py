@@ -0,0 +1,209 @@
+"""
+Materialized storage analytics for the admin dashboard.
+
+TierUsageSummary, BlobTypeSummary and DailyStorageGrowth hold running totals so
+admin reads are O(number of tiers / types / days) instead of scanning Blob. The
+record_* helpers apply signed F() deltas and are called in the same transaction
+as the Blob or UserInfo change they describe. The per-blob helpers defer their
+deltas to transaction.on_commit: every upload and delete touches the same few
+summary rows, and updating them inside the caller's transaction would hold those
+row locks until it commits. Anything that bypasses or loses a delta (e.g. a
+cascade delete, or a failure after commit) is repaired by compact_summaries, run
+from the compact_storage_summaries management command.
+"""
+from django.db import transaction
+from django.db.models import F, Sum, Count, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import UserInfo, Blob, TierUsageSummary, BlobTypeSummary, DailyStorageGrowth
+from storage_webapp import logger, severity
+
+
+def _apply(model, lookup, **deltas):
+    """Add signed deltas to the counters of the row matching lookup, creating it if needed"""
+    updates = {}
+    for field, delta in deltas.items():
+        if delta >= 0:
+            updates[field] = F(field) + delta
+        else:
+            updates[field] = Greatest(F(field) + delta, Value(0))
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    model.objects.get_or_create(**lookup)
+    model.objects.filter(**lookup).update(**updates)
+
+
+def _subscription_of(user_id):
+    return UserInfo.objects.filter(user_id=user_id).values_list('subscription_type', flat=True).first()
+
+
+def _apply_on_commit(deltas):
+    """Apply (model, lookup, deltas) triples once the surrounding transaction commits"""
+    def apply():
+        try:
+            for model, lookup, fields in deltas:
+                _apply(model, lookup, **fields)
+        except Exception as error:
+            logger.log(severity['ERROR'], "STORAGE SUMMARY UPDATE EXCEPTION : {}".format(error))
+    transaction.on_commit(apply)
+
+
+def record_blob_added(subscription_type, blob_type, size_bytes):
+    """Account for a new Blob row of a user on subscription_type, after the transaction commits"""
+    deltas = [
+        (BlobTypeSummary, {'blob_type': blob_type}, {'blob_count': 1, 'total_bytes': size_bytes}),
+        (DailyStorageGrowth, {'date': timezone.localdate()}, {'blobs_added': 1, 'bytes_added': size_bytes}),
+    ]
+    if subscription_type:
+        deltas.insert(0, (TierUsageSummary, {'subscription_type': subscription_type},
+                          {'blob_count': 1, 'total_bytes': size_bytes}))
+    _apply_on_commit(deltas)
+
+
+def record_blob_removed(subscription_type, blob_type, size_bytes):
+    """Account for a deleted Blob row of a user on subscription_type, after the transaction commits"""
+    deltas = [
+        (BlobTypeSummary, {'blob_type': blob_type}, {'blob_count': -1, 'total_bytes': -size_bytes}),
+        (DailyStorageGrowth, {'date': timezone.localdate()}, {'blobs_removed': 1, 'bytes_removed': size_bytes}),
+    ]
+    if subscription_type:
+        deltas.insert(0, (TierUsageSummary, {'subscription_type': subscription_type},
+                          {'blob_count': -1, 'total_bytes': -size_bytes}))
+    _apply_on_commit(deltas)
+
+
+def record_user_added(subscription_type):
+    """Account for a new UserInfo row (new users own no blobs yet)"""
+    _apply(TierUsageSummary, {'subscription_type': subscription_type}, user_count=1)
+
+
+def record_user_removed(user_id):
+    """
+    Account for a user and all of their blobs being deleted.
+
+    Costs one grouped query over the user's own blobs; call it before the delete.
+    """
+    subscription_type = _subscription_of(user_id)
+    if subscription_type is None:
+        return
+    per_type = list(
+        Blob.objects.filter(user_id=user_id).order_by().values('blob_type')
+        .annotate(blobs=Count('blob_id'), size=Sum('blob_size'))
+    )
+    blobs = sum(row['blobs'] for row in per_type)
+    size = sum(row['size'] or 0 for row in per_type)
+    _apply(TierUsageSummary, {'subscription_type': subscription_type},
+           user_count=-1, blob_count=-blobs, total_bytes=-size)
+    for row in per_type:
+        _apply(BlobTypeSummary, {'blob_type': row['blob_type']},
+               blob_count=-row['blobs'], total_bytes=-(row['size'] or 0))
+    if blobs:
+        _apply(DailyStorageGrowth, {'date': timezone.localdate()}, blobs_removed=blobs, bytes_removed=size)
+
+
+def record_tier_change(user_id, old_subscription, new_subscription):
+    """Move a user's totals from one tier to another after a subscription change"""
+    if old_subscription == new_subscription:
+        return
+    totals = Blob.objects.filter(user_id=user_id).aggregate(blobs=Count('blob_id'), size=Sum('blob_size'))
+    blobs, size = totals['blobs'], totals['size'] or 0
+    _apply(TierUsageSummary, {'subscription_type': old_subscription},
+           user_count=-1, blob_count=-blobs, total_bytes=-size)
+    _apply(TierUsageSummary, {'subscription_type': new_subscription},
+           user_count=1, blob_count=blobs, total_bytes=size)
+
+
+def record_bulk_tier_change(user_ids, new_subscription):
+    """
+    Move the totals of every listed user not already on new_subscription into it.
+
+    Uses two grouped queries (users and blobs per old tier), so the cost does not
+    depend on how many users are moved. Call it before the bulk UPDATE.
+    """
+    users = (
+        UserInfo.objects.filter(user_id__in=user_ids).exclude(subscription_type=new_subscription)
+        .order_by().values('subscription_type').annotate(users=Count('id'))
+    )
+    blobs = {
+        row['user_id__userinfo__subscription_type']: row
+        for row in Blob.objects.filter(user_id__in=user_ids)
+        .exclude(user_id__userinfo__subscription_type=new_subscription)
+        .order_by().values('user_id__userinfo__subscription_type')
+        .annotate(blobs=Count('blob_id'), size=Sum('blob_size'))
+    }
+    moved_users = moved_blobs = moved_bytes = 0
+    for row in users:
+        tier_blobs = blobs.get(row['subscription_type'], {})
+        count, size = tier_blobs.get('blobs', 0), tier_blobs.get('size') or 0
+        _apply(TierUsageSummary, {'subscription_type': row['subscription_type']},
+               user_count=-row['users'], blob_count=-count, total_bytes=-size)
+        moved_users += row['users']
+        moved_blobs += count
+        moved_bytes += size
+    if moved_users:
+        _apply(TierUsageSummary, {'subscription_type': new_subscription},
+               user_count=moved_users, blob_count=moved_blobs, total_bytes=moved_bytes)
+
+
+def compact_summaries(keep_days=365):
+    """
+    Rebuild tier and type summaries from grouped aggregates and prune old growth rows.
+
+    This is the only place that scans Blob in full; it runs periodically, not per request.
+
+    Returns:
+        dict: {'tiers': int, 'types': int, 'pruned_days': int}
+    """
+    tiers = {}
+    for row in UserInfo.objects.order_by().values('subscription_type').annotate(users=Count('id')):
+        tiers[row['subscription_type']] = TierUsageSummary(
+            subscription_type=row['subscription_type'], user_count=row['users'])
+    blob_tiers = (
+        Blob.objects.filter(user_id__userinfo__isnull=False).order_by()
+        .values('user_id__userinfo__subscription_type')
+        .annotate(blobs=Count('blob_id'), size=Sum('blob_size'))
+    )
+    for row in blob_tiers:
+        summary = tiers.setdefault(row['user_id__userinfo__subscription_type'], TierUsageSummary(
+            subscription_type=row['user_id__userinfo__subscription_type']))
+        summary.blob_count = row['blobs']
+        summary.total_bytes = row['size'] or 0
+
+    types = [
+        BlobTypeSummary(blob_type=row['blob_type'], blob_count=row['blobs'], total_bytes=row['size'] or 0)
+        for row in Blob.objects.order_by().values('blob_type').annotate(blobs=Count('blob_id'), size=Sum('blob_size'))
+    ]
+
+    cutoff = timezone.localdate() - timezone.timedelta(days=keep_days)
+    with transaction.atomic():
+        TierUsageSummary.objects.all().delete()
+        TierUsageSummary.objects.bulk_create(tiers.values())
+        BlobTypeSummary.objects.all().delete()
+        BlobTypeSummary.objects.bulk_create(types)
+        pruned, _ = DailyStorageGrowth.objects.filter(date__lt=cutoff).delete()
+
+    logger.log(severity['INFO'], "STORAGE SUMMARY COMPACT : Tiers : {}, Types : {}, Pruned days : {}".format(
+        len(tiers), len(types), pruned))
+    return {'tiers': len(tiers), 'types': len(types), 'pruned_days': pruned}
+
+
+def analytics(top=10, days=30):
+    """
+    Read the admin storage analytics from the summary tables.
+
+    Top consumers come from the storage_used_bytes index on UserInfo, so every part
+    of the result is bounded by tiers, types, days or top, never by blob count.
+    """
+    since = timezone.localdate() - timezone.timedelta(days=days - 1)
+    return {
+        'tiers': list(TierUsageSummary.objects.order_by('subscription_type')
+                      .values('subscription_type', 'user_count', 'blob_count', 'total_bytes')),
+        'blob_types': list(BlobTypeSummary.objects.filter(blob_count__gt=0).order_by('-total_bytes')
+                           .values('blob_type', 'blob_count', 'total_bytes')),
+        'top_consumers': list(UserInfo.objects.order_by('-storage_used_bytes')
+                              .values('user_id', 'user_name', 'subscription_type',
+                                      'storage_used_bytes', 'storage_quota_bytes')[:top]),
+        'growth': list(DailyStorageGrowth.objects.filter(date__gte=since).order_by('date')
+                       .values('date', 'blobs_added', 'bytes_added', 'blobs_removed', 'bytes_removed')),
+    }
@@ -0,0 +1,201 @@
+"""
+Storage usage accounting for UserInfo.storage_used_bytes.
+
+Usage is maintained incrementally with atomic F() expressions so concurrent
+uploads and deletes in different workers never lose updates. Callers are expected
+to run these helpers inside the same transaction as the Blob insert/delete they
+account for. Drift repair lives in the reconcile_storage_usage management command.
+
+Every helper that changes a user's numbers also bumps UserInfo.data_version in the
+same UPDATE, which invalidates the cached home payload (see queries.home_payload).
+
+In-flight uploads hold a quota reservation: UploadSession.reserved_bytes is the
+ledger entry and UserInfo.storage_reserved_bytes is the per-user total. A
+reservation is taken with a single conditional UPDATE, so parallel uploads can
+never jointly overshoot the quota.
+"""
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+
+from .models import UserInfo, Blob, UploadSession
+from storage_webapp import logger, severity
+
+
+def add_usage(user_id, size_bytes):
+    """Atomically add an uploaded blob's size_bytes to the user's storage usage and upload total"""
+    return UserInfo.objects.filter(user_id=user_id).update(
+        storage_used_bytes=F('storage_used_bytes') + size_bytes,
+        bytes_uploaded_total=F('bytes_uploaded_total') + size_bytes,
+        data_version=F('data_version') + 1,
+    )
+
+
+def remove_usage(user_id, size_bytes):
+    """Atomically subtract size_bytes from the user's storage usage, never going below zero"""
+    return UserInfo.objects.filter(user_id=user_id).update(
+        storage_used_bytes=Greatest(F('storage_used_bytes') - size_bytes, Value(0)),
+        data_version=F('data_version') + 1,
+    )
+
+
+def record_download(user_id, size_bytes):
+    """Atomically add streamed download bytes to the user's cumulative download total"""
+    if not size_bytes:
+        return 0
+    return UserInfo.objects.filter(user_id=user_id).update(
+        bytes_downloaded_total=F('bytes_downloaded_total') + size_bytes
+    )
+
+
+def get_usage(user_id):
+    """Return (storage_used_bytes + storage_reserved_bytes, storage_quota_bytes) read fresh from the database"""
+    row = UserInfo.objects.filter(user_id=user_id).values_list(
+        'storage_used_bytes', 'storage_reserved_bytes', 'storage_quota_bytes'
+    ).first()
+    if row is None:
+        return (0, 0)
+    return (row[0] + row[1], row[2])
+
+
+def reserve_quota(user_id, size_bytes):
+    """
+    Atomically reserve size_bytes of the user's quota for an in-flight upload.
+
+    Returns:
+        bool: True if the reservation fits within the quota and was recorded
+
+    Raises:
+        ValueError: size_bytes is negative (it would shrink other uploads' reservations)
+    """
+    if size_bytes < 0:
+        raise ValueError(f"Cannot reserve a negative size ({size_bytes} bytes)")
+    return UserInfo.objects.filter(
+        user_id=user_id,
+        storage_quota_bytes__gte=F('storage_used_bytes') + F('storage_reserved_bytes') + size_bytes,
+    ).update(
+        storage_reserved_bytes=F('storage_reserved_bytes') + size_bytes,
+        data_version=F('data_version') + 1,
+    ) == 1
+
+
+def release_quota(user_id, size_bytes):
+    """Atomically release a reservation that will not be turned into usage"""
+    if not size_bytes:
+        return 0
+    return UserInfo.objects.filter(user_id=user_id).update(
+        storage_reserved_bytes=Greatest(F('storage_reserved_bytes') - size_bytes, Value(0)),
+        data_version=F('data_version') + 1,
+    )
+
+
+def commit_quota(user_id, reserved_bytes, used_bytes):
+    """Atomically turn a reservation into usage (the committed size may differ from the reservation)"""
+    return UserInfo.objects.filter(user_id=user_id).update(
+        storage_reserved_bytes=Greatest(F('storage_reserved_bytes') - reserved_bytes, Value(0)),
+        storage_used_bytes=F('storage_used_bytes') + used_bytes,
+        bytes_uploaded_total=F('bytes_uploaded_total') + used_bytes,
+        data_version=F('data_version') + 1,
+    )
+
+
+def discard_upload_session(upload_id):
+    """
+    Delete an upload session and release its reservation.
+
+    Only the caller whose DELETE actually removed the row releases the reservation,
+    so racing cancel/expiry/finalize paths cannot release it twice.
+
+    Returns:
+        bool: True if this call removed the session
+    """
+    with transaction.atomic():
+        row = UploadSession.objects.filter(upload_id=upload_id).values_list('user_id', 'reserved_bytes').first()
+        if row is None:
+            return False
+        deleted, _ = UploadSession.objects.filter(upload_id=upload_id).delete()
+        if deleted:
+            release_quota(row[0], row[1])
+        return bool(deleted)
+
+
+def bump_data_version(user_id):
+    """Invalidate cached per-user payloads after a change not made through the helpers above"""
+    return UserInfo.objects.filter(user_id=user_id).update(data_version=F('data_version') + 1)
+
+
+def recalculate_user_usage(user_id):
+    """
+    Recompute one user's usage from their Blob rows and store it.
+
+    The UserInfo row is locked for the duration so the recount cannot interleave
+    with an in-flight increment on databases that support row locks.
+
+    Returns:
+        tuple: (old_usage, new_usage), or None if the user has no UserInfo
+    """
+    with transaction.atomic():
+        user_info = UserInfo.objects.select_for_update().filter(user_id=user_id).only('storage_used_bytes').first()
+        if user_info is None:
+            return None
+        total = Blob.objects.filter(user_id=user_id).aggregate(total=Sum('blob_size'))['total'] or 0
+        old_usage = user_info.storage_used_bytes
+        if old_usage != total:
+            UserInfo.objects.filter(pk=user_info.pk).update(
+                storage_used_bytes=total, data_version=F('data_version') + 1
+            )
+    return (old_usage, total)
+
+
+def find_usage_drift(chunk_size=2000):
+    """
+    Stream (user_id, recorded_bytes, actual_bytes) for every user whose recorded usage
+    differs from the sum of their blob sizes.
+
+    Uses one grouped aggregate over Blob and one scan of UserInfo, both ordered by
+    user_id and merged in Python so memory stays constant regardless of user count.
+    """
+    totals = (
+        Blob.objects.values('user_id')
+        .annotate(total=Sum('blob_size'))
+        .order_by('user_id')
+        .values_list('user_id', 'total')
+        .iterator(chunk_size=chunk_size)
+    )
+    recorded = (
+        UserInfo.objects.exclude(user_id=None)
+        .order_by('user_id')
+        .values_list('user_id', 'storage_used_bytes')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    next_total = next(totals, None)
+    for user_id, used in recorded:
+        # Skip aggregates for users without a UserInfo row
+        while next_total is not None and next_total[0] < user_id:
+            next_total = next(totals, None)
+        actual = 0
+        if next_total is not None and next_total[0] == user_id:
+            actual = next_total[1] or 0
+        if used != actual:
+            yield (user_id, used, actual)
+
+
+def reconcile_usage(chunk_size=2000, dry_run=False):
+    """
+    Repair drifted storage usage for all users.
+
+    Returns:
+        dict: {'drifted': int, 'fixed': int}
+    """
+    drifted = 0
+    fixed = 0
+    for user_id, used, actual in find_usage_drift(chunk_size=chunk_size):
+        drifted += 1
+        logger.log(severity['INFO'], "STORAGE DRIFT : User ID : {}, Recorded : {}, Actual : {}".format(user_id, used, actual))
+        if dry_run:
+            continue
+        # Re-check under lock; an upload may have landed since the streaming pass
+        if recalculate_user_usage(user_id) is not None:
+            fixed += 1
+    return {'drifted': drifted, 'fixed': fixed}
@@ -0,0 +1,24 @@
+"""
+Test runner that keeps per-process output of a test run out of the source tree.
+
+Requests served during tests flush metrics (main/metrics.py); without this they would
+land in METRICS_DIR under the repository. The run gets a temporary METRICS_DIR that is
+removed afterwards.
+"""
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TempDirTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._metrics_dir = tempfile.mkdtemp(prefix='cloudsynk-test-metrics-')
+        # Left enabled after the run: the exit-time flush then finds no directory and writes nothing
+        override_settings(METRICS_DIR=self._metrics_dir).enable()
+
+    def teardown_test_environment(self, **kwargs):
+        shutil.rmtree(self._metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -10,11 +10,13 @@ urlpatterns = [
     path("login/resend-otp/", views.ResendLoginOTPAPIView.as_view(), name="resend_login_otp"),
     path("logout/", views.LogoutAPIView.as_view(), name="logout"),
     path("deactivate/", views.DeactivateUserAPIView.as_view(), name="deactivate"),
+    path("listFiles/", views.BlobListAPIView.as_view(), name="list_files"),
     path("deleteFile/<str:blob_id>/", views.DeleteBlobAPIView.as_view(), name="delete"),
     path("downloadFile/<str:blob_id>/", views.DownloadBlobAPIView.as_view(), name="download"),
     path("chunkedUpload/", views.ChunkedUploadAPIView.as_view(), name="chunked_upload"),
     path("cancelDownload/<str:blob_id>/", views.CancelDownloadAPIView.as_view(), name="cancel_download"),
     path("activeUploads/", views.ActiveUploadsAPIView.as_view(), name="active_uploads"),
+    path("metrics", views.MetricsAPIView.as_view(), name="metrics"),
     path("signup/verify-otp/", views.OTPVerifyAPIView.as_view(), name="verify_otp"),
     path("signup/resend-otp/", views.ResendOTPAPIView.as_view(), name="resend_otp"),
     
@@ -22,4 +24,13 @@ urlpatterns = [
     path("admin/users/", views.AdminUserListAPIView.as_view(), name="admin_users"),
     path("admin/users/<int:user_id>/delete/", views.AdminDeleteUserAPIView.as_view(), name="admin_delete_user"),
     path("admin/users/<int:user_id>/subscription/", views.AdminUpdateUserSubscriptionAPIView.as_view(), name="admin_update_subscription"),
+    path("admin/users/bulk/subscription/", views.AdminBulkSubscriptionAPIView.as_view(), name="admin_bulk_subscription"),
+    path("admin/users/bulk/delete/", views.AdminBulkDeleteUsersAPIView.as_view(), name="admin_bulk_delete"),
+    path("admin/jobs/<int:job_id>/", views.AdminJobStatusAPIView.as_view(), name="admin_job_status"),
+    path("admin/logging/", views.AdminLoggingAPIView.as_view(), name="admin_logging"),
+    path("admin/diagnostics/memory/", views.MemoryDiagnosticsAPIView.as_view(), name="admin_memory_diagnostics"),
+    path("admin/analytics/storage/", views.AdminStorageAnalyticsAPIView.as_view(), name="admin_storage_analytics"),
+    path("admin/analytics/usage/", views.AdminUsageSeriesAPIView.as_view(), name="admin_usage_series"),
+    path("admin/export/users/", views.AdminExportUsersAPIView.as_view(), name="admin_export_users"),
+    path("admin/export/users/<int:user_id>/blobs/", views.AdminExportUserBlobsAPIView.as_view(), name="admin_export_user_blobs"),
 ]
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Daily per-user usage snapshots and the downsampled series built from them.
+
+take_snapshots streams UserInfo and a grouped Blob count (both ordered by user_id)
+and writes one UsageSnapshot per user with batched bulk_create, so a run costs a
+handful of queries per batch regardless of user count. Re-running for the same
+day is a no-op thanks to the (user, date) unique constraint.
+"""
+import datetime
+
+from django.db.models import Count, Sum
+
+from .models import UserInfo, Blob, UsageSnapshot
+from storage_webapp import logger, severity
+
+SERIES_BUCKETS = ('day', 'week', 'month')
+MAX_SERIES_DAYS = 3 * 366
+
+
+def take_snapshots(day, batch_size=1000):
+    """
+    Write the snapshot rows for day.
+
+    Returns:
+        int: Number of users processed (existing rows for day are left untouched)
+    """
+    counts = (
+        Blob.objects.order_by('user_id').values('user_id')
+        .annotate(blobs=Count('blob_id'))
+        .values_list('user_id', 'blobs')
+        .iterator(chunk_size=batch_size)
+    )
+    users = (
+        UserInfo.objects.exclude(user_id=None).order_by('user_id')
+        .values_list('user_id', 'subscription_type', 'storage_used_bytes',
+                     'bytes_uploaded_total', 'bytes_downloaded_total')
+        .iterator(chunk_size=batch_size)
+    )
+
+    processed = 0
+    batch = []
+    next_count = next(counts, None)
+    for user_id, subscription_type, used, uploaded, downloaded in users:
+        while next_count is not None and next_count[0] < user_id:
+            next_count = next(counts, None)
+        blob_count = next_count[1] if next_count is not None and next_count[0] == user_id else 0
+        batch.append(UsageSnapshot(
+            user_id=user_id, date=day, subscription_type=subscription_type,
+            storage_used_bytes=used, blob_count=blob_count,
+            bytes_uploaded_total=uploaded, bytes_downloaded_total=downloaded,
+        ))
+        if len(batch) >= batch_size:
+            UsageSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+            processed += len(batch)
+            batch = []
+    if batch:
+        UsageSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+        processed += len(batch)
+
+    logger.log(severity['INFO'], "USAGE SNAPSHOT : Date : {}, Users : {}".format(day, processed))
+    return processed
+
+
+def _bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - datetime.timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def usage_series(start, end, bucket='day', user_id=None, subscription_type=None):
+    """
+    Return a downsampled usage series for one user or one subscription tier.
+
+    Daily points are read with one indexed range query (summed per day in SQL for
+    tiers), so a year is at most 366 rows before bucketing. Storage and blob count
+    are averaged over the days in a bucket; uploaded/downloaded bytes are the growth
+    of the cumulative counters across the bucket.
+
+    Returns:
+        list: [{'period', 'storage_used_bytes', 'blob_count', 'bytes_uploaded', 'bytes_downloaded'}]
+
+    Raises:
+        ValueError: On an unknown bucket, a missing/ambiguous target or an oversized range
+    """
+    if bucket not in SERIES_BUCKETS:
+        raise ValueError(f"Unsupported bucket '{bucket}'")
+    if (user_id is None) == (subscription_type is None):
+        raise ValueError("Specify exactly one of user_id or tier")
+    if end < start or (end - start).days > MAX_SERIES_DAYS:
+        raise ValueError(f"Date range must be between 0 and {MAX_SERIES_DAYS} days")
+
+    queryset = UsageSnapshot.objects.filter(date__gte=start, date__lte=end)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    else:
+        queryset = queryset.filter(subscription_type=subscription_type)
+    daily = (
+        queryset.order_by('date').values('date')
+        .annotate(
+            storage=Sum('storage_used_bytes'), blobs=Sum('blob_count'),
+            uploaded=Sum('bytes_uploaded_total'), downloaded=Sum('bytes_downloaded_total'),
+        )
+    )
+
+    series = []
+    current = None
+    previous_totals = None
+    for row in daily:
+        period = _bucket_start(row['date'], bucket)
+        if current is None or current['period'] != period:
+            if current is not None:
+                series.append(current)
+            baseline = previous_totals or (row['uploaded'], row['downloaded'])
+            current = {'period': period, 'days': 0, 'storage': 0, 'blobs': 0, 'baseline': baseline}
+        current['days'] += 1
+        current['storage'] += row['storage']
+        current['blobs'] += row['blobs']
+        current['totals'] = previous_totals = (row['uploaded'], row['downloaded'])
+    if current is not None:
+        series.append(current)
+
+    return [{
+        'period': point['period'],
+        'storage_used_bytes': point['storage'] // point['days'],
+        'blob_count': point['blobs'] // point['days'],
+        # Users moving between tiers can make tier totals shrink; never report negative transfer
+        'bytes_uploaded': max(0, point['totals'][0] - point['baseline'][0]),
+        'bytes_downloaded': max(0, point['totals'][1] - point['baseline'][1]),
+    } for point in series]
@@ -7,7 +7,7 @@ from django.shortcuts import redirect
 from .serializers import UserSerializer, OTPVerifySerializer
 from az_intf.api_utils import utils as app_utils
 from az_intf import api as az_api
-from .models import UserInfo, PendingUser, LoginOTP
+from .models import UserInfo, PendingUser, LoginOTP, AdminJob
 from django.contrib.auth.hashers import make_password
 from storage_webapp.settings import DEFAULT_SUBSCRIPTION_AT_INIT
 from .subscription_config import SUBSCRIPTION_CHOICES, SUBSCRIPTION_VALUES
@@ -19,13 +19,19 @@ from .mailing import send_otp_email, send_login_otp_email
 from apiConfig import AZURE_API_DISABLE
 from datetime import datetime, timedelta
 from django.utils import timezone
+from django.db import transaction
+from django.db.models import F
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from storage_webapp import logger, severity
-from django.http import StreamingHttpResponse
-from .utils import get_avatar_url
+from django.http import StreamingHttpResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from . import queries, storage_summary, storage_usage, usage_history, exports, admin_jobs, metrics, memory_diagnostics, log_control
+import hmac
 import requests
 import random
+import os
+import time
 
 def _is_api_request(request):
     """Return True if the request should be treated as an API/XHR call returning JSON.
@@ -45,6 +51,20 @@ def _is_api_request(request):
         or request.META.get('HTTP_X_REQUESTED_WITH') == 'XMLHttpRequest'
     )
 
+def _tag_response(response, etag):
+    """Attach a strong ETag and force clients to revalidate instead of reusing blindly"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+def _not_modified(request, etag):
+    """Return a 304 response when the request's If-None-Match already matches etag, else None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        _tag_response(response, etag)
+    return response
+
 class SignupAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -684,91 +704,55 @@ class HomeAPIView(APIView):
             # For browser requests, redirect to login
             return redirect(settings.LOGIN_URL)
 
-        user_info_obj = UserInfo.objects.filter(user=user).values()
-        if user_info_obj.count() != 1:
+        # One query for UserInfo + User; user.userinfo is then cached for the template too
+        try:
+            user_info_instance = UserInfo.objects.select_related('user').get(user=user)
+        except UserInfo.DoesNotExist:
             return Response({'success': False, 'error': 'User info not found'}, status=status.HTTP_400_BAD_REQUEST)
-        user_info_obj = user_info_obj[0]
-        api_instance = az_api.get_container_instance(user_info_obj['user_name'])
-        if not api_instance:
-            return Response({'success': False, 'error': 'API Instantiation Failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        # Recalculate storage usage to ensure accuracy
-        api_instance.recalculate_storage_usage()
-        
-        # Refresh user_info_obj after storage recalculation
-        user_info_obj = UserInfo.objects.filter(user=user).values()[0]
-        
-        # Get the UserInfo model instance for avatar URL calculation
-        user_info_instance = UserInfo.objects.get(user=user)
-        avatar_url = get_avatar_url(user_info_instance)
-        if avatar_url is None:
-            logger.log(severity['ERROR'], f"Failed to get avatar URL for user {user.username}, using default placeholder")
-        
-        # Add avatar URL to the context object
-        user_info_obj['avatar_url'] = avatar_url
+        user = user_info_instance.user
 
         # Check if user is admin
-        is_admin = is_admin_user(user)
-        
+        is_admin = is_admin_user(user, user_info_instance)
+
+        # Regular users' JSON payload is fully determined by data_version; answer polls with 304.
+        # The admin view lists every user, which this user's version does not cover.
+        etag = None
+        if not is_admin and _is_api_request(request):
+            etag = queries.home_etag(user_info_instance)
+            not_modified = _not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+
         blob_list = []
+        next_cursor = None
         admin_users = []
-        
-        if is_admin:
-            # For admin users, get user list instead of blob list
-            all_users = User.objects.all().order_by('-date_joined')
-            for usr in all_users:
-                try:
-                    usr_info = UserInfo.objects.get(user=usr)
-                    admin_users.append({
-                        'id': usr.id,
-                        'username': usr.username,
-                        'email': usr.email,
-                        'is_active': usr.is_active,
-                        'date_joined': usr.date_joined,
-                        'last_login': usr.last_login,
-                        'user_name': usr_info.user_name,
-                        'subscription_type': usr_info.subscription_type,
-                        'storage_used_bytes': usr_info.storage_used_bytes,
-                        'storage_quota_bytes': usr_info.storage_quota_bytes,
-                        'is_admin': usr.is_superuser or usr.is_staff or usr_info.subscription_type == 'OWNER',
-                        'avatar_url': usr_info.avatar_url
-                    })
-                except UserInfo.DoesNotExist:
-                    admin_users.append({
-                        'id': usr.id,
-                        'username': usr.username,
-                        'email': usr.email,
-                        'is_active': usr.is_active,
-                        'date_joined': usr.date_joined,
-                        'last_login': usr.last_login,
-                        'user_name': usr.username,
-                        'subscription_type': 'TESTER',
-                        'storage_used_bytes': 0,
-                        'storage_quota_bytes': SUBSCRIPTION_VALUES['TESTER'],
-                        'is_admin': usr.is_superuser or usr.is_staff,
-                        'avatar_url': None
-                    })
-        else:
-            # For regular users, get blob list
-            blob_list = api_instance.get_blob_info()
 
-        # convert numeric uploaded_at to datetime string for JSON serialization
-        for blob_obj in blob_list:
-            ts = blob_obj['blob_uploaded_at']
+        admin_page = None
+        if is_admin:
+            # For admin users, one page of the user list instead of the blob list (single JOINed query);
+            # their own blobs are never shown, so neither query nor cache them
             try:
-                if ts is not None:
-                    dt = datetime.fromtimestamp(float(ts))
-                    blob_obj['blob_uploaded_at_formatted'] = dt.strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    blob_obj['blob_uploaded_at_formatted'] = None
-            except Exception:
-                blob_obj['blob_uploaded_at_formatted'] = None
+                admin_page = _admin_user_page_from_params(request.GET)
+            except ValueError as e:
+                return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            admin_users = admin_page.pop('users')
+            user_info_obj = queries.serialize_user_info(user_info_instance)
+        else:
+            # storage_used_bytes is maintained incrementally on upload/delete; home only reads it.
+            # The per-user payload is cached by data_version, so repeat loads skip the blob query.
+            payload = queries.home_payload(user_info_instance)
+            user_info_obj = payload['user_info']
+            # For regular users, only the first page of blobs; the rest is lazy-loaded via /listFiles/
+            blob_list = payload['blobs']
+            next_cursor = payload['next_cursor']
 
         if _is_api_request(request):
-            return Response({
+            response = Response({
                 'success': True, 
                 'blobs': blob_list, 
+                'next_cursor': next_cursor,
                 'admin_users': admin_users,
+                'admin_page': admin_page,
                 'is_admin': is_admin,
                 'user': {
                     'id': user.id,
@@ -779,19 +763,52 @@ class HomeAPIView(APIView):
                 'user_info': user_info_obj,
                 'subscription_choices': [{'value': choice[0], 'label': choice[1]} for choice in SUBSCRIPTION_CHOICES]
             }, status=status.HTTP_200_OK)
+            return _tag_response(response, etag) if etag else response
         else:
             # For direct browser access, render the template
             context = {
                 'success': True, 
                 'user_info': user_info_obj,
                 'blobs': blob_list,
+                'next_cursor': next_cursor,
                 'admin_users': admin_users,
+                'admin_page': admin_page,
+                'admin_query': request.GET.get('q', ''),
+                'admin_sort': request.GET.get('sort', queries.DEFAULT_ADMIN_USER_SORT),
                 'is_admin': is_admin,
                 'user': user,  # Add user object for template consistency
                 'subscription_choices': SUBSCRIPTION_CHOICES
             }
             return render(request, 'main/sample.html', context)
 
+class BlobListAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Cursor-paginated blob listing with sorting and prefix/type filters"""
+        params = request.query_params
+        data_version = UserInfo.objects.filter(user=request.user).values_list('data_version', flat=True).first() or 0
+        etag = queries.blob_list_etag(request.user.id, data_version, request.META.get('QUERY_STRING', ''))
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        try:
+            page = queries.blob_page(
+                request.user.id,
+                sort=params.get('sort', queries.DEFAULT_BLOB_SORT),
+                order=params.get('order', queries.DEFAULT_BLOB_ORDER),
+                prefix=params.get('prefix') or None,
+                blob_type=params.get('type') or None,
+                cursor=params.get('cursor') or None,
+                page_size=queries.clamp_page_size(params.get('page_size')),
+            )
+        except ValueError as e:
+            # InvalidCursor is a ValueError too
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return _tag_response(Response({'success': True, **page}, status=status.HTTP_200_OK), etag)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class DownloadBlobAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -848,14 +865,30 @@ class DownloadBlobAPIView(APIView):
             if not blob_stream:
                 return Response({'success': False, 'error': 'Failed to get blob stream'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            # Stream the file from Azure through our server
+            # Stream the file from Azure through our server. The body is sent after the
+            # middleware has returned, so log correlation fields are captured here.
+            log_fields = {
+                'operation': 'download', 'blob_id': blob_id, 'request_id': getattr(request, 'request_id', None),
+                'user_id': request.user.id, 'range_start': start, 'range_end': end,
+            }
             def file_generator():
+                streamed = 0
+                stream_start = time.perf_counter()
                 try:
                     for chunk in blob_stream.chunks():
+                        streamed += len(chunk)
                         yield chunk
                 except Exception as e:
                     logger.log(severity['ERROR'], f"Error streaming file: {str(e)}")
                     raise
+                finally:
+                    # Count what actually left the server, including cancelled downloads
+                    storage_usage.record_download(request.user.id, streamed)
+                    metrics.DOWNLOAD_BYTES.inc(streamed)
+                    logger.log(severity['INFO'], "DOWNLOAD STREAM: Sent %s bytes of blob %s", streamed, blob_id, extra={
+                        **log_fields, 'bytes': streamed,
+                        'duration_ms': round((time.perf_counter() - stream_start) * 1000, 2),
+                    })
 
             response = StreamingHttpResponse(
                 file_generator(),
@@ -889,9 +922,9 @@ class ChunkedUploadAPIView(APIView):
         user = request.user
         
         # Debug logging - log all request data
-        logger.log(severity['DEBUG'], f"CHUNKED UPLOAD REQUEST: user={user.username}")
-        logger.log(severity['DEBUG'], f"CHUNKED UPLOAD DATA: {list(request.data.keys())}")
-        logger.log(severity['DEBUG'], f"CHUNKED UPLOAD FILES: {list(request.FILES.keys())}")
+        logger.log(severity['DEBUG'], "CHUNKED UPLOAD REQUEST: user=%s", user.username)
+        logger.log(severity['DEBUG'], "CHUNKED UPLOAD DATA: %s", list(request.data.keys()))
+        logger.log(severity['DEBUG'], "CHUNKED UPLOAD FILES: %s", list(request.FILES.keys()))
         
         # Log specific parameters
         upload_id = request.data.get('upload_id')
@@ -901,12 +934,12 @@ class ChunkedUploadAPIView(APIView):
         total_size = request.data.get('total_size')
         chunk_data = request.FILES.get('chunk')
         
-        logger.log(severity['DEBUG'], f"CHUNKED UPLOAD PARAMS: upload_id={upload_id}, chunk_index={chunk_index}, total_chunks={total_chunks}, file_name={file_name}, total_size={total_size}")
-        logger.log(severity['DEBUG'], f"CHUNKED UPLOAD CHUNK: {chunk_data.name if chunk_data else None}, size={chunk_data.size if chunk_data else None}")
+        logger.log(severity['DEBUG'], "CHUNKED UPLOAD PARAMS: upload_id=%s, chunk_index=%s, total_chunks=%s, file_name=%s, total_size=%s", upload_id, chunk_index, total_chunks, file_name, total_size)
+        logger.log(severity['DEBUG'], "CHUNKED UPLOAD CHUNK: %s, size=%s", chunk_data.name if chunk_data else None, chunk_data.size if chunk_data else None)
         
         try:
             user_info = UserInfo.objects.get(user=user)
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Found user_info for {user.username}")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Found user_info for %s", user.username)
         except UserInfo.DoesNotExist:
             logger.log(severity['ERROR'], f"CHUNKED UPLOAD: UserInfo not found for {user.username}")
             return Response({'success': False, 'error': 'User info not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -928,12 +961,20 @@ class ChunkedUploadAPIView(APIView):
         try:
             chunk_index = int(chunk_index) if chunk_index is not None else 0
             total_chunks = int(total_chunks) if total_chunks is not None else 1
-            total_size = int(total_size) if total_size is not None else 0
+            total_size = int(total_size) if total_size not in (None, '') else None
         except (ValueError, TypeError) as e:
             logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Parameter conversion error: {e}")
             return Response({'success': False, 'error': f'Invalid parameter format: {e}'}, status=status.HTTP_400_BAD_REQUEST)
 
-        logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Converted params - chunk_index={chunk_index}, total_chunks={total_chunks}, total_size={total_size}")
+        # total_size sizes the quota reservation; a missing or negative value would corrupt it
+        if total_size is None:
+            logger.log(severity['ERROR'], "CHUNKED UPLOAD: Missing total_size")
+            return Response({'success': False, 'error': 'Missing total_size parameter'}, status=status.HTTP_400_BAD_REQUEST)
+        if total_size < 0:
+            logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Negative total_size {total_size}")
+            return Response({'success': False, 'error': 'total_size must not be negative'}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Converted params - chunk_index=%s, total_chunks=%s, total_size=%s", chunk_index, total_chunks, total_size)
 
         if not all([upload_id, file_name, chunk_data]):
             logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Missing required parameters after validation")
@@ -946,44 +987,48 @@ class ChunkedUploadAPIView(APIView):
 
         # Validate quota for the first chunk only (to avoid multiple validations for the same file)
         if chunk_index == 0:
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: First chunk, validating quota and blob name")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: First chunk, validating quota and blob name")
             # Validate against user's quota and file name uniqueness
             blob_validation = api_instance.validate_new_blob_addition(total_size, file_name)
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Blob validation result: {blob_validation}")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Blob validation result: %s", blob_validation)
             if not blob_validation[0]:
                 logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Blob validation failed: {blob_validation[1]}")
                 return Response({'success': False, 'error': blob_validation[1]}, status=status.HTTP_400_BAD_REQUEST)
             
             # Initialize streaming upload session for first chunk
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Initializing streaming upload session")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Initializing streaming upload session")
             init_result = api_instance.initialize_streaming_upload(file_name, upload_id, total_size)
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Init result: {init_result}")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Init result: %s", init_result)
             if not init_result['success']:
                 logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Streaming upload init failed: {init_result['error']}")
+                if init_result.get('quota_exceeded'):
+                    return Response({'success': False, 'error': init_result['error']}, status=status.HTTP_400_BAD_REQUEST)
                 return Response({'success': False, 'error': init_result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         try:
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Appending chunk {chunk_index}")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Appending chunk %s", chunk_index)
             # Stream chunk directly to Azure
             chunk_result = api_instance.append_chunk_to_blob(upload_id, chunk_data, chunk_index)
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Chunk append result: {chunk_result}")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Chunk append result: %s", chunk_result)
             if not chunk_result['success']:
                 logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Chunk append failed: {chunk_result['error']}")
+                if chunk_result.get('size_exceeded'):
+                    return Response({'success': False, 'error': chunk_result['error']}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
                 return Response({'success': False, 'error': chunk_result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
             # Check if upload is complete
             if chunk_index == total_chunks - 1:
-                logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Final chunk, finalizing upload")
+                logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Final chunk, finalizing upload")
                 # Finalize streaming upload
                 finalize_result = api_instance.finalize_streaming_upload(upload_id, file_name)
-                logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Finalize result: {finalize_result}")
+                logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Finalize result: %s", finalize_result)
                 if finalize_result['success']:
                     logger.log(severity['INFO'], f"CHUNKED UPLOAD: Upload completed successfully")
                     
                     # CRITICAL: Invalidate cached container to ensure all workers see new blob
                     from az_intf.api import del_container_instance
                     del_container_instance(request.user.username)
-                    logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Invalidated container cache for multi-worker consistency")
+                    logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Invalidated container cache for multi-worker consistency")
                     
                     return Response({
                         'success': True, 
@@ -997,7 +1042,7 @@ class ChunkedUploadAPIView(APIView):
                     logger.log(severity['ERROR'], f"CHUNKED UPLOAD: Finalization failed: {finalize_result['error']}")
                     return Response({'success': False, 'error': finalize_result['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-            logger.log(severity['DEBUG'], f"CHUNKED UPLOAD: Chunk {chunk_index} completed successfully")
+            logger.log(severity['DEBUG'], "CHUNKED UPLOAD: Chunk %s completed successfully", chunk_index)
             return Response({
                 'success': True,
                 'completed': False,
@@ -1085,30 +1130,48 @@ class ActiveUploadsAPIView(APIView):
         except UserInfo.DoesNotExist:
             return Response({'success': False, 'error': 'User info not found'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # One aggregate decides whether anything changed; the container is only touched on a miss
+        etag = queries.active_uploads_etag(request.user.id, user_info.data_version)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
         api_instance = az_api.get_container_instance(user_info.user_name)
         if not api_instance:
             return Response({'success': False, 'error': 'API Instantiation Failed'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         active_sessions = api_instance.get_active_upload_sessions()
-        return Response(active_sessions, status=status.HTTP_200_OK)
+        response = Response(active_sessions, status=status.HTTP_200_OK)
+        return _tag_response(response, etag) if active_sessions.get('success') else response
 
 
 # Admin views for managing users
-def is_admin_user(user):
-    """Check if user has admin privileges"""
+def is_admin_user(user, user_info=None):
+    """Check if user has admin privileges; pass user_info when already loaded to skip the lookup"""
     try:
-        user_info = UserInfo.objects.get(user=user)
+        if user_info is None:
+            user_info = UserInfo.objects.get(user=user)
         return (user.is_superuser or user.is_staff or 
                 user_info.subscription_type == 'OWNER')
     except UserInfo.DoesNotExist:
         return user.is_superuser or user.is_staff
 
+def _admin_user_page_from_params(params):
+    """Run queries.admin_user_page with search/sort/order/page/page_size taken from query params"""
+    return queries.admin_user_page(
+        search=(params.get('q') or '').strip() or None,
+        sort=params.get('sort', queries.DEFAULT_ADMIN_USER_SORT),
+        order=params.get('order', 'desc'),
+        page=params.get('page', 1),
+        page_size=queries.clamp_page_size(params.get('page_size'), default=queries.DEFAULT_ADMIN_PAGE_SIZE),
+    )
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AdminUserListAPIView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """Get list of all users for admin interface"""
+        """Get one page of users for admin interface (supports q, sort, order, page, page_size)"""
         # Check if requesting user is admin
         if not is_admin_user(request.user):
             if not _is_api_request(request):
@@ -1116,45 +1179,250 @@ class AdminUserListAPIView(APIView):
             return Response({'success': False, 'error': 'Insufficient permissions'}, 
                           status=status.HTTP_403_FORBIDDEN)
         
-        # Get all users with their UserInfo
-        users_data = []
-        users = User.objects.all().order_by('-date_joined')
-        
-        for user in users:
-            try:
-                user_info = UserInfo.objects.get(user=user)
-                users_data.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'is_active': user.is_active,
-                    'date_joined': user.date_joined,
-                    'last_login': user.last_login,
-                    'user_name': user_info.user_name,
-                    'subscription_type': user_info.subscription_type,
-                    'storage_used_bytes': user_info.storage_used_bytes,
-                    'storage_quota_bytes': user_info.storage_quota_bytes,
-                    'is_admin': user.is_superuser or user.is_staff or user_info.subscription_type == 'OWNER',
-                    'avatar_url': user_info.avatar_url
-                })
-            except UserInfo.DoesNotExist:
-                # User without UserInfo (shouldn't happen in normal cases)
-                users_data.append({
-                    'id': user.id,
-                    'username': user.username,
-                    'email': user.email,
-                    'is_active': user.is_active,
-                    'date_joined': user.date_joined,
-                    'last_login': user.last_login,
-                    'user_name': user.username,
-                    'subscription_type': 'TESTER',
-                    'storage_used_bytes': 0,
-                    'storage_quota_bytes': SUBSCRIPTION_VALUES['TESTER'],
-                    'is_admin': user.is_superuser or user.is_staff,
-                    'avatar_url': None
-                })
-        
-        return Response({'success': True, 'users': users_data}, status=status.HTTP_200_OK)
+        try:
+            page = _admin_user_page_from_params(request.query_params)
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'success': True, **page}, status=status.HTTP_200_OK)
+
+def _is_scraper_or_admin(request):
+    """
+    Operational endpoints are open to admins and to tools sending "Authorization: Bearer
+    <METRICS_TOKEN>". The peer address is not trusted: behind nginx every request,
+    public or not, arrives from 127.0.0.1.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    scheme, _, presented = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if token and scheme == 'Bearer' and hmac.compare_digest(presented.encode(), token.encode()):
+        return True
+    return request.user.is_authenticated and is_admin_user(request.user)
+
+class MetricsAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """Prometheus text exposition of all worker metrics (token-holding scrapers and admins only)"""
+        if not _is_scraper_or_admin(request):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MemoryDiagnosticsAPIView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        """Memory status of the worker serving this request (pid, RSS, tracemalloc, container cache)"""
+        return self._respond(request, 'status', request.query_params)
+
+    def post(self, request):
+        """Run start/snapshot/diff/stop against tracemalloc in the worker serving this request"""
+        return self._respond(request, request.data.get('action', 'status'), request.data)
+
+    def _respond(self, request, action, params):
+        if not _is_scraper_or_admin(request):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        # Workers are picked by whoever accepts the connection; callers retry until the pid matches
+        pid = params.get('pid')
+        if pid not in (None, '') and str(pid) != str(os.getpid()):
+            return Response({'success': False, 'error': 'Served by a different worker', 'pid': os.getpid()},
+                          status=status.HTTP_409_CONFLICT)
+        try:
+            report = memory_diagnostics.run_action(
+                action,
+                top=params.get('top', memory_diagnostics.DEFAULT_TOP),
+                frames=params.get('frames', memory_diagnostics.DEFAULT_FRAMES),
+                reset=str(params.get('reset', '')).lower() in ('1', 'true'),
+            )
+        except (TypeError, ValueError) as e:
+            return Response({'success': False, 'error': str(e), 'pid': os.getpid()},
+                          status=status.HTTP_400_BAD_REQUEST)
+        if action != 'status':
+            logger.log(severity['INFO'], "MEMORY DIAGNOSTICS : Action : {}, PID : {}".format(action, os.getpid()))
+        return Response({'success': True, **report}, status=status.HTTP_200_OK)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AdminLoggingAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Current runtime log levels and rate limits shared by all workers (admin only)"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        return Response({'success': True, 'config': log_control.current_config()}, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        """Change default_level, per-module levels or rate_limits; workers apply it within the poll interval"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        modules = request.data.get('modules') or {}
+        rate_limits = request.data.get('rate_limits') or {}
+        if not isinstance(modules, dict) or not isinstance(rate_limits, dict):
+            return Response({'success': False, 'error': 'modules and rate_limits must be objects'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        try:
+            config = log_control.update_config(
+                default_level=request.data.get('default_level'),
+                modules=modules,
+                rate_limits=rate_limits,
+                reset=bool(request.data.get('reset')),
+            )
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.log(severity['INFO'], "Admin %s changed log config to version %s", request.user.username, config['version'])
+        return Response({'success': True, 'config': config}, status=status.HTTP_200_OK)
+
+class AdminStorageAnalyticsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Storage totals per tier and blob type, top consumers and daily growth (admin only)"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+
+        top = queries.clamp_page_size(request.query_params.get('top'), default=10, maximum=100)
+        days = queries.clamp_page_size(request.query_params.get('days'), default=30, maximum=366)
+        return Response({'success': True, **storage_summary.analytics(top=top, days=days)}, status=status.HTTP_200_OK)
+
+class AdminUsageSeriesAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Downsampled daily usage series for one user (user_id) or tier (admin only)"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+
+        params = request.query_params
+        try:
+            end = datetime.strptime(params['end'], '%Y-%m-%d').date() if params.get('end') else timezone.localdate()
+            start = datetime.strptime(params['start'], '%Y-%m-%d').date() if params.get('start') else end - timedelta(days=364)
+            user_id = int(params['user_id']) if params.get('user_id') else None
+            series = usage_history.usage_series(
+                start, end,
+                bucket=params.get('bucket', 'day'),
+                user_id=user_id,
+                subscription_type=params.get('tier') or None,
+            )
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'success': True, 'start': start, 'end': end, 'series': series}, status=status.HTTP_200_OK)
+
+class AdminExportUsersAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Stream every account as CSV or NDJSON (?output=csv|ndjson, admin only)"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        try:
+            return exports.export_users(request.query_params.get('output', 'csv'))
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class AdminExportUserBlobsAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, user_id):
+        """Stream one user's file inventory as CSV or NDJSON (?output=csv|ndjson, admin only)"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        if not User.objects.filter(id=user_id).exists():
+            return Response({'success': False, 'error': 'User not found'}, 
+                          status=status.HTTP_404_NOT_FOUND)
+        try:
+            return exports.export_user_blobs(user_id, request.query_params.get('output', 'csv'))
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+def _bulk_user_ids(data):
+    """Validate the user_ids list of a bulk admin request; raises ValueError on bad input"""
+    user_ids = data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids:
+        raise ValueError('user_ids must be a non-empty list')
+    if len(user_ids) > admin_jobs.MAX_BULK_USERS:
+        raise ValueError(f'At most {admin_jobs.MAX_BULK_USERS} users per request')
+    try:
+        return [int(uid) for uid in user_ids]
+    except (TypeError, ValueError):
+        raise ValueError('user_ids must contain integers')
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AdminBulkSubscriptionAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Change the subscription of many users with one UPDATE (admin only)"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+
+        subscription_type = request.data.get('subscription_type')
+        if subscription_type not in SUBSCRIPTION_VALUES:
+            return Response({'success': False, 'error': 'Invalid subscription type'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        try:
+            user_ids = _bulk_user_ids(request.data)
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            storage_summary.record_bulk_tier_change(user_ids, subscription_type)
+            # Usage counters are untouched, so concurrent uploads are never overwritten
+            updated = UserInfo.objects.filter(user_id__in=user_ids).update(
+                subscription_type=subscription_type,
+                storage_quota_bytes=SUBSCRIPTION_VALUES[subscription_type],
+                data_version=F('data_version') + 1,
+            )
+
+        logger.log(severity['INFO'], 
+                  f"Admin {request.user.username} changed subscription of {updated} user(s) to {subscription_type}")
+        return Response({
+            'success': True,
+            'updated': updated,
+            'new_subscription': subscription_type,
+            'new_quota_bytes': SUBSCRIPTION_VALUES[subscription_type]
+        }, status=status.HTTP_200_OK)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AdminBulkDeleteUsersAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """Queue deletion of many users as a background job; poll /admin/jobs/<id>/ for progress"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        try:
+            user_ids = _bulk_user_ids(request.data)
+        except ValueError as e:
+            return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = admin_jobs.create_delete_users_job(request.user, user_ids)
+        admin_jobs.start_job(job)
+        logger.log(severity['INFO'], f"Admin {request.user.username} queued deletion of {job.total} user(s) as job {job.pk}")
+        return Response({'success': True, 'job': admin_jobs.serialize_job(job)}, status=status.HTTP_202_ACCEPTED)
+
+class AdminJobStatusAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        """Progress of a background admin job"""
+        if not is_admin_user(request.user):
+            return Response({'success': False, 'error': 'Insufficient permissions'}, 
+                          status=status.HTTP_403_FORBIDDEN)
+        job = AdminJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({'success': False, 'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'success': True, 'job': admin_jobs.serialize_job(job)}, status=status.HTTP_200_OK)
 
 @method_decorator(csrf_exempt, name='dispatch') 
 class AdminDeleteUserAPIView(APIView):
@@ -1176,41 +1444,10 @@ class AdminDeleteUserAPIView(APIView):
                 return Response({'success': False, 'error': 'Cannot delete your own account'}, 
                               status=status.HTTP_400_BAD_REQUEST)
             
-            # Get user info for logging and container deletion
-            try:
-                target_user_info = UserInfo.objects.get(user=target_user)
-                username_for_log = target_user_info.user_name
-                container_name = target_user_info.container_name
-            except UserInfo.DoesNotExist:
-                username_for_log = target_user.username
-                container_name = None
-            
-            # Delete Azure storage container and all associated data
-            if container_name and container_name != "None":
-                try:
-                    # Import Container class to handle Azure container deletion
-                    from az_intf.api_utils.Container import Container
-                    
-                    # Create container instance for the target user
-                    container_handler = Container(username_for_log)
-                    
-                    # Delete the Azure container and associated database records
-                    container_deleted = container_handler.container_delete(target_user_info)
-                    
-                    if container_deleted:
-                        logger.log(severity['INFO'], 
-                                  f"Successfully deleted container '{container_name}' for user {username_for_log}")
-                    else:
-                        logger.log(severity['WARNING'], 
-                                  f"Failed to delete container '{container_name}' for user {username_for_log}")
-                        
-                except Exception as container_error:
-                    logger.log(severity['ERROR'], 
-                              f"Error deleting container for user {username_for_log}: {str(container_error)}")
-                    # Continue with user deletion even if container deletion fails
-            
-            # Delete the user (this will cascade delete UserInfo, Blob, Directory records due to CASCADE)
-            target_user.delete()
+            username_for_log = UserInfo.objects.filter(user=target_user).values_list('user_name', flat=True).first() or target_user.username
+
+            # Delete the Azure container, then the user (cascades to UserInfo, Blob, Directory records)
+            admin_jobs.delete_user_account(target_user)
             
             # Log the deletion
             logger.log(severity['INFO'], 
@@ -1258,7 +1495,11 @@ class AdminUpdateUserSubscriptionAPIView(APIView):
             # Update subscription
             target_user_info.subscription_type = subscription_type
             target_user_info.storage_quota_bytes = SUBSCRIPTION_VALUES[subscription_type]
-            target_user_info.save()
+            # Don't write back storage_used_bytes; it may have been incremented concurrently
+            target_user_info.data_version = F('data_version') + 1
+            with transaction.atomic():
+                target_user_info.save(update_fields=['subscription_type', 'storage_quota_bytes', 'data_version'])
+                storage_summary.record_tier_change(target_user.id, old_subscription, subscription_type)
             
             # Log the change
             logger.log(severity['INFO'], 
@@ -64,6 +64,10 @@ CRISPY_ALLOWED_TEMPLATE_PACKS = 'bootstrap5'
 CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 MIDDLEWARE = [
+    'main.middleware.RequestIDMiddleware',
+    'main.middleware.MetricsMiddleware',
+    'main.middleware.LogControlMiddleware',
+    'main.middleware.ServerTimingMiddleware',
     # 'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +75,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.ProfilingMiddleware',
+    'main.middleware.ViewTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'storage_webapp.urls'
@@ -181,3 +187,50 @@ AUTHENTICATION_BACKENDS = (
 SECURE_SSL_REDIRECT = False
 SESSION_COOKIE_SECURE = False
 CSRF_COOKIE_SECURE = False
+
+# Bulk admin jobs (main/admin_jobs.py) start on a background thread in the worker that
+# accepted them. Set to False to leave them PENDING for `manage.py run_admin_jobs`.
+ADMIN_JOBS_IN_THREAD = os.environ.get('ADMIN_JOBS_IN_THREAD', 'True') == 'True'
+
+# Per-process metric files merged by the /metrics endpoint (main/metrics.py)
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'log' / 'metrics'))
+# Test runs write metrics to a temporary directory instead (main/test_runner.py)
+TEST_RUNNER = 'main.test_runner.TempDirTestRunner'
+# /metrics and /admin/diagnostics/memory/ are served to admin users and to scrapers
+# sending "Authorization: Bearer <METRICS_TOKEN>" (unset: admins only)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Requests slower than this are logged with their Server-Timing breakdown (main/middleware.py)
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', '1000'))
+# The Server-Timing header goes to everyone with DEBUG on or when this is set;
+# otherwise only admins get it, by sending "X-Server-Timing: 1"
+SERVER_TIMING_PUBLIC = os.environ.get('SERVER_TIMING_PUBLIC', 'False') == 'True'
+
+# Sampling profiler (main/profiling.py). Admins can also force one request with "X-Profile: 1".
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.01'))
+PROFILING_VIEWS = ['ChunkedUploadAPIView', 'HomeAPIView']
+PROFILING_INTERVAL_MS = 5
+PROFILING_DIR = os.environ.get('PROFILING_DIR', str(BASE_DIR / 'log' / 'profiles'))
+PROFILING_MAX_FILES = 200
+
+# Runtime log control (main/log_control.py); change with /admin/logging/ or `manage.py set_log_level`.
+# Module names are record.module values; rate limits cap DEBUG records per call site per second.
+LOG_MODULE_LEVELS = {}
+LOG_RATE_LIMITS = {
+    'Container.append_chunk_to_blob': 1,
+    'views.post': 5,  # ChunkedUploadAPIView.post logs about a dozen DEBUG lines per chunk
+    'api.get_container_instance': 1,
+}
+LOG_CONTROL_POLL_SECONDS = 5
+
+# Blob storage backend: 'azure' (the real account) or 'local' (in-process fake in
+# az_intf/local_blob_service.py, used by benchmarks and tests). LOCAL_BLOB_LATENCY_MS
+# adds a fixed delay to every fake storage call. LOCAL_BLOB_ROOT keeps the fake's blobs
+# in that directory instead of process memory, so several workers share them.
+AZURE_STORAGE_BACKEND = os.environ.get('AZURE_STORAGE_BACKEND', 'azure')
+LOCAL_BLOB_LATENCY_MS = int(os.environ.get('LOCAL_BLOB_LATENCY_MS', '0'))
+LOCAL_BLOB_ROOT = os.environ.get('LOCAL_BLOB_ROOT') or None
+# Overrides the https://<account>.blob.core.windows.net endpoint of the 'azure' backend,
+# e.g. the URL printed by `python -m az_intf.fake_blob_service` or an Azurite account.
+AZURE_STORAGE_ACCOUNT_URL = os.environ.get('AZURE_STORAGE_ACCOUNT_URL') or None
@@ -93,6 +93,10 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 # Use WhiteNoise for static file serving
 MIDDLEWARE = [
+    'main.middleware.RequestIDMiddleware',
+    'main.middleware.MetricsMiddleware',
+    'main.middleware.LogControlMiddleware',
+    'main.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -101,6 +105,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'main.middleware.ProfilingMiddleware',
+    'main.middleware.ViewTimingMiddleware',
 ]
 
 # Static files compression